@@ -0,0 +1,135 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from utils.ingestion import fetch_all, summarize
+from utils.market_data import load_prices
+from utils.monte_carlo import monte_carlo_risk, DEFAULT_PERCENTILES
+from utils.results_store import save_results
+
+
+# Worker-side view of the shared price matrix, set once per process by _init_worker
+_shared = {}
+
+
+def build_price_matrix(prices):
+    """
+    Stack per-symbol price histories into one (n_symbols, max_len) float64 matrix.
+
+    `prices` maps symbol -> 1-D sequence of closing prices (oldest first).
+    Shorter histories are left-padded with NaN so the latest price is always in the last column.
+    """
+    symbols = list(prices.keys())
+    max_len = max((len(prices[symbol]) for symbol in symbols), default=0)
+    matrix = np.full((len(symbols), max_len), np.nan)
+    for i, symbol in enumerate(symbols):
+        history = np.asarray(prices[symbol], dtype=np.float64)
+        if len(history):
+            matrix[i, max_len-len(history):] = history
+    return symbols, matrix
+
+
+def _init_worker(shm_name, shape, config):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _shared['shm'] = shm
+    _shared['prices'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _shared['config'] = config
+
+
+def _simulate_symbol(task):
+    row, symbol, seed = task
+    config = _shared['config']
+    try:
+        history = _shared['prices'][row]
+        history = history[~np.isnan(history)]
+        if len(history) < config['min_history']:
+            return symbol, None
+
+        returns = np.diff(history) / history[:-1]
+        mu = float(returns.mean())
+        sigma = float(returns.std(ddof=1))
+        risk = monte_carlo_risk(history[-1], config['days'], mu, sigma,
+                                runs=config['runs'], confidence=config['confidence'],
+                                percentiles=config['percentiles'], seed=seed,
+                                max_memory_mb=config['max_memory_mb'])
+        return symbol, {
+            'mu': round(mu, 6),
+            'sigma': round(sigma, 6),
+            'startPrice': round(risk['startPrice'], 2),
+            'meanPrice': round(risk['meanPrice'], 2),
+            'var99': round(risk['var'], 2),
+            'cvar': round(risk['cvar'], 2),
+            'percentiles': {k: round(v, 2) for k, v in risk['percentiles'].items()},
+        }
+    except Exception as e:
+        print(f"{symbol}: {e}")
+        return symbol, None
+
+
+def run_universe_risk(prices, days=365, runs=10_000, confidence=0.99, percentiles=DEFAULT_PERCENTILES,
+                      processes=None, seed=None, min_history=30, max_memory_mb=64):
+    """
+    Monte Carlo risk for many symbols, fanned out across a process pool.
+
+    The price matrix is placed in shared memory once, so workers read it
+    directly instead of receiving a pickled copy per task. Each symbol gets
+    its own child seed, which keeps results reproducible regardless of how
+    tasks are scheduled. Returns a dict symbol -> risk summary; symbols with
+    too little history are left out.
+    """
+    symbols, matrix = build_price_matrix(prices)
+    if not symbols or matrix.size == 0:
+        return {}
+
+    config = {
+        'days': days,
+        'runs': runs,
+        'confidence': confidence,
+        'percentiles': tuple(percentiles),
+        'min_history': min_history,
+        'max_memory_mb': max_memory_mb,
+    }
+    seeds = np.random.SeedSequence(seed).spawn(len(symbols))
+    tasks = [(i, symbol, seeds[i]) for i, symbol in enumerate(symbols)]
+
+    shm = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+    try:
+        shape = matrix.shape
+        np.ndarray(shape, dtype=np.float64, buffer=shm.buf)[:] = matrix
+        del matrix
+        processes = processes or os.cpu_count()
+        chunksize = max(len(tasks) // (processes * 4), 1)
+        with Pool(processes, initializer=_init_worker, initargs=(shm.name, shape, config)) as pool:
+            results = dict(pool.imap_unordered(_simulate_symbol, tasks, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return {symbol: results[symbol] for symbol in symbols if results.get(symbol) is not None}
+
+
+def load_closes(symbol, start_date, end_date):
+    return load_prices(symbol, start_date, end_date)['Adj Close'].dropna().to_numpy(dtype=np.float64)
+
+
+async def main():
+    symbols = list(dict.fromkeys(sys.argv[1:] or ['GME']))
+    end_date = datetime.today()
+    start_date = end_date - timedelta(days=365)
+    # Served from the shared price cache, so a daily run only downloads the newest bars
+    closes, stats = await fetch_all(load_closes, symbols, start_date.strftime("%Y-%m-%d"),
+                                    end_date.strftime("%Y-%m-%d"), concurrency=16)
+    summarize(stats)
+    prices = {symbol: history for symbol, history in closes.items() if history is not None}
+
+    results = run_universe_risk(prices)
+    path = save_results('monte-carlo', results, end_date.strftime("%Y-%m-%d"))
+    print(f"Saved {len(results)} symbols to {path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
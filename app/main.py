@@ -1,9 +1,90 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+
+from utils.cache import Cache, redis_backend
+from utils.payload import FORMATS
+from utils.results_store import ResultsStore, not_modified, result_from_bytes, result_to_bytes
+
+# Seconds between checks for new batch outputs on disk
+REFRESH_INTERVAL = 60
+
+store = ResultsStore()
+# Compact Prophet encodings, shared through redis when REDIS_URL is set, otherwise per process
+cache = Cache(redis_backend(os.environ['REDIS_URL']) if os.environ.get('REDIS_URL') else None,
+              dumps=result_to_bytes, loads=result_from_bytes)
+
+
+async def refresh_results():
+    while True:
+        await asyncio.sleep(REFRESH_INTERVAL)
+        await asyncio.to_thread(store.load)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # File reads and decoding run on a worker thread, never on the event loop
+    await asyncio.to_thread(store.load)
+    task = asyncio.create_task(refresh_results())
+    yield
+    task.cancel()
+
 
 # Create an instance of FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+
+async def cached_result(kind, symbol, format='json'):
+    # Prebuilt results are already bytes in memory; a cache tier in front would only add a round-trip
+    if kind != 'prophet':
+        return store.get(kind, symbol)
+    if format == 'json':
+        return store.forecast(symbol)
+    # Compact encodings are computed per symbol, so those go through the cache.
+    # The store version is in the key, so a reload is never hidden behind a long after-close TTL
+    key = f"{kind}:{store.version(kind)}:{symbol.upper()}:{format}"
+    return await cache.get(key, lambda: asyncio.to_thread(store.forecast, symbol, format))
+
+
+def respond(result, if_none_match, if_modified_since):
+    if result is None:
+        raise HTTPException(status_code=404, detail="No result for this symbol")
+    headers = {'ETag': result.etag, 'Last-Modified': result.last_modified, 'Cache-Control': 'no-cache'}
+    if not_modified(result, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+    # The body was serialized once (orjson, by the store or on a cache miss), never per request
+    return Response(content=result.body, media_type=result.media_type, headers=headers)
+
 
 # Define a route for the root URL ("/")
 @app.get("/")
 def read_root():
-    return {"message": "Hello, World!"}
\ No newline at end of file
+    return {"message": "Hello, World!"}
+
+
+@app.get("/ai-score/{symbol}")
+async def ai_score(symbol: str, if_none_match: str | None = Header(None), if_modified_since: str | None = Header(None)):
+    return respond(await cached_result('ai-score', symbol), if_none_match, if_modified_since)
+
+
+@app.get("/trend/{symbol}")
+async def trend(symbol: str, if_none_match: str | None = Header(None), if_modified_since: str | None = Header(None)):
+    return respond(await cached_result('trend', symbol), if_none_match, if_modified_since)
+
+
+@app.get("/fundamental/{symbol}")
+async def fundamental(symbol: str, if_none_match: str | None = Header(None), if_modified_since: str | None = Header(None)):
+    return respond(await cached_result('fundamental', symbol), if_none_match, if_modified_since)
+
+
+@app.get("/monte-carlo/{symbol}")
+async def monte_carlo(symbol: str, if_none_match: str | None = Header(None), if_modified_since: str | None = Header(None)):
+    return respond(await cached_result('monte-carlo', symbol), if_none_match, if_modified_since)
+
+
+@app.get("/prophet/{symbol}")
+async def prophet(symbol: str, format: str = Query('json', pattern='^(' + '|'.join(('json',) + FORMATS) + ')$'),
+                  if_none_match: str | None = Header(None), if_modified_since: str | None = Header(None)):
+    return respond(await cached_result('prophet', symbol, format), if_none_match, if_modified_since)
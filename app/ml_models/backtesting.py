@@ -1,5 +1,6 @@
 from sklearn.metrics import explained_variance_score,r2_score
 #from sklearn.metrics import mean_squared_error
+import numpy as np
 import pandas as pd
 
 class Backtesting:
@@ -54,4 +55,132 @@ class Backtesting:
 
 		res=res.reset_index(drop=True)
 		
-		return res
\ No newline at end of file
+		return res
+
+
+def predicted_returns(predicted_prices, prices):
+	'''
+	Signal for price forecasts (regression_model): the return the forecast implies
+	over the current price. Both arrays are aligned on the decision date.
+	'''
+	return np.asarray(predicted_prices, dtype=np.float64) / np.asarray(prices, dtype=np.float64) - 1
+
+
+def sweep_positions(signals, thresholds, horizons=(1,), short_thresholds=None):
+	'''
+	Positions for every (horizon, threshold) pair at once, shape (H, P, T, S), as int8.
+
+	`signals` is (T, S): one column per symbol, e.g. TrendPredictor probabilities,
+	ScorePredictor scores or predicted returns. A signal >= thresholds[p] opens a long
+	trade (and <= short_thresholds[p] a short one) that is held for horizons[h] bars;
+	overlapping trades are netted and clipped to [-1, 1]. NaN signals open nothing.
+	'''
+	signals = np.asarray(signals, dtype=np.float64)
+	if signals.ndim == 1:
+		signals = signals[:, None]
+	thresholds = np.asarray(thresholds, dtype=np.float64)[:, None, None]
+	horizons = np.asarray(horizons, dtype=np.int64)
+
+	entries = (signals >= thresholds).astype(np.int32)
+	if short_thresholds is not None:
+		entries -= signals <= np.asarray(short_thresholds, dtype=np.float64)[:, None, None]
+
+	# Trades open in (t - h, t] are cs[t + 1] - cs[t + 1 - h], for all horizons in one gather
+	T = signals.shape[0]
+	cs = np.concatenate([np.zeros_like(entries[:, :1]), np.cumsum(entries, axis=1)], axis=1)
+	start = np.maximum(np.arange(1, T + 1)[None, :] - horizons[:, None], 0)
+	open_trades = np.moveaxis(cs[:, start], 1, 0)
+	np.subtract(cs[None, :, 1:], open_trades, out=open_trades)
+	return np.clip(open_trades, -1, 1).astype(np.int8)
+
+
+def backtest(prices, positions, cost_bps=5.0):
+	'''
+	Vectorized backtest of `positions` (..., T, S) against close `prices` (T, S).
+
+	The position decided at the close of bar t earns the return of bar t + 1. Each
+	change of position pays `cost_bps` per unit traded. Leading dimensions of
+	`positions` (e.g. horizons and thresholds from sweep_positions) are evaluated in
+	the same array operations. Returns a dict of arrays: 'returns' (net, per bar),
+	'equity', 'drawdown', 'turnover' and 'costs' with the shape of `positions`.
+	'''
+	prices = np.asarray(prices, dtype=np.float64)
+	if prices.ndim == 1:
+		prices = prices[:, None]
+	asset_returns = np.zeros_like(prices)
+	asset_returns[1:] = prices[1:] / prices[:-1] - 1
+	asset_returns[~np.isfinite(asset_returns)] = 0.0
+
+	positions = np.asarray(positions)
+	listed = np.isfinite(prices)
+	if not listed.all():
+		# No position can be held on a bar without a price
+		positions = positions * listed.astype(positions.dtype)
+
+	turnover = np.abs(np.diff(positions, axis=-2, prepend=np.zeros_like(positions[..., :1, :])))
+	costs = turnover * (cost_bps / 1e4)
+	returns = np.empty(positions.shape)
+	returns[..., 0, :] = 0.0
+	np.multiply(positions[..., :-1, :], asset_returns[1:], out=returns[..., 1:, :])
+	returns -= costs
+	return _curves(returns, turnover, costs)
+
+
+def _curves(returns, turnover, costs):
+	equity = returns + 1
+	np.cumprod(equity, axis=-2, out=equity)
+	drawdown = np.maximum.accumulate(equity, axis=-2)
+	np.divide(equity, drawdown, out=drawdown)
+	drawdown -= 1
+	return {'returns': returns, 'equity': equity, 'drawdown': drawdown, 'turnover': turnover, 'costs': costs}
+
+
+def performance(result, periods_per_year=252):
+	'''
+	Summary statistics of a backtest() result, reduced over the time axis.
+	'''
+	returns = result['returns']
+	n = returns.shape[-2]
+	mean = returns.mean(axis=-2)
+	std = returns.std(axis=-2)
+	downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2, axis=-2))
+	total = result['equity'][..., -1, :] - 1
+	with np.errstate(divide='ignore', invalid='ignore'):
+		return {
+			'total_return': total,
+			'cagr': np.power(1 + total, periods_per_year / n) - 1,
+			'volatility': std * np.sqrt(periods_per_year),
+			'sharpe': np.where(std > 0, mean / std, np.nan) * np.sqrt(periods_per_year),
+			'sortino': np.where(downside > 0, mean / downside, np.nan) * np.sqrt(periods_per_year),
+			'max_drawdown': result['drawdown'].min(axis=-2),
+			'turnover': result['turnover'].sum(axis=-2) * periods_per_year / n,
+			'cost_drag': result['costs'].sum(axis=-2) * periods_per_year / n,
+		}
+
+
+def run_sweep(prices, signals, thresholds, horizons=(1,), short_thresholds=None, cost_bps=5.0, symbols=None, periods_per_year=252):
+	'''
+	Backtest every (horizon, threshold, symbol) combination plus an equal-weight
+	portfolio per (horizon, threshold), and return the statistics as a DataFrame
+	indexed by (horizon, threshold, symbol).
+
+		stats = run_sweep(closes, probabilities, thresholds=[0.5, 0.55, 0.6], horizons=[5, 20, 60], symbols=tickers)
+		stats.xs('portfolio', level='symbol').sort_values('sharpe')
+	'''
+	prices = np.asarray(prices, dtype=np.float64)
+	if prices.ndim == 1:
+		prices = prices[:, None]
+	positions = sweep_positions(signals, thresholds, horizons, short_thresholds)
+	result = backtest(prices, positions, cost_bps)
+	stats = performance(result, periods_per_year)
+
+	# Equal-weight portfolio over the symbols that have a price on each bar
+	listed = np.isfinite(prices)
+	weights = listed / np.maximum(listed.sum(axis=1, keepdims=True), 1)
+	portfolio = _curves(*((result[name] * weights).sum(axis=-1, keepdims=True) for name in ('returns', 'turnover', 'costs')))
+	portfolio_stats = performance(portfolio, periods_per_year)
+
+	symbols = list(symbols) if symbols is not None else list(range(prices.shape[1]))
+	columns = {name: np.concatenate([stats[name], portfolio_stats[name]], axis=-1).ravel() for name in stats}
+	index = pd.MultiIndex.from_product([list(horizons), list(thresholds), symbols + ['portfolio']], names=['horizon', 'threshold', 'symbol'])
+	return pd.DataFrame(columns, index=index)
@@ -1,5 +1,5 @@
-import yfinance as yf
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 from sklearn.ensemble import RandomForestClassifier
 #from sklearn.model_selection import GridSearchCV
@@ -18,36 +18,84 @@ from sklearn.feature_selection import SelectKBest, f_classif
 import asyncio
 import aiohttp
 import pickle
+import copy
 import time
+import os
+import sys
+import orjson
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.base import clone
 
 import argparse
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.feature_store import FeatureStore
+from utils.market_data import load_prices
+from utils.ingestion import fetch_all, summarize
+from utils.dataset_builder import DatasetBuilder
+from utils.results_store import save_results
+from utils.model_registry import registry
+from utils.preprocessing import PreprocessingPipeline, pipeline_path, load_pipeline
+from utils.tree_export import export_model, load_exported, exported_meta_path, exported_size
+
 # Set up argument parser
 parser = argparse.ArgumentParser(description="Train and test process script.")
 parser.add_argument('--train', action='store_true', help="Set to True to run training")
+parser.add_argument('--walk-forward', action='store_true', help="Only refit horizons on data that arrived since their last training run")
 
 # Parse the arguments
 args = parser.parse_args()
 
 
-async def download_data(ticker, start_date, end_date, nth_day):
-    try:
-        df = yf.download(ticker, start=start_date, end=end_date, interval="1d")
-        df = df.rename(columns={'Adj Close': 'close', 'Open': 'open', 'High': 'high', 'Low': 'low', 'Volume': 'volume', 'Date': 'date'})
+HORIZONS = [5, 20, 60]
+BEST_FEATURES = ['close','williams','fi','emv','adi','cmf','bb_hband','bb_lband','vpt','stoch','stoch_rsi','rsi','nvi','macd','mfi','cci','obv','adx','adx_pos','adx_neg']
+# Rows before the first new date that generate_features sees on a daily append. The longest window
+# is MACD's 26+9 EMAs; the EMA and Wilder-smoothed indicators (macd, rsi, adx, fi) also need the cut
+# to decay, which after 400 rows leaves them within 1e-10 of the column's scale of a full recompute
+FEATURE_LOOKBACK = 400
+# Running totals that restart at the cut, continued from the cached value
+CUMULATIVE_FEATURES = {'obv': 'sum', 'adi': 'sum', 'vpt': 'sum', 'nvi': 'product'}
+
+
+def add_targets(df, horizons):
+    """
+    Target_{n} for every horizon n, from one shared price frame. 'rows_left' counts the
+    rows after each one, so a Target_{n} is only a real label where rows_left >= n.
+    """
+    for nth_day in horizons:
+        df[f"Target_{nth_day}"] = ((df["close"].shift(-nth_day) > df["close"])).astype(int)
+    df['rows_left'] = np.arange(len(df))[::-1]
+    return df
+
+
+def load_data(ticker, start_date, end_date, nth_day=None):
+    df = load_prices(ticker, start_date, end_date)
+    df = df.rename(columns={'Adj Close': 'close', 'Open': 'open', 'High': 'high', 'Low': 'low', 'Volume': 'volume', 'Date': 'date'})
+    if nth_day is not None:
         df["Target"] = ((df["close"].shift(-nth_day) > df["close"])).astype(int)
-        df_copy = df.copy()
-        if len(df_copy) > 252*2: #At least 2 years of history is necessary
-            return df_copy
+    df_copy = df.copy()
+    if len(df_copy) > 252*2: #At least 2 years of history is necessary
+        return df_copy
+
+
+async def download_data(ticker, start_date, end_date, nth_day=None):
+    try:
+        return await asyncio.to_thread(load_data, ticker, start_date, end_date, nth_day)
     except Exception as e:
         print(e)
 
 
 class TrendPredictor:
-    def __init__(self, nth_day, path="ml_models/weights"):
-        self.model = RandomForestClassifier(n_estimators=500, max_depth = 10, min_samples_split=10, random_state=42, n_jobs=10)
-        self.scaler = MinMaxScaler()
+    def __init__(self, nth_day, path="ml_models/weights", n_jobs=10):
+        self.model = RandomForestClassifier(n_estimators=500, max_depth = 10, min_samples_split=10, random_state=42, n_jobs=n_jobs)
+        self.pipeline = PreprocessingPipeline(MinMaxScaler())
         self.nth_day = nth_day
+        self.n_jobs = n_jobs
         self.path = path
+        self.weights_path = f'{path}/model_weights_{nth_day}.pkl'
+        self.export_path = f'{path}/model_weights_{nth_day}_flat'
+        self.state_path = f'{path}/model_weights_{nth_day}_state.json'
 
     def generate_features(self, df):
         new_predictors = []
@@ -89,6 +137,10 @@ class TrendPredictor:
         new_predictors+=['williams','fi','emv','cmf','adi','bb_hband','bb_lband','vpt','stoch','stoch_rsi','rsi','nvi','obv','macd','macd_signal','macd_hist','adx','adx_pos','adx_neg','cci','mfi']
         return new_predictors
 
+    def feature_frame(self, df):
+        self.generate_features(df)
+        return df
+
     def feature_selection(self, df, predictors):
         X = df[predictors]
         y = df['Target']
@@ -101,22 +153,61 @@ class TrendPredictor:
 
         return selected_features
 
-    def train_model(self, X_train, y_train):
-        X_train = np.where(np.isinf(X_train), np.nan, X_train)
-        X_train = np.nan_to_num(X_train)
+    def save_model(self):
+        pickle.dump(self.model, open(self.weights_path, 'wb'))
+        export_model(self.model, self.export_path)
+        self.pipeline.save(pipeline_path(self.weights_path))
 
-        X_train = self.scaler.fit_transform(X_train)
+    def train_model(self, X_train, y_train):
+        X_train = self.pipeline.fit_transform(X_train)
         self.model.fit(X_train, y_train)
-        pickle.dump(self.model, open(f'{self.path}/model_weights_{self.nth_day}.pkl', 'wb'))
+        self.save_model()
+
+    def refit_model(self, X_window, y_window, n_trees=50):
+        """
+        Walk-forward update: the oldest `n_trees` trees of the saved forest are replaced by
+        trees grown on the latest window only, reusing the saved preprocessing.
+        """
+        forest = registry.get(('trend', self.nth_day, None), self.weights_path)
+        self.pipeline = load_pipeline(('trend-preprocess', self.nth_day, None), self.weights_path)
+        X_window = self.pipeline.transform(X_window)
+
+        state = self.load_state() or {}
+        fresh = clone(forest).set_params(n_estimators=n_trees, n_jobs=self.n_jobs,
+                                         random_state=42 + state.get('refits', 0) + 1)
+        fresh.fit(X_window, y_window)
+        if not np.array_equal(fresh.classes_, forest.classes_):
+            raise ValueError(f"Refit window has classes {fresh.classes_}, the model {forest.classes_}")
+
+        self.model = copy.copy(forest)
+        self.model.estimators_ = forest.estimators_[n_trees:] + fresh.estimators_
+        self.model.n_estimators = len(self.model.estimators_)
+        self.save_model()
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path, 'rb') as file:
+            return orjson.loads(file.read())
+
+    def save_state(self, **state):
+        with open(self.state_path, 'wb') as file:
+            file.write(orjson.dumps(state))
 
     def evaluate_model(self, X_test, y_test):
-        X_test = np.where(np.isinf(X_test), np.nan, X_test)
-        X_test = np.nan_to_num(X_test)
-
-        X_test = self.scaler.fit_transform(X_test)
-
-        with open(f'{self.path}/model_weights_{self.nth_day}.pkl', 'rb') as f:
-            self.model = pickle.load(f)
+        pipeline = load_pipeline(('trend-preprocess', self.nth_day, None), self.weights_path)
+        if pipeline is None:
+            print(f"No saved preprocessing for {self.weights_path}, fitting on the test data")
+            pipeline = self.pipeline.fit(X_test)
+        X_test = pipeline.transform(X_test)
+
+        if os.path.exists(exported_meta_path(self.export_path)):
+            # Memory-mapped flat trees load in milliseconds instead of unpickling 500 estimators
+            self.model = registry.get(('trend', self.nth_day, 'flat'), exported_meta_path(self.export_path),
+                                      loader=lambda path: load_exported(os.path.dirname(path)),
+                                      sizer=lambda path: exported_size(os.path.dirname(path)))
+        else:
+            self.model = registry.get(('trend', self.nth_day, None), self.weights_path)
 
         test_predictions = self.model.predict(X_test)
         #test_predictions[test_predictions >=.55] = 1
@@ -143,46 +234,125 @@ class TrendPredictor:
         return {'accuracy': round(test_accuracy*100), 'precision': round(test_precision*100), 'sentiment': 'Bullish' if next_value_prediction == 1 else 'Bearish'}
 
 
+def trend_results(test_sets, horizons=HORIZONS, path="ml_models/weights"):
+    """
+    {symbol: [{'nth_day', 'accuracy', 'precision', 'sentiment'}, ...]}: the saved model of every
+    horizon evaluated on each symbol's labelled test rows, as /trend/{symbol} serves it.
+    """
+    predictors = {nth_day: TrendPredictor(nth_day=nth_day, path=path) for nth_day in horizons}
+    results = {}
+    for symbol, df in test_sets.items():
+        try:
+            rows = []
+            for nth_day, predictor in predictors.items():
+                labelled = df[df['rows_left'] >= nth_day]
+                if len(labelled):
+                    metrics = predictor.evaluate_model(labelled[BEST_FEATURES], labelled[f"Target_{nth_day}"])
+                    rows.append({'nth_day': nth_day, **metrics})
+            if rows:
+                results[symbol] = rows
+        except Exception as e:
+            print(f"{symbol}: {e}")
+    return results
+
+
 #Train mode
 
-async def train_process(nth_day):
+def train_horizon(nth_day, df_train, df_test, features, walk_forward=False, n_jobs=10,
+                  min_new_rows=100, window_days=365, refit_trees=50):
+    """
+    Train (or walk-forward refit) the model of one horizon from the shared dataset.
+
+    Only rows whose Target_{nth_day} is known are used. With `walk_forward`, a model that
+    already exists is first evaluated on the labelled rows that arrived since its last run
+    and then refit on the trailing `window_days` window instead of the full history.
+    """
+    predictor = TrendPredictor(nth_day=nth_day, n_jobs=n_jobs)
+    target = f"Target_{nth_day}"
+    df_train = df_train[df_train['rows_left'] >= nth_day]
+    df_test = df_test[df_test['rows_left'] >= nth_day]
+    trained_through = max(df_train['date'].max(), df_test['date'].max())
+
+    state = predictor.load_state()
+    if walk_forward and state is not None and os.path.exists(predictor.weights_path):
+        labelled = pd.concat([df_train, df_test], ignore_index=True)
+        new_rows = labelled[labelled['date'] > pd.Timestamp(state['trained_through'])]
+        if len(new_rows) < min_new_rows:
+            print(f"{nth_day}-day model: {len(new_rows)} new rows, no refit")
+            return {'nth_day': nth_day, 'refit': False}
+
+        print(f"{nth_day}-day model: evaluating on {len(new_rows)} new rows")
+        metrics = predictor.evaluate_model(new_rows[features], new_rows[target])
+        window = labelled[labelled['date'] > trained_through - pd.Timedelta(days=window_days)]
+        predictor.refit_model(window[features], window[target], n_trees=refit_trees)
+        predictor.save_state(trained_through=str(trained_through.date()), refits=state.get('refits', 0) + 1)
+        return {'nth_day': nth_day, 'refit': True, **metrics}
+
+    df_train = df_train.sample(frac=1).reset_index(drop=True)
+    predictor.train_model(df_train[features], df_train[target])
+    metrics = predictor.evaluate_model(df_test[features], df_test[target])
+    predictor.save_state(trained_through=str(trained_through.date()), refits=0)
+    return {'nth_day': nth_day, 'refit': True, **metrics}
+
+
+async def train_process(horizons=HORIZONS, walk_forward=False):
+    """
+    Download and featurize every ticker once, then train all horizons in parallel processes.
+    """
     tickers =['KO','WMT','BA','PLD','AZN','LLY','INFN','GRMN','VVX','EPD','PII','WY','BLMN','AAP','ON','TGT','SMG','EL','EOG','ULTA','DV','PLNT','GLOB','LKQ','CWH','PSX','SO','TGT','GD','MU','NKE','AMGN','BX','CAT','PEP','LIN','ABBV','COST','MRK','HD','JNJ','PG','SPCB','CVX','SHEL','MS','GS','MA','V','JPM','XLF','DPZ','CMG','MCD','ALTM','PDD','MNST','SBUX','AMAT','ZS','IBM','SMCI','ORCL','XLK','VUG','VTI','VOO','IWM','IEFA','PEP','WMT','XOM','V','AVGO','BIDU','GOOGL','SNAP','DASH','SPOT','NVO','META','MSFT','ADBE','DIA','PFE','BAC','RIVN','NIO','CISS','INTC','AAPL','BYND','MSFT','HOOD','MARA','SHOP','CRM','PYPL','UBER','SAVE','QQQ','IVV','SPY','EVOK','GME','F','NVDA','AMD','AMZN','TSM','TSLA']
     tickers = list(set(tickers))
     #print(len(tickers))
 
-    df_train = pd.DataFrame()
-    df_test = pd.DataFrame()
-    best_features = ['close','williams','fi','emv','adi','cmf','bb_hband','bb_lband','vpt','stoch','stoch_rsi','rsi','nvi','macd','mfi','cci','obv','adx','adx_pos','adx_neg']
     test_size = 0.2
     start_date = datetime(2000, 1, 1).strftime("%Y-%m-%d")
     end_date = datetime.today().strftime("%Y-%m-%d")
-    predictor = TrendPredictor(nth_day=nth_day)
+    predictor = TrendPredictor(nth_day=horizons[0])
+    store = FeatureStore()
     
-    tasks = [download_data(ticker, start_date, end_date, nth_day) for ticker in tickers]
-    dfs = await asyncio.gather(*tasks)
-
-    for df in dfs:
-        try:
-            predictors = predictor.generate_features(df)
-            predictors = [pred for pred in predictors if pred in df.columns]
+    dfs, stats = await fetch_all(load_data, tickers, start_date, end_date, concurrency=16)
+    summarize(stats)
+
+    builder = DatasetBuilder(test_size=test_size)
+    for ticker, df in dfs.items():
+        if df is None:
+            builder.fail(ticker, stats[ticker]['error'] or "less than 2 years of history")
+            continue
+        with builder.symbol(ticker):
+            df = store.get(ticker, df, predictor.feature_frame, depends=[TrendPredictor.generate_features],
+                           lookback=FEATURE_LOOKBACK, cumulative=CUMULATIVE_FEATURES)
+            df = add_targets(df, horizons)
             df = df.dropna(subset=df.columns[df.columns != "nth_day"])
-            split_size = int(len(df) * (1-test_size))
-            train_data = df.iloc[:split_size]
-            test_data = df.iloc[split_size:]
-            df_train = pd.concat([df_train, train_data], ignore_index=True)
-            df_test = pd.concat([df_test, test_data], ignore_index=True)
-        except:
-            pass
+            builder.add(ticker, df.rename_axis('date').reset_index())
 
-
-    df_train = df_train.sample(frac=1).reset_index(drop=True)
+    df_train, df_test = builder.build()
+    builder.report()
     #df_train.to_csv('train_set.csv')
     #df_test.to_csv('test_set.csv')
-    predictor.train_model(df_train[best_features], df_train['Target'])
-    predictor.evaluate_model(df_test[best_features], df_test['Target'])
+
+    # Each process gets only the columns its horizon needs and an equal share of the cores
+    n_jobs = max(1, (os.cpu_count() or 1) // len(horizons))
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=len(horizons)) as executor:
+        jobs = []
+        for nth_day in horizons:
+            columns = ['date', 'rows_left', f"Target_{nth_day}"] + BEST_FEATURES
+            jobs.append(loop.run_in_executor(executor, partial(
+                train_horizon, nth_day, df_train[columns], df_test[columns], BEST_FEATURES,
+                walk_forward=walk_forward, n_jobs=n_jobs)))
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+
+    for nth_day, result in zip(horizons, results):
+        if isinstance(result, Exception):
+            print(f"{nth_day}-day model failed: {result}")
+        else:
+            print(result)
+
+    trends = trend_results(builder.test_sets(), horizons)
+    print(f"Saved {len(trends)} symbols to {save_results('trend', trends, end_date)}")
+    return results
 
 async def test_process(nth_day):
-    best_features = ['close','williams','fi','emv','adi','cmf','bb_hband','bb_lband','vpt','stoch','stoch_rsi','rsi','nvi','macd','mfi','cci','obv','adx','adx_pos','adx_neg']
+    best_features = BEST_FEATURES
     test_size = 0.2
     start_date = datetime(2000, 1, 1).strftime("%Y-%m-%d")
     end_date = datetime.today().strftime("%Y-%m-%d")
@@ -198,8 +368,7 @@ async def test_process(nth_day):
 
 
 async def main():
-    for nth_day in [5, 20, 60]:
-        await train_process(nth_day)
+    await train_process(HORIZONS, walk_forward=args.walk_forward)
     await test_process(nth_day=5)
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# classification.py parses the command line on import
+sys.argv = sys.argv[:1]
+from utils.feature_store import FeatureStore
+from ml_models.classification import TrendPredictor, FEATURE_LOOKBACK, CUMULATIVE_FEATURES
+
+# Check of the daily FeatureStore append used by classification.train_process: after a
+# one-bar append, the feature function must only have seen the new bar plus
+# FEATURE_LOOKBACK rows of warm-up, and the appended rows (running totals included)
+# must match a full recompute of generate_features.
+# Exits with status 1 on any failure.
+#
+#   python ml_models/feature_store_check.py
+
+APPENDS = 30
+RTOL = 1e-8
+
+
+def synthetic_ohlcv(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.cumprod(1 + rng.normal(0.0003, 0.02, n))
+    spread = np.abs(rng.normal(0, 0.01, n))
+    return pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.005, n)),
+        'high': close * (1 + spread),
+        'low': close * (1 - spread),
+        'close': close,
+        'volume': rng.integers(100_000, 10_000_000, n).astype(float),
+    }, index=pd.bdate_range('2010-01-04', periods=n))
+
+
+def main():
+    df = synthetic_ohlcv(2000)
+    predictor = TrendPredictor(nth_day=5)
+    rows_seen = []
+
+    def counted(frame):
+        rows_seen.append(len(frame))
+        return predictor.feature_frame(frame)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as workdir:
+        store = FeatureStore(workdir)
+        options = dict(depends=[TrendPredictor.generate_features], lookback=FEATURE_LOOKBACK,
+                       cumulative=CUMULATIVE_FEATURES)
+        store.get('X', df.iloc[:-APPENDS], counted, **options)
+        for end in range(len(df) - APPENDS + 1, len(df) + 1):
+            rows_seen.clear()
+            features = store.get('X', df.iloc[:end], counted, **options)
+            if rows_seen != [FEATURE_LOOKBACK + 1]:
+                print(f"append to {end} rows: feature function saw {rows_seen} rows, expected [{FEATURE_LOOKBACK + 1}]")
+                failed = True
+
+    full = predictor.feature_frame(df.copy())
+    for column in features.columns.difference(df.columns):
+        expected = full[column].to_numpy()[-APPENDS:]
+        actual = features[column].to_numpy()[-APPENDS:]
+        scale = np.nanmax(np.abs(full[column].to_numpy()))
+        if not np.allclose(actual, expected, rtol=0, atol=RTOL * scale, equal_nan=True):
+            print(f"{column}: appended rows differ from a full recompute")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print(f"{APPENDS} one-bar appends each computed {FEATURE_LOOKBACK + 1} rows and match a full recompute")
+
+
+if __name__ == "__main__":
+    main()
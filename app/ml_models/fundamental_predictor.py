@@ -2,7 +2,6 @@ import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 from sklearn.ensemble import RandomForestClassifier
-import numpy as np
 from xgboost import XGBClassifier
 from sklearn.metrics import precision_score, recall_score, f1_score, roc_auc_score, accuracy_score
 from sklearn.model_selection import train_test_split
@@ -25,13 +24,20 @@ import aiohttp
 import aiofiles
 import pickle
 import time
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.model_registry import registry
+from utils.preprocessing import PreprocessingPipeline, pipeline_path, load_pipeline
 
 # Based on the paper: https://arxiv.org/pdf/1603.00751
 
 
 class FundamentalPredictor:
     def __init__(self):
-        self.scaler = MinMaxScaler()
+        self.pipeline = PreprocessingPipeline(MinMaxScaler())
+        self.weights_path = 'ml_models/weights/fundamental_weights/weights.keras'
         self.model = self.build_model()
 
     def build_model(self):
@@ -80,19 +86,21 @@ class FundamentalPredictor:
 
     def preprocess_data(self, X):
         # X = X.applymap(lambda x: 9999 if x == 0 else x)  # Replace 0 with 9999 as suggested in the paper
-        X = np.where(np.isinf(X), np.nan, X)
-        X = np.nan_to_num(X)
-        X = self.scaler.fit_transform(X)
-        return X
+        pipeline = load_pipeline(('fundamental-preprocess', None, 'keras'), self.weights_path)
+        if pipeline is None:
+            print(f"No saved preprocessing for {self.weights_path}, fitting on the test data")
+            pipeline = self.pipeline.fit(X)
+        return pipeline.transform(X)
 
     def reshape_for_lstm(self, X):
         return X.reshape((X.shape[0], X.shape[1], 1))
 
     def train_model(self, X_train, y_train):
-        X_train = self.preprocess_data(X_train)
+        X_train = self.pipeline.fit_transform(X_train)
+        self.pipeline.save(pipeline_path(self.weights_path))
         #X_train = self.reshape_for_lstm(X_train)
         
-        checkpoint = ModelCheckpoint('ml_models/weights/fundamental_weights/weights.keras', 
+        checkpoint = ModelCheckpoint(self.weights_path, 
                                       save_best_only=True, save_freq = 1,
                                       monitor='val_loss', mode='min')
         early_stopping = EarlyStopping(monitor='val_loss', patience=70, restore_best_weights=True)
@@ -100,13 +108,13 @@ class FundamentalPredictor:
 
         self.model.fit(X_train, y_train, epochs=100_000, batch_size=32, 
                        validation_split=0.1, callbacks=[checkpoint, early_stopping, reduce_lr])
-        self.model.save('ml_models/weights/fundamental_weights/weights.keras')
+        self.model.save(self.weights_path)
 
     def evaluate_model(self, X_test, y_test):
         X_test = self.preprocess_data(X_test)
         X_test = self.reshape_for_lstm(X_test)
         
-        self.model = load_model('ml_models/weights/fundamental_weights/weights.keras')
+        self.model = registry.get(('fundamental', None, 'keras'), self.weights_path, loader=load_model)
         
         test_predictions = self.model.predict(X_test).flatten()
         
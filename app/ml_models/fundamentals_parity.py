@@ -0,0 +1,105 @@
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
+import orjson
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.fundamentals import STATEMENTS, DROP_KEYS, decode_fundamentals
+
+# Parity check of utils/fundamentals.decode_fundamentals against the merge loop it
+# replaced in ml_models/test.py, on synthetic statement blobs whose report dates do
+# not line up (statements missing quarters, shifted by a row, listing a date twice)
+# and whose fields overlap between statements, including the rows left after the old
+# dropna() over every field. Exits with status 1 on any mismatch.
+#
+#   python ml_models/fundamentals_parity.py
+
+
+def old_loader(blobs, min_year=2000):
+    # The per-key merge loop of the previous ml_models/test.py download_data
+    statements = [[{k: v for k, v in item.items() if k not in DROP_KEYS}
+                   for item in orjson.loads(blobs[name]) if int(item["date"][:4]) >= min_year]
+                  for name in STATEMENTS]
+    combined_data = defaultdict(dict)
+    for entries in zip(*statements):
+        for entry in entries:
+            date = entry['date']
+            for key, value in entry.items():
+                if key not in combined_data[date]:
+                    combined_data[date][key] = value
+    return pd.DataFrame(sorted(combined_data.values(), key=lambda x: x['date']))
+
+
+def quarter_ends(n, start=1998):
+    return [f"{start + q // 4}-{3 * (q % 4) + 3:02d}-{(31, 30, 30, 31)[q % 4]}" for q in range(n)]
+
+
+def synthetic_blobs(seed, n=60, missing=0.05, extra_fields=True):
+    rng = np.random.default_rng(seed)
+    dates = quarter_ends(n)
+    shared = ['revenue', 'ebitda', 'eps']
+    blobs = {}
+    for s, name in enumerate(STATEMENTS):
+        statement_dates = list(dates)
+        if s % 3 == 1:
+            # Missing quarters: later reports shift up a row against the other statements
+            for i in sorted(rng.choice(n, 5, replace=False), reverse=True):
+                del statement_dates[i]
+        if s % 3 == 2:
+            # A quarter listed twice, the second entry with an extra field
+            i = int(rng.integers(5, n - 5))
+            statement_dates.insert(i + 1, statement_dates[i])
+        items = []
+        for i, date in enumerate(statement_dates):
+            item = {'date': date, 'symbol': 'X', 'period': 'Q'}
+            for key in shared[:1 + s % 3] + [f"{name}_{k}" for k in range(4)]:
+                if rng.random() > missing:
+                    item[key] = round(float(rng.normal(100, 30)), 4)
+            if extra_fields and i and statement_dates[i - 1] == date:
+                item[f"{name}_late"] = 1.0
+            items.append(item)
+        blobs[name] = orjson.dumps(items[::-1] if s == 0 else items)
+    return blobs
+
+
+def compare(expected, actual):
+    if list(expected['date']) != list(actual['date']):
+        return "report dates differ"
+    if set(expected.columns) != set(actual.columns):
+        return f"columns differ: {sorted(set(expected.columns) ^ set(actual.columns))}"
+    bad = [column for column in expected.columns if column != 'date' and not np.allclose(
+        expected[column].to_numpy(dtype=np.float64), actual[column].to_numpy(dtype=np.float64), equal_nan=True)]
+    return f"values differ in {bad}" if bad else None
+
+
+def main():
+    failed = False
+    for seed in range(20):
+        blobs = synthetic_blobs(seed)
+        expected = old_loader(blobs)
+        projection = ['revenue', 'eps', 'balance_1', 'ratios_late']
+        cases = {
+            'all columns': (expected, {}),
+            'projected': (expected, {'columns': projection}),
+        }
+        # Sparse enough that dropna keeps some rows and drops others
+        dense = synthetic_blobs(seed, missing=0.002, extra_fields=False)
+        cases['dropna'] = (old_loader(dense).dropna().reset_index(drop=True), {'columns': projection, 'dropna': True})
+        for label, (reference, options) in cases.items():
+            actual = decode_fundamentals(dense if label == 'dropna' else blobs, **options)
+            if 'columns' in options:
+                reference = reference[['date'] + [c for c in projection if c in reference]]
+            problem = compare(reference, actual)
+            print(f"seed {seed:2} {label:12} {len(actual):3} dates  {problem or 'ok'}")
+            failed |= problem is not None
+
+    if failed:
+        sys.exit(1)
+    print("decode_fundamentals matches the previous merge loop")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
 from datetime import datetime, timedelta
 from sklearn.ensemble import RandomForestClassifier
@@ -18,6 +19,10 @@ from keras.optimizers import Adam
 from keras.callbacks import ReduceLROnPlateau, EarlyStopping
 from keras.regularizers import l2
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.market_data import load_prices
+from utils.preprocessing import PreprocessingPipeline
+
 class StockPredictor:
     def __init__(self, ticker, start_date, end_date):
         self.ticker = ticker
@@ -29,7 +34,7 @@ class StockPredictor:
         self.test_size = 0.2
 
     def download_data(self):
-        df_original = yf.download(self.ticker, start=self.start_date, end=self.end_date, interval="1d")
+        df_original = load_prices(self.ticker, self.start_date, self.end_date)
         df_original.index = pd.to_datetime(df_original.index)
         return df_original
 
@@ -203,14 +208,15 @@ if __name__ == "__main__":
     X = df[predictors].values
     y = df['Target'].values
     print(df)
-    # Normalize features
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    X = scaler.fit_transform(X)
+    # Normalize features with statistics of the training rows only
+    train_size = int(len(X) * (1 - predictor.test_size))
+    pipeline = PreprocessingPipeline(MinMaxScaler(feature_range=(0, 1)))
+    pipeline.fit(X[:train_size])
+    X = pipeline.transform(X)
 
     # Reshape data for LSTM
     X = X.reshape((X.shape[0], 1, X.shape[1]))
 
-    train_size = int(len(X) * (1 - predictor.test_size))
     X_train, X_test = X[:train_size], X[train_size:]
     y_train, y_test = y[:train_size], y[train_size:]
 
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import orjson
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.ingestion import fetch_all, summarize
+from utils.forecast_store import ForecastStore
+from prophet_model import DEFAULT_CONFIG, PricePredictor, load_data, warm_start_init
+
+'''
+Nightly Prophet forecasts for many symbols.
+
+Prices are loaded on a thread pool, and every symbol whose input changed since
+its last run is fitted in a separate worker process. A forecast is stored per
+symbol in a ForecastStore (utils/forecast_store.py) together with the key it
+was computed from: symbol, last price date, row count, last price and the
+model config. When the key is unchanged the fit is skipped, so a rerun on the
+same day costs only the price loads.
+
+With warm_start (the default) the Stan parameters of every fit are saved and
+the next fit of the symbol starts its optimizer from them, unless
+prophet_model.warm_start_init finds the data moved too much since (new rows,
+price scale, changepoint dates); those symbols are fitted cold.
+
+    python ml_models/prophet_batch.py AAPL NVDA MSFT
+'''
+
+
+def forecast_key(symbol, df, config):
+    last = df.iloc[-1]
+    digest = hashlib.sha1(orjson.dumps({
+        'symbol': symbol,
+        'last_date': str(last['ds'].date()),
+        'rows': len(df),
+        'last_price': round(float(last['y']), 4),
+        'config': config,
+    }, option=orjson.OPT_SORT_KEYS))
+    return digest.hexdigest()[:16]
+
+
+def fit_symbol(symbol, df, config, init=None):
+    """
+    (forecast arrays, fit state, whether the warm start was used) for one symbol.
+    """
+    # cmdstanpy logs every optimizer run at INFO
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    config = dict(config)
+    predict_ndays = config.pop('predict_ndays')
+    if init is not None:
+        try:
+            predictor = PricePredictor(predict_ndays=predict_ndays, **config)
+            return predictor.forecast(df, init=init), predictor.fit_state(), True
+        except Exception as e:
+            print(f"{symbol}: warm start failed ({e!r}), fitting cold")
+    predictor = PricePredictor(predict_ndays=predict_ndays, **config)
+    return predictor.forecast(df), predictor.fit_state(), False
+
+
+async def run_batch(symbols, start_date, end_date, store=None, config=None, workers=None, warm_start=True):
+    """
+    Forecast every symbol whose input or config changed since its stored forecast.
+    Returns {'fitted': [...], 'warm': [...], 'cold': {symbol: reason}, 'skipped': [...],
+    'failed': {symbol: error}}.
+    """
+    store = store or ForecastStore()
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    symbols = list(dict.fromkeys(symbols))
+
+    frames, stats = await fetch_all(load_data, symbols, start_date, end_date, concurrency=16)
+    summarize(stats)
+
+    report = {'fitted': [], 'warm': [], 'cold': {}, 'skipped': [], 'failed': {}}
+    pending = {}
+    for symbol in symbols:
+        df = frames.get(symbol)
+        if df is None:
+            report['failed'][symbol] = stats[symbol]['error'] or "less than 2 years of history"
+            continue
+        key = forecast_key(symbol, df, config)
+        if store.cached_key(symbol) == key:
+            report['skipped'].append(symbol)
+        else:
+            pending[symbol] = (df, key)
+
+    loop = asyncio.get_running_loop()
+
+    async def fit(executor, symbol, df, key):
+        init, reason = None, "warm start disabled"
+        if warm_start:
+            init, reason = warm_start_init(store.read_params(symbol), df, config)
+        try:
+            arrays, state, warm = await loop.run_in_executor(executor, fit_symbol, symbol, df, config, init)
+        except Exception as e:
+            report['failed'][symbol] = repr(e)
+            return
+        # Stored as soon as it is done, so an interrupted batch keeps finished symbols
+        store.write(symbol, key, arrays)
+        store.write_params(symbol, state)
+        report['fitted'].append(symbol)
+        if warm:
+            report['warm'].append(symbol)
+        else:
+            report['cold'][symbol] = reason or "warm start failed"
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(pending))) as executor:
+            await asyncio.gather(*(fit(executor, symbol, df, key) for symbol, (df, key) in pending.items()))
+
+    print(f"Prophet: {len(report['fitted'])} fitted ({len(report['warm'])} warm-started), "
+          f"{len(report['skipped'])} unchanged, {len(report['failed'])} failed")
+    for symbol, error in report['failed'].items():
+        print(f"{symbol}: {error}")
+    return report
+
+
+async def main():
+    symbols = sys.argv[1:] or ['NVDA']
+    start_date = datetime(2000, 1, 1).strftime("%Y-%m-%d")
+    end_date = datetime.today().strftime("%Y-%m-%d")
+    await run_batch(symbols, start_date, end_date)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
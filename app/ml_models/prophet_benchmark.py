@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from prophet_model import DEFAULT_CONFIG, PricePredictor, warm_start_init
+
+# Wall-clock of a cold Prophet refit vs one warm-started from the previous
+# day's parameters (prophet_model.warm_start_init), over a batch of synthetic
+# price histories. Each symbol is first fitted on all but its last --new-rows
+# rows, then refitted on the full history both ways.
+#
+#   python ml_models/prophet_benchmark.py --symbols 20 --years 20
+
+
+def synthetic_prices(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2024-12-31', periods=n_rows)
+    y = 50 * np.cumprod(1 + rng.normal(0.0004, 0.02, n_rows))
+    return pd.DataFrame({'ds': dates, 'y': y})
+
+
+def timed_fit(df, config, init=None):
+    config = dict(config)
+    predictor = PricePredictor(predict_ndays=config.pop('predict_ndays'), **config)
+    start = time.perf_counter()
+    arrays = predictor.forecast(df, init=init)
+    return time.perf_counter() - start, arrays, predictor.fit_state()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold vs warm-started Prophet refits.")
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--new-rows', type=int, default=1)
+    args = parser.parse_args()
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+    config = dict(DEFAULT_CONFIG)
+    totals = {'cold': 0.0, 'warm': 0.0}
+    skipped, max_diff = 0, 0.0
+    for seed in range(args.symbols):
+        df = synthetic_prices(252 * args.years, seed)
+        _, _, state = timed_fit(df[:-args.new_rows], config)
+
+        init, reason = warm_start_init(state, df, config)
+        if init is None:
+            print(f"symbol {seed}: cold fit needed ({reason})")
+            skipped += 1
+            continue
+        cold_time, cold, _ = timed_fit(df, config)
+        warm_time, warm, _ = timed_fit(df, config, init=init)
+        totals['cold'] += cold_time
+        totals['warm'] += warm_time
+        # Relative to price, so symbols at different levels compare
+        diff = np.abs(warm['mean'] - cold['mean']).max() / np.abs(cold['mean']).max()
+        max_diff = max(max_diff, float(diff))
+
+    n = args.symbols - skipped
+    print(f"{n} symbols, {252 * args.years} rows, {args.new_rows} new row(s)")
+    for kind, total in totals.items():
+        print(f"{kind:5} {total:8.2f} s total  {total / max(n, 1):6.3f} s/symbol")
+    if totals['warm']:
+        print(f"speedup: {totals['cold'] / totals['warm']:.2f}x")
+    print(f"max |warm - cold| forecast: {max_diff:.2%} of price")
+
+
+if __name__ == "__main__":
+    main()
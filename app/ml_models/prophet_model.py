@@ -3,65 +3,181 @@ import numpy as np
 np.float_ = np.float64
 from prophet import Prophet
 from datetime import datetime
-import yfinance as yf
 import asyncio
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+import hashlib
+import os
+import sys
+import orjson
 #import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.market_data import load_prices
+from utils.forecast_store import to_payload
+from utils import payload
+
+
+DEFAULT_CONFIG = {
+    'predict_ndays': 365,
+    'interval_width': 0.8,
+    'yearly_seasonality': True,
+    # One row per trading day: there is no intra-day pattern for a daily component to fit
+    'daily_seasonality': False,
+    'rolling_window': 200,
+    'history': 1200,
+}
+
+
+def load_data(ticker, start_date, end_date):
+    df = load_prices(ticker, start_date, end_date)
+    df = df.reset_index()
+    df = df[['Date', 'Adj Close']]
+    df = df.rename(columns={"Date": "ds", "Adj Close": "y"})
+    if len(df) > 252*2: #At least 2 years of history is necessary
+        #df['y'] = df['y'].rolling(window=200).mean()
+        #df = df.dropna()
+        return df
+
 
 async def download_data(ticker, start_date, end_date):
     try:
-        df = yf.download(ticker, start=start_date, end=end_date, interval="1d")
-        df = df.reset_index()
-        df = df[['Date', 'Adj Close']]
-        df = df.rename(columns={"Date": "ds", "Adj Close": "y"})
-        if len(df) > 252*2: #At least 2 years of history is necessary
-            #df['y'] = df['y'].rolling(window=200).mean()
-            #df = df.dropna()
-            return df
+        return load_data(ticker, start_date, end_date)
     except Exception as e:
     	print(e)
 
 
+def epoch_days(dates):
+    return pd.DatetimeIndex(dates).values.astype('datetime64[D]').astype(np.int32)
+
+
+def config_key(config):
+    return hashlib.sha1(orjson.dumps(config, option=orjson.OPT_SORT_KEYS)).hexdigest()[:16]
+
+
+def planned_changepoints(df, n_changepoints=25, changepoint_range=0.8):
+    """
+    Changepoint dates Prophet will place for `df` (same rule as Prophet.set_changepoints).
+    """
+    history = df[df['y'].notnull()].sort_values('ds')
+    hist_size = int(np.floor(len(history) * changepoint_range))
+    n_changepoints = min(n_changepoints, hist_size - 1)
+    if n_changepoints <= 0:
+        return np.empty(0, dtype=np.int32)
+    indexes = np.linspace(0, hist_size - 1, n_changepoints + 1).round().astype(int)
+    return epoch_days(history['ds'].iloc[indexes[1:]])
+
+
+def warm_start_init(state, df, config, max_new_rows=30, max_scale_change=0.05, max_changepoint_shift=30):
+    """
+    `init` for the next fit of `df` from the saved fit `state`, or None with the reason a
+    cold fit is needed: no saved state, another config or history start, too many new
+    rows, a price scale (Prophet's y_scale) that moved more than `max_scale_change`, or
+    changepoints that moved more than `max_changepoint_shift` days.
+    """
+    if state is None:
+        return None, "no saved parameters"
+    if str(state['config']) != config_key(config):
+        return None, "config changed"
+    if int(state['start']) != int(epoch_days(df['ds'][:1])[0]):
+        return None, "history start changed"
+    new_rows = len(df) - int(state['rows'])
+    if not 0 <= new_rows <= max_new_rows:
+        return None, f"{new_rows} new rows"
+    scale_change = abs(float(df['y'].abs().max()) / float(state['y_scale']) - 1)
+    if scale_change > max_scale_change:
+        return None, f"price scale moved {scale_change:.1%}"
+    changepoints = planned_changepoints(df)
+    if len(changepoints) != len(state['changepoints']):
+        return None, "changepoint count changed"
+    shift = int(np.abs(changepoints - state['changepoints']).max(initial=0))
+    if shift > max_changepoint_shift:
+        return None, f"changepoints moved {shift} days"
+    # Prophet checks delta and beta against its default init by array shape
+    init = {name: float(state[name]) for name in ('k', 'm', 'sigma_obs')}
+    init.update({name: np.asarray(state[name], dtype=np.float64) for name in ('delta', 'beta')})
+    return init, None
+
+
+def summarize_forecast(df, forecast, config):
+    """
+    Compact arrays of a fitted forecast: dates as int32 days since 1970-01-01 and the
+    200-day smoothed bands / last `history` prices as float32 rounded to cents.
+    """
+    predict_ndays, window, history = config['predict_ndays'], config['rolling_window'], config['history']
+    smoothed = forecast[['yhat_upper', 'yhat_lower', 'yhat']].rolling(window=window, min_periods=1).mean().round(2)
+
+    actual_values = df['y'].to_numpy(dtype=np.float64)
+    predicted_values = forecast['yhat'].to_numpy(dtype=np.float64)[:-predict_ndays]
+    errors = actual_values - predicted_values
+    rmse = round(float(np.sqrt(np.mean(errors ** 2))), 2)
+    mape = round(float(np.mean(np.abs(errors / actual_values)) * 100))
+    r2 = round(float(1 - np.sum(errors ** 2) / np.sum((actual_values - actual_values.mean()) ** 2)) * 100)
+
+    tail = slice(-history - predict_ndays, None)
+    return {
+        'metrics': np.array([rmse, mape, r2], dtype=np.float64),
+        'history_dates': epoch_days(df['ds'][-history:]),
+        'history_price': df['y'][-history:].round(2).to_numpy(dtype=np.float32),
+        'prediction_dates': epoch_days(forecast['ds'][tail]),
+        'upper': smoothed['yhat_upper'][tail].to_numpy(dtype=np.float32),
+        'lower': smoothed['yhat_lower'][tail].to_numpy(dtype=np.float32),
+        'mean': smoothed['yhat'][tail].to_numpy(dtype=np.float32),
+    }
+
+
 class PricePredictor:
-    def __init__(self, predict_ndays=365):
-    	self.predict_ndays = predict_ndays
-    	self.model = Prophet(
-            interval_width = 0.8,
-            daily_seasonality=True,
-            yearly_seasonality = True,
-      		)
-
-    def run(self, df):
-    	self.model.fit(df)
-    	future = self.model.make_future_dataframe(periods=self.predict_ndays)
-    	forecast = self.model.predict(future)
-
-    	# Apply rolling average to smooth the upper bound
-    	rolling_window = 200
-    	forecast['smoothed_upper'] = round(forecast['yhat_upper'].rolling(window=rolling_window, min_periods=1).mean(),2)
-    	forecast['smoothed_lower'] = round(forecast['yhat_lower'].rolling(window=rolling_window, min_periods=1).mean(),2)
-    	forecast['smoothed_mean'] = round(forecast['yhat'].rolling(window=rolling_window, min_periods=1).mean(),2)
-
-    	actual_values = df['y'].values
-    	predicted_values = forecast['yhat'].values[:-self.predict_ndays]
-
-    	rmse = round(np.sqrt(mean_squared_error(actual_values, predicted_values)),2)
-    	mape = round(np.mean(np.abs((actual_values - predicted_values) / actual_values)) * 100)
-    	r2 = round(r2_score(actual_values, predicted_values)*100)
-
-    	print("RMSE:", rmse)
-    	print("MAPE:", mape)
-    	print("R2 Score:", r2)
-    	pred_date_list = forecast['ds'][-1200-self.predict_ndays:].dt.strftime('%Y-%m-%d').tolist()
-    	upper_list = forecast['smoothed_upper'][-1200-self.predict_ndays:].tolist()
-    	lower_list = forecast['smoothed_lower'][-1200-self.predict_ndays:].tolist()
-    	mean_list = forecast['smoothed_mean'][-1200-self.predict_ndays:].tolist()
-
-    	historical_date_list = df['ds'][-1200:].dt.strftime('%Y-%m-%d').tolist()
-    	historical_price_list = round(df['y'][-1200:],2).tolist()
-
-    	return {'rmse': rmse,'mape': mape,'r2Score':r2, 'historicalPrice': historical_price_list, 'predictionDate': pred_date_list, 'upperBand': upper_list, 'lowerBand': lower_list, 'meanResult': mean_list}
+    def __init__(self, predict_ndays=365, **config):
+        self.config = {**DEFAULT_CONFIG, **config, 'predict_ndays': predict_ndays}
+        self.predict_ndays = predict_ndays
+        self.model = Prophet(
+            interval_width = self.config['interval_width'],
+            daily_seasonality = self.config['daily_seasonality'],
+            yearly_seasonality = self.config['yearly_seasonality'],
+        )
+
+    def forecast(self, df, init=None):
+        """
+        Fit and forecast `df`. `init` (see warm_start_init) starts the optimizer from a
+        previous fit's parameters instead of Prophet's default initial values.
+        """
+        if init is None:
+            self.model.fit(df)
+        else:
+            self.model.fit(df, init=init)
+        future = self.model.make_future_dataframe(periods=self.predict_ndays)
+        forecast = self.model.predict(future)
+        return summarize_forecast(df, forecast, self.config)
+
+    def fit_state(self):
+        """
+        Fitted Stan parameters (point estimates) and what warm_start_init checks them against.
+        """
+        params = self.model.params
+        return {
+            'k': np.asarray(params['k'][0][0]),
+            'm': np.asarray(params['m'][0][0]),
+            'sigma_obs': np.asarray(params['sigma_obs'][0][0]),
+            'delta': np.asarray(params['delta'][0]),
+            'beta': np.asarray(params['beta'][0]),
+            'y_scale': np.asarray(float(self.model.y_scale)),
+            'rows': np.asarray(len(self.model.history)),
+            'start': np.asarray(epoch_days([self.model.start])[0]),
+            'changepoints': epoch_days(self.model.changepoints),
+            'config': np.asarray(config_key(self.config)),
+        }
+
+    def run(self, df, compact=None):
+        """
+        Forecast payload as a dict of lists, or as bytes in the utils.payload format
+        `compact` ('columnar', 'delta' or 'binary').
+        """
+        arrays = self.forecast(df)
+        rmse, mape, r2 = arrays['metrics']
+        print("RMSE:", rmse)
+        print("MAPE:", int(mape))
+        print("R2 Score:", int(r2))
+        if compact:
+            return payload.encode(arrays, compact)
+        return to_payload(arrays)
 
 
 
@@ -15,7 +15,12 @@ import time
 from datetime import datetime, timedelta
 from xgboost import XGBRegressor
 from backtesting import Backtesting
-import yfinance as yf
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.market_data import load_prices
+from utils.windowing import sliding_windows, window_end_dates
 
 
 class regression_model:
@@ -48,20 +53,17 @@ class regression_model:
 
 
         # convert an array of values into a dataset matrix
+        # (same samples as before: the last complete window is left out)
+        def n_samples(dataset):
+            return max(len(dataset) - self.time_step - 1 - self.nth_day, 0)
+
         def create_dataset(dataset):
-            dataX, dataY = [], []
-            for i in range(len(dataset) - self.time_step - 1 - self.nth_day):
-                a = dataset[i:(i + self.time_step), 0]  
-                dataX.append(a)
-                dataY.append(dataset[i + self.time_step + self.nth_day, 0])
-            return np.array(dataX), np.array(dataY)
+            X, y = sliding_windows(dataset[:, 0], self.time_step, horizon=self.nth_day + 1)
+            return X[:n_samples(dataset)], y[:n_samples(dataset)]
 
         def create_date_dataset(dataset):
-            dataX = []
-            for i in range(len(dataset) - self.time_step - 1 - self.nth_day):
-                a = dataset[i:(i + self.time_step)].iloc[-1] 
-                dataX.append(a)
-            return pd.DataFrame(dataX)
+            dates = window_end_dates(dataset, self.time_step, horizon=self.nth_day + 1)
+            return pd.DataFrame(dates[:n_samples(dataset)])
 
         X_train, y_train = create_dataset(train_data)
         X_test, y_test = create_dataset(test_data)
@@ -142,7 +144,7 @@ class regression_model:
 ticker = 'AMD'
 start_date = datetime(2000, 1, 1)
 end_date = datetime(2024,2,1) #datetime.today()
-df = yf.download(ticker, start=start_date, end=end_date, interval="1d")
+df = load_prices(ticker, start_date, end_date)
 df = df.reset_index()
 model_name = 'LinearRegression'
 test_size = 0.2
@@ -0,0 +1,139 @@
+import os
+import sys
+import tempfile
+import importlib.util
+from datetime import datetime
+
+import numpy as np
+import orjson
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBClassifier
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(APP_DIR)
+# classification.py parses the command line on import
+sys.argv = sys.argv[:1]
+from fastapi.testclient import TestClient
+from utils.dataset_builder import DatasetBuilder
+from utils.results_store import save_results
+import cron_monte_carlo
+from ml_models.classification import TrendPredictor, HORIZONS, BEST_FEATURES, add_targets, trend_results
+from ml_models.score_model import ScorePredictor, save_scores
+
+# End-to-end check of the batch outputs the API serves: each producer (trend_results,
+# test.py's fundamental_results, save_scores, run_universe_risk) runs on small synthetic
+# data with quickly trained models, writes through results_store.save_results, and the
+# matching FastAPI endpoint must return exactly that symbol's result.
+# Runs in a temporary directory; exits with status 1 on any mismatch.
+#
+#   python ml_models/results_check.py
+
+SYMBOLS = ['AAA', 'BBB', 'CCC']
+
+
+def load_module(name, path):
+    # ml_models/test.py would be shadowed by the standard library's test package
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_prices(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.cumprod(1 + rng.normal(0.0003, 0.02, n))
+    spread = np.abs(rng.normal(0, 0.01, n))
+    return pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.005, n)),
+        'high': close * (1 + spread),
+        'low': close * (1 - spread),
+        'close': close,
+        'volume': rng.integers(100_000, 10_000_000, n).astype(float),
+    }, index=pd.bdate_range('2015-01-02', periods=n))
+
+
+def trend_output():
+    builder = DatasetBuilder(test_size=0.2)
+    for i, symbol in enumerate(SYMBOLS):
+        df = TrendPredictor(nth_day=HORIZONS[0]).feature_frame(synthetic_prices(700, i))
+        df = add_targets(df, HORIZONS).dropna()
+        builder.add(symbol, df.rename_axis('date').reset_index())
+    df_train, _ = builder.build()
+    os.makedirs('ml_models/weights', exist_ok=True)
+    for nth_day in HORIZONS:
+        predictor = TrendPredictor(nth_day=nth_day)
+        predictor.model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=42)
+        labelled = df_train[df_train['rows_left'] >= nth_day]
+        predictor.train_model(labelled[BEST_FEATURES], labelled[f"Target_{nth_day}"])
+    return trend_results(builder.test_sets(), HORIZONS)
+
+
+def fundamental_output():
+    fundamentals = load_module('fundamental_job', os.path.join(APP_DIR, 'ml_models', 'test.py'))
+    rng = np.random.default_rng(7)
+    builder = DatasetBuilder(test_size=0.4)
+    for symbol in SYMBOLS:
+        df = pd.DataFrame(rng.normal(1, 0.5, (40, len(fundamentals.SELECTED_FEATURES))),
+                          columns=fundamentals.SELECTED_FEATURES)
+        df['Target'] = rng.integers(0, 2, len(df))
+        builder.add(symbol, df)
+    df_train, _ = builder.build()
+    os.makedirs('weights/fundamental_weights', exist_ok=True)
+    predictor = fundamentals.FundamentalPredictor()
+    predictor.model = XGBClassifier(n_estimators=10, max_depth=3)
+    predictor.train_model(df_train[fundamentals.SELECTED_FEATURES], df_train['Target'])
+    return fundamentals.fundamental_results(predictor, builder.test_sets())
+
+
+def score_batch():
+    rng = np.random.default_rng(11)
+    X = pd.DataFrame(rng.normal(size=(300, 8)), columns=[f"f{i}" for i in range(8)])
+    y = (X['f0'] + rng.normal(0, 0.5, len(X)) > 0).astype(int)
+    os.makedirs('ml_models/weights/ai-score', exist_ok=True)
+    predictor = ScorePredictor()
+    predictor.model = LGBMClassifier(n_estimators=20, verbose=-1, random_state=42)
+    predictor.warm_start_training(X, y)
+    return {symbol: X.iloc[i * 10:(i + 1) * 10] for i, symbol in enumerate(SYMBOLS)}
+
+
+def main():
+    date = datetime.today().strftime("%Y-%m-%d")
+    with tempfile.TemporaryDirectory() as workdir:
+        # Producers and the store use their default paths, relative to the working directory
+        os.chdir(workdir)
+        expected = {'trend': trend_output(), 'fundamental': fundamental_output()}
+        for kind in ('trend', 'fundamental'):
+            save_results(kind, expected[kind], date)
+        batch = score_batch()
+        save_scores(batch, date)
+        expected['ai-score'] = ScorePredictor().predict_scores(batch)
+        expected['monte-carlo'] = cron_monte_carlo.run_universe_risk(
+            {symbol: synthetic_prices(300, i)['close'].to_numpy() for i, symbol in enumerate(SYMBOLS)},
+            runs=500, processes=2, seed=0)
+        save_results('monte-carlo', expected['monte-carlo'], date)
+
+        from main import app
+        failed = False
+        with TestClient(app) as client:
+            for kind, results in expected.items():
+                for symbol in SYMBOLS:
+                    response = client.get(f"/{kind}/{symbol.lower()}")
+                    ok = response.status_code == 200 and orjson.loads(response.content) == \
+                        orjson.loads(orjson.dumps(results.get(symbol), option=orjson.OPT_SERIALIZE_NUMPY))
+                    print(f"{kind:12} {symbol}  {response.status_code}  {'ok' if ok else 'MISMATCH'}")
+                    failed |= not ok
+            missing = client.get("/trend/ZZZ").status_code
+            if missing != 404:
+                print(f"unknown symbol returned {missing}, not 404")
+                failed = True
+        os.chdir(APP_DIR)
+
+    if failed:
+        sys.exit(1)
+    print("every endpoint serves its producer's output")
+
+
+if __name__ == "__main__":
+    main()
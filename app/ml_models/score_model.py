@@ -14,11 +14,32 @@ import aiofiles
 import pickle
 import time
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.model_registry import registry
+from utils.preprocessing import PreprocessingPipeline, pipeline_path, load_pipeline
+from utils.results_store import save_results
+
+# A probability at or above thresholds[i] (first match from the top) gets scores[i]
+SCORE_THRESHOLDS = [0.8, 0.75, 0.7, 0.6, 0.5, 0.45, 0.4, 0.35, 0.3, 0]
+SCORES = [10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+
+def probability_to_score(probabilities):
+    """
+    1-10 scores for an array of class-1 probabilities, via one searchsorted over the threshold table.
+    """
+    thresholds = np.asarray(SCORE_THRESHOLDS[::-1], dtype=np.float64)
+    scores = np.asarray(SCORES[::-1])
+    # Index of the largest threshold <= p; the lowest threshold is 0, so valid probabilities always match
+    idx = np.searchsorted(thresholds, np.asarray(probabilities, dtype=np.float64), side='right') - 1
+    return scores[np.clip(idx, 0, None)]
 
 
 class ScorePredictor:
     def __init__(self):
-        self.scaler = MinMaxScaler()
+        self.pipeline = PreprocessingPipeline(MinMaxScaler())
         self.model = lgb.LGBMClassifier(
             n_estimators=1_000,
             learning_rate=0.001,
@@ -31,15 +52,15 @@ class ScorePredictor:
         #self.pca = PCA(n_components=3)
     
     def preprocess_train_data(self, X):
-        X = np.where(np.isinf(X), np.nan, X)
-        X = np.nan_to_num(X)
-        X = self.scaler.fit_transform(X)
+        X = self.pipeline.fit_transform(X)
         return X #self.pca.fit_transform(X)
 
     def preprocess_test_data(self, X):
-        X = np.where(np.isinf(X), np.nan, X)
-        X = np.nan_to_num(X)
-        X = self.scaler.fit_transform(X)
+        pipeline = load_pipeline(('ai-score-preprocess', None, 'stacking'), self.warm_start_model_path)
+        if pipeline is None:
+            print(f"No saved preprocessing for {self.warm_start_model_path}, fitting on the test data")
+            pipeline = self.pipeline.fit(X)
+        X = pipeline.transform(X)
         return X #self.pca.fit_transform(X)
 
     def warm_start_training(self, X_train, y_train):
@@ -47,6 +68,7 @@ class ScorePredictor:
         
         self.model.fit(X_train, y_train)
         pickle.dump(self.model, open(self.warm_start_model_path, 'wb'))
+        self.pipeline.save(pipeline_path(self.warm_start_model_path))
         print("Warm start model saved.")
 
     def fine_tune_model(self, X_train, y_train):
@@ -61,50 +83,56 @@ class ScorePredictor:
         self.model.fit(X_train, y_train, epochs=100, batch_size=128, validation_split=0.1, callbacks=[early_stopping, reduce_lr])
         print("Model fine-tuned (not saved).")
 
-    def evaluate_model(self, X_test, y_test):
-        X_test = self.preprocess_test_data(X_test)
-        
-        with open(self.warm_start_model_path, 'rb') as f:
-            self.model = pickle.load(f)
-
-        test_predictions = self.model.predict_proba(X_test)
-        class_1_probabilities = test_predictions[:, 1]
-        binary_predictions = (class_1_probabilities >= 0.5).astype(int)
-
-        # Calculate and print metrics
-        test_precision = precision_score(y_test, binary_predictions)
-        test_accuracy = accuracy_score(y_test, binary_predictions)
-        test_f1_score = f1_score(y_test, binary_predictions)
-        test_recall_score = recall_score(y_test, binary_predictions)
-        test_roc_auc_score = roc_auc_score(y_test, binary_predictions)
-
-        print(f"Test Precision: {round(test_precision * 100)}%")
-        print(f"Test Accuracy: {round(test_accuracy * 100)}%")
-        print(f"F1 Score: {round(test_f1_score * 100)}%")
-        print(f"Recall: {round(test_recall_score * 100)}%")
-        print(f"ROC AUC: {round(test_roc_auc_score * 100)}%")
+    def predict_proba(self, X):
+        X = self.preprocess_test_data(X)
+        self.model = registry.get(('ai-score', None, 'stacking'), self.warm_start_model_path)
+        return self.model.predict_proba(X)[:, 1]
+
+    def predict_scores(self, batch):
+        """
+        AI scores for many symbols with a single model call.
+
+        `batch` maps symbol -> feature rows of that symbol (DataFrame or 2-D array); the
+        latest row of every symbol is stacked into one matrix. Returns
+        {symbol: {'probability': p, 'score': s}}.
+        """
+        symbols = list(batch)
+        if not symbols:
+            return {}
+        if all(hasattr(batch[symbol], 'iloc') for symbol in symbols):
+            X = pd.concat([batch[symbol].iloc[-1:] for symbol in symbols], ignore_index=True)
+        else:
+            X = np.vstack([np.asarray(batch[symbol])[-1] for symbol in symbols])
+
+        probabilities = self.predict_proba(X)
+        scores = probability_to_score(probabilities)
+        return {symbol: {'probability': float(probability), 'score': int(score)}
+                for symbol, probability, score in zip(symbols, probabilities, scores)}
+
+    def score_metrics(self, y_test, probabilities):
+        binary_predictions = (probabilities >= 0.5).astype(int)
+        return {
+            'accuracy': round(accuracy_score(y_test, binary_predictions) * 100),
+            'precision': round(precision_score(y_test, binary_predictions) * 100),
+            'f1_score': round(f1_score(y_test, binary_predictions) * 100),
+            'recall_score': round(recall_score(y_test, binary_predictions) * 100),
+            'roc_auc_score': round(roc_auc_score(y_test, binary_predictions) * 100),
+        }
 
+    def evaluate_model(self, X_test, y_test, metrics=True):
+        class_1_probabilities = self.predict_proba(X_test)
         last_prediction_prob = class_1_probabilities[-1]
-        print(pd.DataFrame({'y_test': y_test, 'y_pred': binary_predictions}))
         print(f"Last prediction probability: {last_prediction_prob}")
 
-        thresholds = [0.8, 0.75, 0.7, 0.6, 0.5, 0.45, 0.4, 0.35, 0.3, 0]
-        scores = [10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
-
-        score = None        
-        for threshold, value in zip(thresholds, scores):
-            if last_prediction_prob >= threshold:
-                score = value
-                break
-
-        return {
-            'accuracy': round(test_accuracy * 100),
-            'precision': round(test_precision * 100),
-            'f1_score': round(test_f1_score * 100),
-            'recall_score': round(test_recall_score * 100),
-            'roc_auc_score': round(test_roc_auc_score * 100),
-            'score': score
-        }
+        result = {'score': int(probability_to_score(last_prediction_prob))}
+        if metrics:
+            result = {**self.score_metrics(y_test, class_1_probabilities), **result}
+            print(f"Test Precision: {result['precision']}%")
+            print(f"Test Accuracy: {result['accuracy']}%")
+            print(f"F1 Score: {result['f1_score']}%")
+            print(f"Recall: {result['recall_score']}%")
+            print(f"ROC AUC: {result['roc_auc_score']}%")
+        return result
     def feature_selection(self, X_train, y_train, k=100):
         print('Feature selection:')
         print(f"X_train shape: {X_train.shape}, y_train shape: {y_train.shape}")
@@ -114,4 +142,12 @@ class ScorePredictor:
         selector.transform(X_train)
         selected_features = [col for i, col in enumerate(X_train.columns) if selector.get_support()[i]]
 
-        return selected_features
\ No newline at end of file
+        return selected_features
+
+
+def save_scores(batch, date=None):
+    """
+    Score `batch` (see ScorePredictor.predict_scores) and write it where /ai-score/{symbol} reads it.
+    """
+    date = date or datetime.today().strftime("%Y-%m-%d")
+    return save_results('ai-score', ScorePredictor().predict_scores(batch), date)
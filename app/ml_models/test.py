@@ -1,114 +1,61 @@
-import yfinance as yf
-import pandas as pd
+import os
+import sys
 from datetime import datetime, timedelta
 from sklearn.ensemble import RandomForestClassifier
-import numpy as np
 from xgboost import XGBClassifier
 from sklearn.metrics import precision_score, recall_score, f1_score, roc_auc_score, accuracy_score
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
 from tqdm import tqdm
 from sklearn.feature_selection import SelectKBest, f_classif
-from collections import defaultdict
+from itertools import islice
 import asyncio
 import aiohttp
 import pickle
 import time
-import sqlite3
-import ujson
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.market_data import load_prices, prices_asof
+from utils.ingestion import fetch_all, summarize
+from utils.fundamentals import iter_fundamentals, load_fundamentals
+from utils.stocks_db import ConnectionPool
+from utils.model_registry import registry
+from utils.preprocessing import PreprocessingPipeline, pipeline_path, load_pipeline
+from utils.dataset_builder import DatasetBuilder
+from utils.results_store import save_results
 
 
 #Based on the paper: https://arxiv.org/pdf/1603.00751
 
+SELECTED_FEATURES = ['growthRevenue','ebitda','priceToBookRatio','eps','priceToSalesRatio','growthOtherCurrentLiabilities', 'receivablesTurnover', 'totalLiabilitiesAndStockholdersEquity', 'totalLiabilitiesAndTotalEquity', 'totalAssets', 'growthOtherCurrentAssets', 'retainedEarnings', 'totalEquity', 'totalStockholdersEquity', 'totalNonCurrentAssets']
+# Symbols whose fundamentals are decoded before their prices are loaded; bounds what is held in memory
+BATCH_SIZE = 64
 
-async def download_data(ticker, con, start_date, end_date):
-    try:
-        query_template = """
-            SELECT 
-                income, income_growth, balance, balance_growth, cashflow, cashflow_growth, ratios
-            FROM 
-                stocks 
-            WHERE
-                symbol = ?
-        """
-
-        query_df = pd.read_sql_query(query_template, con, params=(ticker,))
-
-        income =  ujson.loads(query_df['income'].iloc[0])
-
-        #Only consider company with at least 10 year worth of data
-        if len(income) < 40:
-            raise ValueError("Income data length is too small.")
-
-        income = [{k: v for k, v in item.items() if k not in ["symbol","reportedCurrency","calendarYear","fillingDate","acceptedDate","period","cik","link", "finalLink"]} for item in income if int(item["date"][:4]) >= 2000]
-        income_growth = ujson.loads(query_df['income_growth'].iloc[0])
-        income_growth = [{k: v for k, v in item.items() if k not in ["symbol","reportedCurrency","calendarYear","fillingDate","acceptedDate","period","cik","link", "finalLink"]} for item in income_growth if int(item["date"][:4]) >= 2000]
-        
-        balance = ujson.loads(query_df['balance'].iloc[0])
-        balance = [{k: v for k, v in item.items() if k not in ["symbol","reportedCurrency","calendarYear","fillingDate","acceptedDate","period","cik","link", "finalLink"]} for item in balance if int(item["date"][:4]) >= 2000]
-        balance_growth = ujson.loads(query_df['balance_growth'].iloc[0])
-        balance_growth = [{k: v for k, v in item.items() if k not in ["symbol","reportedCurrency","calendarYear","fillingDate","acceptedDate","period","cik","link", "finalLink"]} for item in balance_growth if int(item["date"][:4]) >= 2000]
-
-        cashflow = ujson.loads(query_df['cashflow'].iloc[0])
-        cashflow = [{k: v for k, v in item.items() if k not in ["symbol","reportedCurrency","calendarYear","fillingDate","acceptedDate","period","cik","link", "finalLink"]} for item in cashflow if int(item["date"][:4]) >= 2000]
-        cashflow_growth = ujson.loads(query_df['cashflow_growth'].iloc[0])
-        cashflow_growth = [{k: v for k, v in item.items() if k not in ["symbol","reportedCurrency","calendarYear","fillingDate","acceptedDate","period","cik","link", "finalLink"]} for item in cashflow_growth if int(item["date"][:4]) >= 2000]
-
-
-        ratios = ujson.loads(query_df['ratios'].iloc[0])
-        ratios = [{k: v for k, v in item.items() if k not in ["symbol","reportedCurrency","calendarYear","fillingDate","acceptedDate","period","cik","link", "finalLink"]} for item in ratios if int(item["date"][:4]) >= 2000]
-
-        combined_data = defaultdict(dict)
-        # Iterate over all lists simultaneously
-        for entries in zip(income, income_growth, balance, balance_growth, cashflow, cashflow_growth, ratios):
-            # Iterate over each entry in the current set of entries
-            for entry in entries:
-                date = entry['date']
-                # Merge entry data into combined_data, skipping duplicate keys
-                for key, value in entry.items():
-                    if key not in combined_data[date]:
-                        combined_data[date][key] = value
-        
-        combined_data = list(combined_data.values())
-
-        df = yf.download(ticker, start=start_date, end=end_date, interval="1d").reset_index()
-        df = df.rename(columns={'Adj Close': 'close', 'Date': 'date'})
-        #print(df[['date','close']])
-        df['date'] = df['date'].dt.strftime('%Y-%m-%d')
-
-
-        for item in combined_data:
-            # Find close price for '2023-09-30' or the closest available date prior to it
-            target_date = item['date']
-            counter = 0
-            max_attempts = 10
-            
-            while target_date not in df['date'].values and counter < max_attempts:
-                # If the target date doesn't exist, move one day back
-                target_date = (pd.to_datetime(target_date) - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
-                counter += 1
-            if counter == max_attempts:
-                break
-
-
-            # Get the close price for the found or closest date
-            close_price = round(df[df['date'] == target_date]['close'].values[0],2)
-            item['price'] = close_price
-            #print(f"Close price for {target_date}: {close_price}")
-            
-        
 
-        combined_data = sorted(combined_data, key=lambda x: x['date'])
+def load_data(ticker, fundamentals, start_date, end_date):
+    #Only consider company with at least 10 year worth of data
+    if ticker not in fundamentals:
+        raise ValueError("Income data length is too small.")
+    df_income = fundamentals[ticker]
 
-        
-        df_income = pd.DataFrame(combined_data).dropna()
+    prices = load_prices(ticker, start_date, end_date)['Adj Close']
 
-        df_income['Target'] = ((df_income['price'].shift(-1) - df_income['price']) / df_income['price'] > 0).astype(int)
+    # Close on the report date or the closest trading day before it (up to 9 days back);
+    # reports without a close in that range are dropped below
+    df_income['price'] = prices_asof(prices, df_income['date'], max_days_back=9).round(2)
 
-        df_copy = df_income.copy()
-        
-        return df_copy
+    df_income = df_income.dropna()
+
+    df_income['Target'] = ((df_income['price'].shift(-1) - df_income['price']) / df_income['price'] > 0).astype(int)
+
+    df_copy = df_income.copy()
+    
+    return df_copy
 
+
+async def download_data(ticker, con, start_date, end_date):
+    try:
+        return load_data(ticker, load_fundamentals(con, [ticker], columns=SELECTED_FEATURES, dropna=True), start_date, end_date)
     except Exception as e:
         print(e)
 
@@ -116,8 +63,9 @@ async def download_data(ticker, con, start_date, end_date):
 class FundamentalPredictor:
     def __init__(self, path='weights'):
         self.model = XGBClassifier() #RandomForestClassifier(n_estimators=1000, max_depth = 20, min_samples_split=10, random_state=42, n_jobs=10)
-        self.scaler = StandardScaler()
+        self.pipeline = PreprocessingPipeline(StandardScaler(), replace_zero=True) #Replace 0 with 1 as suggested in the paper
         self.path = path
+        self.weights_path = f'{path}/fundamental_weights/weights.pkl'
 
     def feature_selection(self, X_train, y_train,k=8):
         '''
@@ -141,23 +89,19 @@ class FundamentalPredictor:
 
 
     def train_model(self, X_train, y_train):
-        X_train = X_train.applymap(lambda x: 1 if x == 0 else x) #Replace 0 with 1 as suggested in the paper 
-        X_train = np.where(np.isinf(X_train), np.nan, X_train)
-        X_train = np.nan_to_num(X_train)
-
-        X_train = self.scaler.fit_transform(X_train)
+        X_train = self.pipeline.fit_transform(X_train)
         self.model.fit(X_train, y_train)
-        pickle.dump(self.model, open(f'{self.path}/fundamental_weights/weights.pkl', 'wb'))
+        pickle.dump(self.model, open(self.weights_path, 'wb'))
+        self.pipeline.save(pipeline_path(self.weights_path))
 
     def evaluate_model(self, X_test, y_test):
-        X_test = X_test.applymap(lambda x: 1 if x == 0 else x) #Replace 0 with 1 as suggested in the paper 
-        X_test = np.where(np.isinf(X_test), np.nan, X_test)
-        X_test = np.nan_to_num(X_test)
-
-        X_test = self.scaler.fit_transform(X_test)
+        pipeline = load_pipeline(('fundamental-preprocess', None, 'xgb'), self.weights_path)
+        if pipeline is None:
+            print(f"No saved preprocessing for {self.weights_path}, fitting on the test data")
+            pipeline = self.pipeline.fit(X_test)
+        X_test = pipeline.transform(X_test)
 
-        with open(f'{self.path}/fundamental_weights/weights.pkl', 'rb') as f:
-            self.model = pickle.load(f)
+        self.model = registry.get(('fundamental', None, 'xgb'), self.weights_path)
 
         #test_predictions = self.model.predict(X_test)
         test_predictions = self.model.predict_proba(X_test)[:,1]
@@ -187,31 +131,56 @@ class FundamentalPredictor:
         return {'accuracy': round(test_accuracy*100), 'precision': round(test_precision*100), 'sentiment': 'Bullish' if next_value_prediction == 1 else 'Bearish'}, test_predictions
 
 
+def fundamental_results(predictor, test_sets):
+    '''
+    {symbol: {'accuracy', 'precision', 'sentiment'}}: the saved model evaluated on each
+    symbol's test rows, as /fundamental/{symbol} serves it.
+    '''
+    results = {}
+    for symbol, df in test_sets.items():
+        try:
+            results[symbol], _ = predictor.evaluate_model(df[SELECTED_FEATURES], df['Target'])
+        except Exception as e:
+            print(f"{symbol}: {e}")
+    return results
+
+
 #Train mode
 async def train_process(tickers, con):
     tickers = list(set(tickers))
 
-    df_train = pd.DataFrame()
-    df_test = pd.DataFrame()
     test_size = 0.4
     start_date = datetime(2000, 1, 1).strftime("%Y-%m-%d")
     end_date = datetime.today().strftime("%Y-%m-%d")
     predictor = FundamentalPredictor()
-    df_train = pd.DataFrame()
-    df_test = pd.DataFrame()
 
     
-    tasks = [download_data(ticker, con, start_date, end_date) for ticker in tickers]
-    dfs = await asyncio.gather(*tasks)
-    for df in dfs:
-        try:
-            split_size = int(len(df) * (1-test_size))
-            train_data = df.iloc[:split_size]
-            test_data = df.iloc[split_size:]
-            df_train = pd.concat([df_train, train_data], ignore_index=True)
-            df_test = pd.concat([df_test, test_data], ignore_index=True)
-        except:
-            pass
+    # Fundamentals are decoded lazily and a batch of symbols at a time has its prices loaded
+    # concurrently, so at most BATCH_SIZE raw frames are held at once. Only the selected columns
+    # are kept, but rows are dropped on a null in any field, as before the projection
+    builder = DatasetBuilder(test_size=test_size)
+    stream = iter_fundamentals(con, tickers, columns=SELECTED_FEATURES, dropna=True)
+    seen = set()
+    while True:
+        fundamentals = dict(islice(stream, BATCH_SIZE))
+        if not fundamentals:
+            break
+        dfs, stats = await fetch_all(load_data, list(fundamentals), fundamentals, start_date, end_date, concurrency=16)
+        summarize(stats)
+        for ticker, df in dfs.items():
+            if df is None:
+                builder.fail(ticker, stats[ticker]['error'])
+                continue
+            with builder.symbol(ticker):
+                builder.add(ticker, df)
+        seen.update(fundamentals)
+        del fundamentals, dfs
+    for ticker in tickers:
+        if ticker not in seen:
+            builder.fail(ticker, "Income data length is too small.")
+
+    df_train, df_test = builder.build()
+    builder.report()
 
     
     best_features = [col for col in df_train.columns if col not in ['date','price','Target']]
@@ -222,11 +191,14 @@ async def train_process(tickers, con):
     #selected_features = predictor.feature_selection(df_train[best_features], df_train['Target'],k=10)
     #print(selected_features)
     #selected_features = [col for col in df_train if col not in ['price','date','Target']]
-    selected_features = ['growthRevenue','ebitda','priceToBookRatio','eps','priceToSalesRatio','growthOtherCurrentLiabilities', 'receivablesTurnover', 'totalLiabilitiesAndStockholdersEquity', 'totalLiabilitiesAndTotalEquity', 'totalAssets', 'growthOtherCurrentAssets', 'retainedEarnings', 'totalEquity', 'totalStockholdersEquity', 'totalNonCurrentAssets']
+    selected_features = SELECTED_FEATURES
 
     predictor.train_model(df_train[selected_features], df_train['Target'])
     predictor.evaluate_model(df_test[selected_features], df_test['Target'])
 
+    results = fundamental_results(predictor, builder.test_sets())
+    print(f"Saved {len(results)} symbols to {save_results('fundamental', results, end_date)}")
+
 
 async def test_process(con):
     test_size = 0.4
@@ -236,22 +208,22 @@ async def test_process(con):
     df = await download_data('GME', con, start_date, end_date)
     split_size = int(len(df) * (1-test_size))
     test_data = df.iloc[split_size:]
-    selected_features = ['growthRevenue','ebitda','priceToBookRatio','eps','priceToSalesRatio','growthOtherCurrentLiabilities', 'receivablesTurnover', 'totalLiabilitiesAndStockholdersEquity', 'totalLiabilitiesAndTotalEquity', 'totalAssets', 'growthOtherCurrentAssets', 'retainedEarnings', 'totalEquity', 'totalStockholdersEquity', 'totalNonCurrentAssets']
+    selected_features = SELECTED_FEATURES
     #selected_features = [col for col in test_data if col not in ['price','date','Target']]
     predictor.evaluate_model(test_data[selected_features], test_data['Target'])
 
 async def main():
-    con = sqlite3.connect('../stocks.db')
-    cursor = con.cursor()
-    cursor.execute("PRAGMA journal_mode = wal")
-    cursor.execute("SELECT DISTINCT symbol FROM stocks WHERE marketCap >= 500E9")
-    stock_symbols = [row[0] for row in cursor.fetchall()]
-    print(len(stock_symbols))
-    #selected_features = ['operatingIncomeRatio','growthRevenue','revenue','netIncome','priceToSalesRatio']
-    await train_process(stock_symbols, con)
-    await test_process(con)
-
-    con.close()
+    pool = ConnectionPool('../stocks.db')
+    with pool.connection() as con:
+        cursor = con.execute("SELECT DISTINCT symbol FROM stocks WHERE marketCap >= 500E9")
+        stock_symbols = [row[0] for row in cursor.fetchall()]
+        print(len(stock_symbols))
+        #selected_features = ['operatingIncomeRatio','growthRevenue','revenue','netIncome','priceToSalesRatio']
+        await train_process(stock_symbols, con)
+        await test_process(con)
+
+    pool.close()
 
 # Run the main function
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import pickle
+import tempfile
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.tree_export import export_model, load_exported
+
+# Compare a pickled tree ensemble with its export from utils/tree_export.py:
+# load time, resident memory after loading and prediction throughput. Every
+# variant is measured in a fresh process so one load does not warm the other.
+#
+#   python ml_models/tree_benchmark.py                                   # synthetic TrendPredictor-sized forest
+#   python ml_models/tree_benchmark.py --model ml_models/weights/model_weights_5.pkl
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024**2
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(kind, path, X, repeat, queue):
+    # Import the libraries up front so only the model itself is timed and counted: unpickling
+    # a forest would otherwise also pay for importing sklearn
+    for module in ('sklearn.ensemble', 'lightgbm', 'xgboost'):
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+    before = rss_mb()
+    start = time.perf_counter()
+    if kind == 'pickle':
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+    else:
+        model = load_exported(path)
+    load_time = time.perf_counter() - start
+
+    model.predict_proba(X[:10])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        proba = model.predict_proba(X)
+    predict_time = (time.perf_counter() - start) / repeat
+    queue.put({
+        'load_s': load_time,
+        'rss_mb': rss_mb() - before,
+        'rows_per_s': len(X) / predict_time,
+        'proba': proba[:, -1],
+    })
+
+
+def run(kind, path, X, repeat):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=measure, args=(kind, path, X, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def synthetic_forest(n_features, seed=42):
+    from sklearn.ensemble import RandomForestClassifier
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(20_000, n_features))
+    y = (X[:, 0] + X[:, 1] ** 2 + rng.normal(size=len(X)) > 1).astype(int)
+    # Same hyperparameters as TrendPredictor
+    model = RandomForestClassifier(n_estimators=500, max_depth=10, min_samples_split=10, random_state=42, n_jobs=10)
+    return model.fit(X, y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pickled vs exported tree ensembles.")
+    parser.add_argument('--model', help="Pickled RandomForest/LightGBM/XGBoost estimator (default: synthetic forest)")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    if args.model:
+        pickle_path = args.model
+        with open(pickle_path, 'rb') as f:
+            model = pickle.load(f)
+    else:
+        model = synthetic_forest(n_features=20)
+        pickle_path = os.path.join(workdir, 'model.pkl')
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(model, f)
+
+    export_path = export_model(model, os.path.join(workdir, 'export'))
+    n_features = model.n_features_in_
+    del model
+
+    X = np.random.default_rng(0).normal(size=(args.rows, n_features))
+    results = {kind: run(kind, path, X, args.repeat) for kind, path in [('pickle', pickle_path), ('export', export_path)]}
+
+    sizes = {
+        'pickle': os.path.getsize(pickle_path),
+        'export': sum(os.path.getsize(os.path.join(export_path, name)) for name in os.listdir(export_path)),
+    }
+    print(f"{'':8} {'disk MB':>9} {'load s':>9} {'RSS MB':>9} {'rows/s':>12}")
+    for kind, result in results.items():
+        print(f"{kind:8} {sizes[kind] / 1024**2:9.1f} {result['load_s']:9.3f} {result['rss_mb']:9.1f} {result['rows_per_s']:12,.0f}")
+    diff = np.abs(results['pickle']['proba'] - results['export']['proba']).max()
+    print(f"max |proba difference|: {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
-import numpy as np
 from datetime import datetime
 import yfinance as yf
-from tqdm import tqdm
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.monte_carlo import simulate_paths, simulate_terminal_prices, value_at_risk
 
 #correlated_stocks = ['AQN', 'PACB', 'ZI', 'IPG', 'EW']
 ticker = 'GME'
@@ -45,31 +48,13 @@ sigma = df['daily_return'].std()
 
 #Function takes in stock price, number of days to run, mean and standard deviation values
 def stock_monte_carlo(start_price,days,mu,sigma):
-    
-    price = np.zeros(days)
-    price[0] = start_price
-    
-    shock = np.zeros(days)
-    drift = np.zeros(days)
-    
-    for x in range(1,days):
-        
-        #Shock and drift formulas taken from the Monte Carlo formula
-        shock[x] = np.random.normal(loc=mu*dt,scale=sigma*np.sqrt(dt))
-        
-        drift[x] = mu * dt
-        
-        #New price = Old price + Old price*(shock+drift)
-        price[x] = price[x-1] + (price[x-1] * (drift[x]+shock[x]))
-        
-    return price
+    return simulate_paths(start_price,days,mu,sigma,runs=1,dt=dt)[0]
 
 start_price = df['Adj Close'].iloc[-1] #Taken from above
 
 
 
-for run in tqdm(range(200)):
-    ax.plot(stock_monte_carlo(start_price,days,mu,sigma))
+ax.plot(simulate_paths(start_price,days,mu,sigma,runs=200,dt=dt).T)
 
 plt.xlabel('Days')
 plt.ylabel('Price')
@@ -82,11 +67,9 @@ plt.savefig('simulation.png')
 fig, ax = plt.subplots(figsize=(14,5))
 runs = 10000
 
-simulations = np.zeros(runs)
-for run in tqdm(range(runs)):
-    simulations[run] = stock_monte_carlo(start_price,days,mu,sigma)[days-1]
+simulations = simulate_terminal_prices(start_price,days,mu,sigma,runs,dt=dt)
 
-q = np.percentile(simulations,1)
+q = value_at_risk(start_price, simulations, confidence=0.99)['q']
 
 plt.hist(simulations,bins=200)
 
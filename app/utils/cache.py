@@ -0,0 +1,200 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytz
+
+from utils.helper import check_market_hours
+
+
+'''
+Two-tier cache for API responses that are computed on request (main.py); results
+the ResultsStore already holds as bytes are served without it.
+
+An in-process LRU sits in front of a shared backend: anything with the async
+get/set(ex=)/delete of redis.asyncio.Redis, or MemoryBackend as a local
+stand-in. Concurrent misses of one key wait for a single computation instead
+of each hitting the backend and the store (single flight). Entries live
+MARKET_TTL seconds while the market is open (utils.helper.check_market_hours)
+and up to CLOSED_TTL after the close, when nothing upstream changes, but never
+past the next open.
+'''
+
+MARKET_TTL = 30
+CLOSED_TTL = 6 * 3600
+# check_market_hours is only re-evaluated this often
+MARKET_CHECK_INTERVAL = 30
+
+
+def seconds_until_open():
+    """
+    Seconds until the next 9:00 ET, the hour check_market_hours starts reporting open.
+    """
+    now = datetime.now(pytz.timezone('America/New_York'))
+    next_open = now.replace(hour=9, minute=0, second=0, microsecond=0)
+    if next_open <= now:
+        next_open += timedelta(days=1)
+    return (next_open - now).total_seconds()
+
+
+class MarketHoursTTL:
+    def __init__(self, open_ttl=MARKET_TTL, closed_ttl=CLOSED_TTL, check=check_market_hours):
+        self.open_ttl = open_ttl
+        self.closed_ttl = closed_ttl
+        self.check = check
+        self._checked_at = None
+        self._open = False
+
+    def __call__(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= MARKET_CHECK_INTERVAL:
+            self._open = self.check()
+            self._checked_at = now
+        if self._open:
+            return self.open_ttl
+        # Weekends and holidays are treated as a next-morning open, which only shortens the TTL
+        return int(max(self.open_ttl, min(self.closed_ttl, seconds_until_open())))
+
+
+class MemoryBackend:
+    """
+    In-process stand-in for the part of redis.asyncio.Redis the cache uses.
+    """
+    def __init__(self):
+        self._data = {}
+
+    async def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key, value, ex=None):
+        self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    async def delete(self, *keys):
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+def redis_backend(url):
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        print("redis is not installed, using the in-memory cache backend")
+        return MemoryBackend()
+    return redis.from_url(url)
+
+
+class Cache:
+    def __init__(self, backend=None, max_items=10_000, ttl=None, prefix='api:', dumps=bytes, loads=bytes):
+        """
+        `backend` is the shared tier (None: in-process LRU only). `dumps`/`loads` convert
+        values to and from the bytes stored there. `ttl` is seconds or a callable returning
+        them (default MarketHoursTTL()).
+        """
+        self.backend = backend
+        self.max_items = max_items
+        self.ttl = ttl if ttl is not None else MarketHoursTTL()
+        self.prefix = prefix
+        self.dumps = dumps
+        self.loads = loads
+        self._local = OrderedDict()
+        self._inflight = {}
+        self.stats = {'local': 0, 'shared': 0, 'miss': 0, 'coalesced': 0}
+
+    def _ttl(self):
+        return self.ttl() if callable(self.ttl) else self.ttl
+
+    def _local_get(self, key):
+        item = self._local.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires <= time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return value
+
+    def _local_set(self, key, value, ttl):
+        self._local[key] = (value, time.monotonic() + ttl)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_items:
+            self._local.popitem(last=False)
+
+    async def _fill(self, key, compute):
+        ttl = self._ttl()
+        data = None
+        if self.backend is not None:
+            try:
+                data = await self.backend.get(self.prefix + key)
+            except Exception as e:
+                print(f"Cache backend get failed: {e}")
+        if data is not None:
+            self.stats['shared'] += 1
+            value = self.loads(data)
+        else:
+            self.stats['miss'] += 1
+            value = await compute()
+            # Missing results are not cached, so a new batch output shows up on the next request
+            if value is None:
+                return None
+            if self.backend is not None:
+                try:
+                    await self.backend.set(self.prefix + key, self.dumps(value), ex=ttl)
+                except Exception as e:
+                    print(f"Cache backend set failed: {e}")
+        self._local_set(key, value, ttl)
+        return value
+
+    async def get(self, key, compute):
+        """
+        Cached value of `key`, or the result of awaiting `compute()` (stored unless None).
+        """
+        value = self._local_get(key)
+        if value is not None:
+            self.stats['local'] += 1
+            return value
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            try:
+                # Shielded, so a waiter that is cancelled does not cancel the shared computation
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The request computing the value was cancelled, not this one: compute it here
+                if future.cancelled():
+                    return await self.get(key, compute)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._fill(key, compute)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Marks the exception retrieved when no other request was waiting for it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    async def invalidate(self, *keys):
+        for key in keys:
+            self._local.pop(key, None)
+        if keys and self.backend is not None:
+            await self.backend.delete(*(self.prefix + key for key in keys))
+
+    def clear_local(self):
+        self._local.clear()
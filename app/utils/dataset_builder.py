@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+class DatasetBuilder:
+    """
+    Collects per-symbol train/test splits and concatenates them once at the end,
+    instead of growing the datasets with pd.concat inside the symbol loop.
+
+    Failures are recorded per symbol rather than silently skipped:
+
+        builder = DatasetBuilder(test_size=0.2)
+        for symbol, df in frames.items():
+            with builder.symbol(symbol):
+                builder.add(symbol, prepare(df))
+        df_train, df_test = builder.build()
+        builder.report()
+    """
+    def __init__(self, test_size=0.2):
+        self.test_size = test_size
+        self.train_parts = []
+        self.test_parts = []
+        self.added = []
+        self.failed = {}
+
+    def add(self, symbol, df):
+        """
+        Split `df` chronologically: the first (1 - test_size) rows go to train, the rest to test.
+        """
+        if df is None or len(df) == 0:
+            raise ValueError("no rows")
+        split_size = int(len(df) * (1 - self.test_size))
+        self.train_parts.append(df.iloc[:split_size])
+        self.test_parts.append(df.iloc[split_size:])
+        self.added.append(symbol)
+
+    def fail(self, symbol, reason):
+        self.failed[symbol] = str(reason)
+
+    @contextmanager
+    def symbol(self, symbol):
+        """
+        Record any exception raised while preparing `symbol` and carry on with the next one.
+        """
+        try:
+            yield
+        except Exception as e:
+            self.fail(symbol, f"{type(e).__name__}: {e}")
+
+    def test_sets(self):
+        """
+        {symbol: test rows} of every added symbol, for per-symbol results after training.
+        """
+        return dict(zip(self.added, self.test_parts))
+
+    def build(self):
+        """
+        (df_train, df_test) with a fresh RangeIndex, concatenated in a single pass each.
+        """
+        df_train = pd.concat(self.train_parts, ignore_index=True) if self.train_parts else pd.DataFrame()
+        df_test = pd.concat(self.test_parts, ignore_index=True) if self.test_parts else pd.DataFrame()
+        return df_train, df_test
+
+    def report(self):
+        print(f"Dataset built from {len(self.added)} symbols, {len(self.failed)} failed")
+        for symbol, reason in self.failed.items():
+            print(f"{symbol}: {reason}")
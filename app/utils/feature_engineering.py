@@ -103,8 +103,86 @@ def generate_ta_features(df):
     df_features = df_features.dropna()
     return df_features
 
+def _block_sums(d, size):
+    """
+    Running sums of d and d^2 that restart every `size` rows, as (blocks, size) arrays.
+    """
+    padded = np.zeros(-(-len(d) // size) * size)
+    padded[:len(d)] = d
+    blocks = padded.reshape(-1, size)
+    return np.cumsum(blocks, axis=1), np.cumsum(blocks * blocks, axis=1)
+
+
+def _rolling_stats(values, windows):
+    """
+    Rolling mean, var and std of one series for several windows.
+
+    Mean, var and std of a window come from one set of running sums (of x and x^2), so
+    each statistic costs an O(n) difference instead of another rolling pass. The sums
+    restart every `window` rows around that block's own mean: a window then spans at most
+    two blocks whose sums stay small, and trending prices keep full precision instead of
+    cancelling against sums accumulated over the whole history. Follows pandas'
+    rolling(window) conventions: windows with a missing value are NaN, var/std use ddof=1
+    and a constant window has exactly its value as mean and 0 as var.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    bad = ~np.isfinite(x)
+    clean = np.where(bad, 0.0, x)
+    bad_count = np.concatenate([[0], np.cumsum(bad)])
+
+    # Length of the run of identical values ending at each row
+    idx = np.arange(n)
+    same = np.zeros(n, dtype=bool)
+    same[1:] = (x[1:] == x[:-1]) & ~bad[1:] & ~bad[:-1]
+    run = idx - np.maximum.accumulate(np.where(same, 0, idx)) + 1
+
+    stats_by_window = {}
+    for window in windows:
+        out = {name: np.full(n, np.nan) for name in ('mean', 'var', 'std')}
+        stats_by_window[window] = out
+        if window > n:
+            continue
+
+        # Blocks of `window` rows, each centred on the mean of its valid values
+        block = idx // window
+        counts = np.bincount(block, weights=~bad)
+        ref = np.bincount(block, weights=clean) / np.maximum(counts, 1)
+        sum1, sum2 = _block_sums(np.where(bad, 0.0, x - ref[block]), window)
+
+        # Window [first, last] = tail of block first // window from `offset` on, plus the head of
+        # the next block up to `last` (empty when the window is exactly one block)
+        last = idx[window-1:]
+        first = last - window + 1
+        head_block, tail_block, offset = last // window, first // window, first % window
+        before1 = np.where(offset > 0, sum1[tail_block, offset - 1], 0.0)
+        before2 = np.where(offset > 0, sum2[tail_block, offset - 1], 0.0)
+        tail1, tail2 = sum1[tail_block, -1] - before1, sum2[tail_block, -1] - before2
+        spans = head_block != tail_block
+        head_n = np.where(spans, last % window + 1, 0)
+        head1 = np.where(spans, sum1[head_block, last % window], 0.0)
+        head2 = np.where(spans, sum2[head_block, last % window], 0.0)
+
+        # Combine both parts around the window mean, measured from the tail block's reference
+        shift = ref[head_block] - ref[tail_block]
+        delta = (tail1 + head1 + head_n * shift) / window
+        tail_dev, head_dev = -delta, shift - delta
+        m2 = (tail2 + 2 * tail_dev * tail1 + (window - head_n) * tail_dev * tail_dev
+              + head2 + 2 * head_dev * head1 + head_n * head_dev * head_dev)
+        mean = ref[tail_block] + delta
+        var = m2 / (window - 1)
+
+        valid = bad_count[window:] - bad_count[:-window] == 0
+        constant = run[window-1:] >= window
+        var = np.where(constant, 0.0, np.clip(var, 0, None))
+        out['mean'][window-1:] = np.where(valid, np.where(constant, x[window-1:], mean), np.nan)
+        out['var'][window-1:] = np.where(valid, var, np.nan)
+        out['std'][window-1:] = np.sqrt(out['var'][window-1:])
+    return stats_by_window
+
+
 def generate_statistical_features(df, windows=[20,50,200], price_col='close', 
-                                high_col='high', low_col='low', volume_col='volume'):
+                                high_col='high', low_col='low', volume_col='volume', dtype=np.float64):
     """
     Generate comprehensive statistical features for financial time series data.
     Focuses purely on statistical measures without technical indicators.
@@ -123,6 +201,8 @@ def generate_statistical_features(df, windows=[20,50,200], price_col='close',
         Name of the low price column
     volume_col : str
         Name of the volume column
+    dtype : numpy dtype
+        dtype of the generated feature columns (e.g. np.float32 to halve memory)
     
     Returns:
     --------
@@ -130,53 +210,72 @@ def generate_statistical_features(df, windows=[20,50,200], price_col='close',
         DataFrame with additional statistical features
     """
     
-    # Create a copy of the dataframe to avoid modifying the original
-    df_features = df.copy()
-    
-    # Calculate features for each window size
+    close = df[price_col].to_numpy(dtype=np.float64)
+    high = df[high_col]
+    low = df[low_col]
+    volume = df[volume_col].to_numpy(dtype=np.float64)
+
+    # Shared primitives: computed once and reused by every window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_returns = np.log(close[1:] / close[:-1])
+    log_returns = np.concatenate([[np.nan], log_returns])
+    price_stats = _rolling_stats(close, windows)
+    log_return_stats = _rolling_stats(log_returns, windows)
+    volume_stats = _rolling_stats(volume, windows)
+
+    features = {}
     for window in windows:
         # Returns
-        df_features[f'returns_{window}'] = df[price_col].pct_change(periods=window)
-        
+        returns = np.full(len(close), np.nan)
+        if window < len(close):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns[window:] = close[window:] / close[:-window] - 1
+        features[f'returns_{window}'] = returns
+
         # Log returns and statistics
-        log_returns = np.log(df[price_col]/df[price_col].shift(1))
-        df_features[f'log_returns_{window}'] = log_returns.rolling(window=window).mean()
-        df_features[f'log_returns_std_{window}'] = log_returns.rolling(window=window).std()
-        
+        features[f'log_returns_{window}'] = log_return_stats[window]['mean']
+        features[f'log_returns_std_{window}'] = log_return_stats[window]['std']
+
         # Statistical moments
-        df_features[f'mean_{window}'] = df[price_col].rolling(window=window).mean()
-        df_features[f'std_{window}'] = df[price_col].rolling(window=window).std()
-        df_features[f'var_{window}'] = df[price_col].rolling(window=window).var()
-        df_features[f'skew_{window}'] = df[price_col].rolling(window=window).skew()
-        df_features[f'kurt_{window}'] = df[price_col].rolling(window=window).kurt()
-        
+        moments = price_stats[window]
+        rolling_price = df[price_col].rolling(window=window)
+        features[f'mean_{window}'] = moments['mean']
+        features[f'std_{window}'] = moments['std']
+        features[f'var_{window}'] = moments['var']
+        features[f'skew_{window}'] = rolling_price.skew().to_numpy()
+        features[f'kurt_{window}'] = rolling_price.kurt().to_numpy()
+
         # Quantile measures
-        df_features[f'quantile_25_{window}'] = df[price_col].rolling(window=window).quantile(0.25)
-        df_features[f'quantile_75_{window}'] = df[price_col].rolling(window=window).quantile(0.75)
-        df_features[f'iqr_{window}'] = (
-            df_features[f'quantile_75_{window}'] - df_features[f'quantile_25_{window}'])
-        
+        q25 = rolling_price.quantile(0.25).to_numpy()
+        q75 = rolling_price.quantile(0.75).to_numpy()
+        features[f'quantile_25_{window}'] = q25
+        features[f'quantile_75_{window}'] = q75
+        features[f'iqr_{window}'] = q75 - q25
+
         # Volatility measures
-        df_features[f'realized_vol_{window}'] = (
-            df_features[f'returns_{window}'].rolling(window=window).std() * np.sqrt(252))
-        df_features[f'range_vol_{window}'] = (
-            (df[high_col].rolling(window=window).max() - 
-             df[low_col].rolling(window=window).min()) / df[price_col])
-        
+        features[f'realized_vol_{window}'] = (
+            _rolling_stats(returns, [window])[window]['std'] * np.sqrt(252))
+        features[f'range_vol_{window}'] = (
+            (high.rolling(window=window).max() - low.rolling(window=window).min()).to_numpy() / close)
+
         # Z-scores and normalized values
-        df_features[f'zscore_{window}'] = (
-            (df[price_col] - df[price_col].rolling(window=window).mean()) / 
-            df[price_col].rolling(window=window).std())
-        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features[f'zscore_{window}'] = (close - moments['mean']) / moments['std']
+
         # Volume statistics
-        df_features[f'volume_mean_{window}'] = df[volume_col].rolling(window=window).mean()
-        df_features[f'volume_std_{window}'] = df[volume_col].rolling(window=window).std()
-        df_features[f'volume_zscore_{window}'] = (
-            (df[volume_col] - df[volume_col].rolling(window=window).mean()) / 
-            df[volume_col].rolling(window=window).std())
-        df_features[f'volume_skew_{window}'] = df[volume_col].rolling(window=window).skew()
-        df_features[f'volume_kurt_{window}'] = df[volume_col].rolling(window=window).kurt()
-        
+        volume_moments = volume_stats[window]
+        rolling_volume = df[volume_col].rolling(window=window)
+        features[f'volume_mean_{window}'] = volume_moments['mean']
+        features[f'volume_std_{window}'] = volume_moments['std']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features[f'volume_zscore_{window}'] = (volume - volume_moments['mean']) / volume_moments['std']
+        features[f'volume_skew_{window}'] = rolling_volume.skew().to_numpy()
+        features[f'volume_kurt_{window}'] = rolling_volume.kurt().to_numpy()
+
+    # Assemble once instead of inserting columns one by one
+    features = pd.DataFrame(features, index=df.index).astype(dtype)
+    df_features = pd.concat([df.drop(columns=features.columns, errors='ignore'), features], axis=1)
+
     # Clean up any NaN values
     df_features = df_features.dropna()
     
@@ -0,0 +1,177 @@
+import hashlib
+import inspect
+import os
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+'''
+On-disk cache for engineered features.
+
+Features are stored as uncompressed Arrow IPC (Feather v2) files, one per symbol,
+under a directory named after the feature set. A feature set is identified by a
+hash of the feature function's source (plus any helpers it depends on) and its
+parameters, so editing the function or changing a parameter starts a new set
+instead of serving stale columns. Reads are memory-mapped.
+
+Only the columns a feature function adds are stored; raw OHLCV and targets stay
+with the caller and are joined back on the index, so the same cached features
+serve every horizon. Each file also records a fingerprint of the raw prices it
+was computed from, so a restated history (split or dividend adjustment) is
+recomputed instead of mixed with features on the old scale.
+'''
+
+# Raw input columns (any case) the fingerprint covers; targets and other derived columns are left out
+PRICE_COLUMNS = {'open', 'high', 'low', 'close', 'adj close', 'volume'}
+
+
+def _source(func):
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return f"{func.__module__}.{func.__qualname__}"
+
+
+def feature_set_key(func, params=None, depends=()):
+    """
+    Short hash identifying the output of `func(df, **params)`.
+    `depends` lists other functions whose source the features also rely on.
+    """
+    digest = hashlib.sha1()
+    for f in (func, *depends):
+        digest.update(_source(f).encode())
+    digest.update(orjson.dumps(params or {}, option=orjson.OPT_SORT_KEYS, default=str))
+    return digest.hexdigest()[:16]
+
+
+def input_fingerprint(df, until):
+    """
+    Hash of the raw price rows of `df` up to and including the date `until`.
+    """
+    columns = [column for column in df.columns if str(column).lower() in PRICE_COLUMNS]
+    rows = df.loc[df.index <= until, sorted(columns, key=str) or list(df.select_dtypes('number').columns)]
+    digest = hashlib.sha1(np.ascontiguousarray(rows.to_numpy(dtype=np.float64)).tobytes())
+    if isinstance(rows.index, pd.DatetimeIndex):
+        digest.update(rows.index.asi8.tobytes())
+    return digest.hexdigest()[:16]
+
+
+class FeatureStore:
+    def __init__(self, path="ml_models/features"):
+        self.path = path
+
+    def partition_path(self, symbol, func, params=None, depends=()):
+        feature_set = f"{func.__name__}-{feature_set_key(func, params, depends)}"
+        return os.path.join(self.path, feature_set, f"{symbol}.arrow")
+
+    def read(self, symbol, func, params=None, depends=()):
+        """
+        Cached features of `symbol` as a DataFrame, or None if nothing is stored yet.
+        """
+        path = self.partition_path(symbol, func, params, depends)
+        if not os.path.exists(path):
+            return None
+        table = feather.read_table(path, memory_map=True)
+        features = table.to_pandas()
+        metadata = table.schema.metadata or {}
+        features.attrs['source_start'] = pd.Timestamp(metadata.get(b'source_start', b'').decode() or None)
+        features.attrs['fingerprint'] = metadata.get(b'fingerprint', b'').decode()
+        return features
+
+    def write(self, symbol, func, features, source_start, params=None, depends=(), fingerprint=''):
+        path = self.partition_path(symbol, func, params, depends)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(features, preserve_index=True)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'source_start'] = str(pd.Timestamp(source_start)).encode()
+        metadata[b'fingerprint'] = fingerprint.encode()
+        table = table.replace_schema_metadata(metadata)
+        # Write next to the target and swap, so readers never see a partial file
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+        return path
+
+    def get(self, symbol, df, func, params=None, depends=(), lookback=None, cumulative=None, refresh=False):
+        """
+        `func(df, **params)` for `symbol`, computing only what is not cached yet.
+
+        `df` is the raw frame indexed by date (oldest first). Cached features are reused
+        when they were built from the same start date and the same raw prices up to the last
+        cached date (see input_fingerprint); dates after the last cached one are
+        computed and appended. By default the whole `df` is passed to `func` for those new
+        dates; with `lookback` set, only that many rows before the first new date are passed.
+        The lookback has to cover the longest window, and for recursive smoothing (EMAs) enough
+        rows for the cut to wear off. Running totals (OBV, A/D line) restart at the cut, so list
+        them in `cumulative` as {column: 'sum' or 'product'}: the new values are shifted (or
+        scaled) to continue from the cached value at the last cached date. Appending assumes a
+        feature at a date only depends on data up to that date; pass refresh=True otherwise.
+        Returns `df` joined with the feature columns on the dates `func` kept.
+        """
+        params = params or {}
+        cumulative = cumulative or {}
+        if df is None or df.empty:
+            return df
+
+        cached = None if refresh else self.read(symbol, func, params, depends)
+        if cached is not None and cached.attrs.get('source_start') != pd.Timestamp(df.index[0]):
+            cached = None
+        if cached is not None and len(cached) and df.index[-1] < cached.index[-1]:
+            # Too short to check against the fingerprint: compute, but keep the longer cache
+            features = self._compute(df, func, params)
+            return df.drop(columns=features.columns, errors='ignore').join(features, how='inner')
+        if cached is not None and len(cached) and \
+                cached.attrs.get('fingerprint') != input_fingerprint(df, cached.index[-1]):
+            print(f"{symbol}: raw prices changed since the features were cached, recomputing")
+            cached = None
+
+        if cached is not None and len(cached):
+            last_date = cached.index[-1]
+            new_dates = df.index > last_date
+            if new_dates.any():
+                first_new = int(new_dates.argmax())
+                start = 0 if lookback is None else max(first_new - lookback, 0)
+                fresh = self._compute(df.iloc[start:], func, params)
+                if start > 0 and cumulative:
+                    if last_date in fresh.index:
+                        fresh = self._continue_totals(fresh, cached, last_date, cumulative)
+                    else:
+                        # func dropped the overlap row, so there is nothing to continue from
+                        fresh = self._compute(df, func, params)
+                fresh = fresh[fresh.index > last_date]
+                cached.attrs = {}
+                features = pd.concat([cached, fresh])
+                self._write_for(symbol, func, features, df, params, depends)
+            else:
+                features = cached
+        else:
+            features = self._compute(df, func, params)
+            self._write_for(symbol, func, features, df, params, depends)
+
+        features = features[features.index <= df.index[-1]]
+        return df.drop(columns=features.columns, errors='ignore').join(features, how='inner')
+
+    def _write_for(self, symbol, func, features, df, params, depends):
+        fingerprint = input_fingerprint(df, features.index[-1]) if len(features) else ''
+        self.write(symbol, func, features, df.index[0], params, depends, fingerprint)
+
+    @staticmethod
+    def _continue_totals(fresh, cached, last_date, cumulative):
+        fresh = fresh.copy()
+        for column, kind in cumulative.items():
+            # The last cached date is part of the lookback rows, so both runs have a value there
+            before, after = cached.at[last_date, column], fresh.at[last_date, column]
+            if kind == 'sum':
+                fresh[column] += before - after
+            else:
+                fresh[column] *= before / after
+        return fresh
+
+    @staticmethod
+    def _compute(df, func, params):
+        out = func(df.copy(), **params)
+        return out[[column for column in out.columns if column not in df.columns]]
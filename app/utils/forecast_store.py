@@ -0,0 +1,93 @@
+import io
+import os
+
+import numpy as np
+
+
+'''
+Per-symbol store of Prophet forecasts written by ml_models/prophet_batch.py.
+
+Each forecast is an .npz of compact arrays (dates as int32 days since
+1970-01-01, prices as float32) plus the key it was computed from, so the batch
+job can tell whether a symbol needs a new fit and the API can serve a forecast
+without importing Prophet. The fitted Stan parameters of each symbol are kept
+in a second archive so the next fit can start from them.
+'''
+
+
+def to_payload(arrays):
+    """
+    JSON-ready dict in the shape PricePredictor.run returns, built from forecast arrays.
+    """
+    def dates(days):
+        return np.datetime_as_string(np.asarray(days).astype('datetime64[D]')).tolist()
+
+    def prices(values):
+        # float32 -> float64 and back to cents, so 12.35 is not served as 12.350000381
+        return np.round(np.asarray(values, dtype=np.float64), 2).tolist()
+
+    rmse, mape, r2 = np.asarray(arrays['metrics']).tolist()
+    return {'rmse': rmse, 'mape': int(mape), 'r2Score': int(r2), 'historicalPrice': prices(arrays['history_price']),
+            'predictionDate': dates(arrays['prediction_dates']), 'upperBand': prices(arrays['upper']),
+            'lowerBand': prices(arrays['lower']), 'meanResult': prices(arrays['mean'])}
+
+
+class ForecastStore:
+    def __init__(self, path="json/prophet-forecast"):
+        self.path = path
+
+    def file(self, symbol):
+        return os.path.join(self.path, f"{symbol}.npz")
+
+    def cached_key(self, symbol):
+        """
+        Key of the stored forecast, or None. Only the key member of the archive is read.
+        """
+        path = self.file(symbol)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as archive:
+            return str(archive['key'])
+
+    def params_file(self, symbol):
+        return os.path.join(self.path, f"{symbol}.params.npz")
+
+    def _write(self, path, arrays):
+        os.makedirs(self.path, exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        # Write next to the target and swap, so readers never see a partial file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+    def write(self, symbol, key, arrays):
+        self._write(self.file(symbol), {'key': np.array(key), **arrays})
+
+    def write_params(self, symbol, state):
+        self._write(self.params_file(symbol), state)
+
+    def read_params(self, symbol):
+        """
+        Saved fit state of `symbol` (see PricePredictor.fit_state), or None.
+        """
+        path = self.params_file(symbol)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as archive:
+            return {name: archive[name] for name in archive.files}
+
+    def read(self, symbol):
+        """
+        Stored forecast arrays of `symbol`, or None.
+        """
+        path = self.file(symbol)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as archive:
+            return {name: archive[name] for name in archive.files if name != 'key'}
+
+    def payload(self, symbol):
+        arrays = self.read(symbol)
+        return to_payload(arrays) if arrays is not None else None
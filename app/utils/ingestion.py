@@ -0,0 +1,69 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+'''
+Concurrent ingestion stage for the training scripts.
+
+Loaders such as price downloads or sqlite queries are blocking, so awaiting them
+inside `async def` runs them one after another. fetch_all runs a blocking
+loader for many symbols on a bounded thread pool, retries transient failures
+with exponential backoff and records how long each symbol took.
+'''
+
+def _load_with_retry(func, symbol, args, kwargs, retries, backoff, retry_on):
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = func(symbol, *args, **kwargs)
+            return result, {'seconds': time.perf_counter() - start, 'attempts': attempt, 'error': None}
+        except retry_on as e:
+            if attempt > retries:
+                return None, {'seconds': time.perf_counter() - start, 'attempts': attempt, 'error': repr(e)}
+            time.sleep(backoff * 2 ** (attempt - 1))
+        except Exception as e:
+            return None, {'seconds': time.perf_counter() - start, 'attempts': attempt, 'error': repr(e)}
+
+
+async def fetch_all(func, symbols, *args, concurrency=8, retries=2, backoff=1.0, retry_on=(OSError,), **kwargs):
+    """
+    Run the blocking loader `func(symbol, *args, **kwargs)` for every symbol with at most
+    `concurrency` calls in flight.
+
+    Exceptions listed in `retry_on` are retried up to `retries` times, sleeping
+    backoff, 2*backoff, ... in between; any other exception fails the symbol at once.
+    Returns (results, stats): results maps symbol -> loader result (None on failure),
+    stats maps symbol -> {'seconds', 'attempts', 'error'}.
+    """
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        futures = [
+            loop.run_in_executor(executor, _load_with_retry, func, symbol, args, kwargs, retries, backoff, retry_on)
+            for symbol in symbols
+        ]
+        outcomes = await asyncio.gather(*futures)
+
+    results, stats = {}, {}
+    for symbol, (result, stat) in zip(symbols, outcomes):
+        results[symbol] = result
+        stats[symbol] = stat
+    return results, stats
+
+
+def summarize(stats, slowest=5):
+    """
+    Print a short report of an ingestion run: totals, failures and the slowest symbols.
+    """
+    if not stats:
+        return
+    failed = {symbol: stat['error'] for symbol, stat in stats.items() if stat['error']}
+    seconds = sorted(((stat['seconds'], symbol) for symbol, stat in stats.items()), reverse=True)
+    total = sum(s for s, _ in seconds)
+    print(f"Loaded {len(stats) - len(failed)}/{len(stats)} symbols, {total:.1f}s of loader time, "
+          f"mean {total / len(stats):.2f}s per symbol")
+    print("Slowest: " + ", ".join(f"{symbol} {s:.2f}s" for s, symbol in seconds[:slowest]))
+    for symbol, error in failed.items():
+        print(f"{symbol} failed: {error}")
@@ -0,0 +1,197 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytz
+
+
+'''
+Shared access to daily OHLCV data with a local per-symbol cache.
+
+Prices are kept as one uncompressed Arrow IPC file per symbol and read back
+memory-mapped. A request only goes to the data source for the dates the cache
+does not cover yet, so daily jobs fetch a few rows per symbol instead of the
+full history. The source is pluggable: YFinanceSource for production,
+FrameSource to serve fixtures without network access.
+
+Yahoo restates the whole adjusted history after a dividend or split. Every
+tail fetch therefore re-reads the last complete cached bar, and when it no
+longer matches the cache the full history is downloaded again, so cached and
+new rows never mix two adjustment scales.
+
+Frames are returned in yf.download's layout (index named 'Date', columns
+Open/High/Low/Close/Adj Close/Volume), so existing callers keep their renames.
+'''
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+# Columns restated by splits (Close) and dividends (Adj Close)
+ADJUSTED_COLUMNS = ['Close', 'Adj Close']
+RESTATE_RTOL = 1e-5
+
+
+def market_date():
+    return pd.Timestamp(datetime.now(pytz.timezone('America/New_York')).date())
+
+
+class YFinanceSource:
+    def fetch(self, symbol, start, end):
+        import yfinance as yf
+        # Ticker.history keeps no module-global state, unlike yf.download, whose shared
+        # result dicts are raced by the concurrent loads of utils.ingestion.fetch_all
+        return yf.Ticker(symbol).history(start=start, end=end, interval="1d", auto_adjust=False, actions=False)
+
+
+class FrameSource:
+    """
+    Serves prices from in-memory frames (symbol -> DataFrame in yf.download layout).
+    """
+    def __init__(self, frames):
+        self.frames = frames
+
+    def fetch(self, symbol, start, end):
+        df = self.frames.get(symbol)
+        if df is None:
+            return pd.DataFrame(columns=PRICE_COLUMNS)
+        return df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))]
+
+
+def _normalize(df):
+    df = df[[column for column in PRICE_COLUMNS if column in df.columns]].copy()
+    df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+    df.index.name = 'Date'
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+class PriceCache:
+    def __init__(self, path="json/price-cache", source=None):
+        self.path = path
+        self.source = source or YFinanceSource()
+
+    def _file(self, symbol):
+        return os.path.join(self.path, f"{symbol}.arrow")
+
+    def read(self, symbol):
+        """
+        Cached prices, the [start, end) range they cover and the market date they were
+        fetched on, or (None, None, None, None).
+        """
+        path = self._file(symbol)
+        if not os.path.exists(path):
+            return None, None, None, None
+        table = feather.read_table(path, memory_map=True)
+        metadata = table.schema.metadata or {}
+        # split_blocks keeps each column as its own block so numeric columns are not copied
+        df = table.to_pandas(split_blocks=True)
+        # Files written before the fetch date was recorded count as fetched today: the last bar is refreshed once
+        fetched = pd.Timestamp(metadata[b'fetched'].decode()) if b'fetched' in metadata else market_date()
+        return df, pd.Timestamp(metadata[b'start'].decode()), pd.Timestamp(metadata[b'end'].decode()), fetched
+
+    def write(self, symbol, df, start, end):
+        os.makedirs(self.path, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'start'] = str(pd.Timestamp(start)).encode()
+        metadata[b'end'] = str(pd.Timestamp(end)).encode()
+        metadata[b'fetched'] = str(market_date()).encode()
+        tmp_path = f"{self._file(symbol)}.tmp"
+        feather.write_feather(table.replace_schema_metadata(metadata), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, self._file(symbol))
+
+    def _fetch_full(self, symbol, start, end):
+        df = _normalize(self.source.fetch(symbol, start, end))
+        self.write(symbol, df, start, end)
+        return df
+
+    def load(self, symbol, start, end):
+        """
+        Daily prices of `symbol` in [start, end), like yf.download(symbol, start, end).
+
+        Only the dates the cache does not cover are fetched, starting from the last complete
+        cached bar. The cache is rebuilt when that bar was restated. A last bar fetched on
+        its own trading day may be partial and is fetched again on every load until a later
+        day's fetch.
+        """
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end).normalize()
+        cached, cached_start, cached_end, fetched_on = self.read(symbol)
+
+        if cached is None or not len(cached):
+            return self._fetch_full(symbol, start, end)
+
+        new_start, new_end = min(start, cached_start), max(end, cached_end)
+        if start < cached_start:
+            # Older rows would have to match the cached scale; one full download is simpler
+            df = self._fetch_full(symbol, new_start, new_end)
+            return df[(df.index >= start) & (df.index < end)]
+
+        partial = cached.index[-1] >= fetched_on
+        if end > cached_end or partial:
+            # The bar before a possibly partial last bar was complete when it was cached
+            reference = cached.index[-2] if partial and len(cached) > 1 else cached.index[-1]
+            tail = _normalize(self.source.fetch(symbol, reference, new_end))
+            if not len(tail):
+                # Nothing came back (source error or no new bars): keep serving the cache
+                df = cached
+            elif self._restated(cached, tail, reference):
+                print(f"{symbol}: prices were restated since they were cached, downloading the full history")
+                df = _normalize(self.source.fetch(symbol, new_start, new_end))
+                if len(df):
+                    self.write(symbol, df, new_start, new_end)
+                else:
+                    df = cached
+            else:
+                df = _normalize(pd.concat([cached, tail]))
+                self.write(symbol, df, new_start, new_end)
+        else:
+            df = cached
+        return df[(df.index >= start) & (df.index < end)]
+
+    @staticmethod
+    def _restated(cached, tail, reference):
+        if reference not in tail.index:
+            return True
+        columns = [column for column in ADJUSTED_COLUMNS if column in cached.columns and column in tail.columns]
+        old = cached.loc[reference, columns].to_numpy(dtype=np.float64)
+        new = tail.loc[reference, columns].to_numpy(dtype=np.float64)
+        return not np.allclose(old, new, rtol=RESTATE_RTOL, atol=0, equal_nan=True)
+
+
+_default_cache = None
+
+
+def load_prices(symbol, start, end, cache=None):
+    """
+    yf.download(symbol, start, end, interval="1d") served through the shared price cache.
+    """
+    global _default_cache
+    if cache is None:
+        if _default_cache is None:
+            _default_cache = PriceCache()
+        cache = _default_cache
+    return cache.load(symbol, start, end)
+
+
+def prices_asof(prices, dates, max_days_back=9):
+    """
+    Last available price on or before each of `dates`, in one vectorized as-of lookup.
+
+    `prices` is a Series indexed by date. Dates with no price within `max_days_back`
+    days get NaN. Returns a float array aligned with `dates`.
+    """
+    prices = prices.dropna()
+    prices = prices[~prices.index.duplicated(keep='last')].sort_index()
+    dates = pd.DatetimeIndex(pd.to_datetime(dates)).tz_localize(None)
+    result = np.full(len(dates), np.nan)
+    if prices.empty:
+        return result
+
+    price_dates = pd.DatetimeIndex(prices.index).tz_localize(None)
+    pos = price_dates.searchsorted(dates, side='right') - 1
+    found = pos >= 0
+    lag = (dates[found] - price_dates[pos[found]]).days
+    matched = np.flatnonzero(found)[lag <= max_days_back]
+    result[matched] = prices.to_numpy(dtype=np.float64)[pos[matched]]
+    return result
@@ -0,0 +1,84 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+
+def load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models, keyed by (model_type, horizon, version).
+
+    A model is deserialized once and served from memory until its file changes on
+    disk (mtime or size), so retraining is picked up without a restart. Entries are
+    evicted least-recently-used once the summed size of their weight files exceeds
+    `max_bytes`. Safe to share between threads: a model is loaded by one thread
+    while others asking for the same key wait for it.
+    """
+    def __init__(self, max_bytes=2 * 1024**3):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key, path, stamp):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['path'] == path and entry['stamp'] == stamp:
+                self._entries.move_to_end(key)
+                return entry['model']
+        return None
+
+    def get(self, key, path, loader=load_pickle, sizer=None):
+        """
+        Model stored at `path`, loaded with `loader(path)` on first use or when the file changed.
+        `sizer(path)` gives the bytes the entry counts towards `max_bytes` when `path` is only
+        a marker for a larger set of files (default: the size of `path`).
+        """
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        model = self._lookup(key, path, stamp)
+        if model is not None:
+            return model
+
+        with self._key_lock(key):
+            # Another thread may have loaded it while we waited
+            model = self._lookup(key, path, stamp)
+            if model is not None:
+                return model
+            model = loader(path)
+            size = sizer(path) if sizer is not None else stat.st_size
+            with self._lock:
+                self._entries[key] = {'model': model, 'path': path, 'stamp': stamp, 'size': size}
+                self._entries.move_to_end(key)
+                self._evict()
+        return model
+
+    def _evict(self):
+        # Keep at least the most recently used model, even if it alone exceeds the cap
+        total = sum(entry['size'] for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry['size']
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def loaded(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+
+registry = ModelRegistry()
@@ -0,0 +1,193 @@
+import numpy as np
+
+
+DEFAULT_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def get_rng(seed=None):
+    """
+    Return a numpy Generator. `seed` may be None, an int or an existing Generator.
+    """
+    return np.random.default_rng(seed)
+
+
+def chunk_rows(days, max_memory_mb=256, dtype=np.float64):
+    """
+    Number of paths that fit into `max_memory_mb` when a (rows, days) matrix is materialized.
+    """
+    row_bytes = max(days, 1) * np.dtype(dtype).itemsize
+    return max(int(max_memory_mb * 1024 * 1024 // row_bytes), 1)
+
+
+def simulate_paths(start_price, days, mu, sigma, runs, dt=1/365, seed=None):
+    """
+    Simulate `runs` price paths of length `days` in one shot.
+
+    Same model as the original `stock_monte_carlo` loop:
+    price[x] = price[x-1] * (1 + drift + shock) with drift = mu*dt and
+    shock ~ N(mu*dt, sigma*sqrt(dt)). Returns an array of shape (runs, days).
+    """
+    rng = get_rng(seed)
+    paths = np.empty((runs, days))
+    paths[:, 0] = start_price
+    if days > 1:
+        growth = rng.normal(loc=mu*dt, scale=sigma*np.sqrt(dt), size=(runs, days-1))
+        growth += 1 + mu*dt
+        np.cumprod(growth, axis=1, out=growth)
+        paths[:, 1:] = start_price * growth
+    return paths
+
+
+def simulate_terminal_prices(start_price, days, mu, sigma, runs, dt=1/365, seed=None, max_memory_mb=256):
+    """
+    Final price of `runs` simulated paths.
+
+    Shocks are drawn in chunks of paths so that at most ~`max_memory_mb` is held
+    at once, which keeps 1M+ paths over a year within a fixed memory budget.
+    """
+    rng = get_rng(seed)
+    terminal = np.empty(runs)
+    if days <= 1:
+        terminal[:] = start_price
+        return terminal
+
+    step = chunk_rows(days-1, max_memory_mb)
+    for lo in range(0, runs, step):
+        hi = min(lo + step, runs)
+        growth = rng.normal(loc=mu*dt, scale=sigma*np.sqrt(dt), size=(hi-lo, days-1))
+        growth += 1 + mu*dt
+        terminal[lo:hi] = start_price * np.prod(growth, axis=1)
+    return terminal
+
+
+def value_at_risk(start_price, terminal_prices, confidence=0.99):
+    """
+    VaR and CVaR (expected shortfall) in price units at the given confidence level.
+    """
+    q = np.percentile(terminal_prices, (1-confidence)*100)
+    tail = terminal_prices[terminal_prices <= q]
+    expected_tail = tail.mean() if tail.size else q
+    return {
+        'q': float(q),
+        'var': float(start_price - q),
+        'cvar': float(start_price - expected_tail),
+    }
+
+
+def monte_carlo_risk(start_price, days, mu, sigma, runs=10_000, dt=1/365, confidence=0.99,
+                     percentiles=DEFAULT_PERCENTILES, seed=None, max_memory_mb=256):
+    """
+    Run the Monte Carlo simulation and summarize the terminal price distribution.
+
+    Returns a dict with the start price, the mean final price, the requested
+    terminal-price percentiles, VaR and CVaR at `confidence`.
+    """
+    terminal = simulate_terminal_prices(start_price, days, mu, sigma, runs, dt=dt,
+                                        seed=seed, max_memory_mb=max_memory_mb)
+    risk = value_at_risk(start_price, terminal, confidence=confidence)
+    bands = np.percentile(terminal, percentiles)
+
+    return {
+        'startPrice': float(start_price),
+        'meanPrice': float(terminal.mean()),
+        'percentiles': {str(p): float(v) for p, v in zip(percentiles, bands)},
+        'q': risk['q'],
+        'var': risk['var'],
+        'cvar': risk['cvar'],
+    }
+
+
+def estimate_moments(prices):
+    """
+    Mean vector and covariance matrix of daily returns from a (dates, symbols) price matrix.
+
+    Dates where any symbol has no price are dropped so the covariance is estimated on a common window.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    returns = np.diff(prices, axis=0) / prices[:-1]
+    returns = returns[~np.isnan(returns).any(axis=1)]
+    if len(returns) < 2:
+        raise ValueError("Not enough overlapping history to estimate the covariance matrix.")
+    return returns.mean(axis=0), np.cov(returns, rowvar=False)
+
+
+def cholesky_factor(cov):
+    """
+    Lower factor L with L @ L.T == cov. Falls back to an eigen decomposition
+    when the estimated covariance is only positive semi-definite (e.g. duplicated symbols).
+    """
+    cov = np.atleast_2d(cov)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        return eigvecs * np.sqrt(np.clip(eigvals, 0, None))
+
+
+def simulate_portfolio_terminal(start_prices, days, mu, cov, runs, dt=1/365, seed=None, max_memory_mb=256):
+    """
+    Final prices of all assets for `runs` correlated paths, shape (runs, n_assets).
+
+    Shocks for a whole block of paths are drawn as independent normals and
+    correlated with one batched matmul against the Cholesky factor of `cov`,
+    so the step model matches simulate_paths per asset. Paths are processed in
+    chunks so at most ~`max_memory_mb` of shocks is held at once.
+    """
+    rng = get_rng(seed)
+    start_prices = np.asarray(start_prices, dtype=np.float64)
+    mu = np.asarray(mu, dtype=np.float64)
+    n_assets = len(start_prices)
+    terminal = np.empty((runs, n_assets))
+    if days <= 1:
+        terminal[:] = start_prices
+        return terminal
+
+    factor = cholesky_factor(np.asarray(cov, dtype=np.float64) * dt)
+    step = chunk_rows((days-1) * n_assets, max_memory_mb)
+    for lo in range(0, runs, step):
+        hi = min(lo + step, runs)
+        growth = rng.standard_normal(size=(hi-lo, days-1, n_assets)) @ factor.T
+        # shock is centred on mu*dt and drift adds another mu*dt, as in the single-asset model
+        growth += 1 + 2*mu*dt
+        terminal[lo:hi] = start_prices * np.prod(growth, axis=1)
+    return terminal
+
+
+def portfolio_risk(start_prices, weights, days, mu, cov, runs=10_000, dt=1/365, confidence=0.99,
+                   percentiles=DEFAULT_PERCENTILES, portfolio_value=1.0, seed=None, max_memory_mb=256):
+    """
+    Portfolio-level Monte Carlo risk for correlated assets.
+
+    `weights` are the fractions of `portfolio_value` allocated to each asset at the start.
+    Returns the same summary as monte_carlo_risk, in units of portfolio value.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    start_prices = np.asarray(start_prices, dtype=np.float64)
+    if weights.shape != start_prices.shape:
+        raise ValueError("weights and start_prices must have the same length.")
+
+    terminal = simulate_portfolio_terminal(start_prices, days, mu, cov, runs, dt=dt,
+                                           seed=seed, max_memory_mb=max_memory_mb)
+    values = portfolio_value * ((terminal / start_prices) @ weights)
+    start_value = portfolio_value * weights.sum()
+    risk = value_at_risk(start_value, values, confidence=confidence)
+    bands = np.percentile(values, percentiles)
+
+    return {
+        'startPrice': float(start_value),
+        'meanPrice': float(values.mean()),
+        'percentiles': {str(p): float(v) for p, v in zip(percentiles, bands)},
+        'q': risk['q'],
+        'var': risk['var'],
+        'cvar': risk['cvar'],
+    }
+
+
+def portfolio_risk_from_prices(prices, weights, days=365, runs=10_000, **kwargs):
+    """
+    Convenience wrapper: estimate moments from a (dates, symbols) price matrix
+    and run portfolio_risk starting from the latest prices.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    mu, cov = estimate_moments(prices)
+    return portfolio_risk(prices[-1], weights, days, mu, cov, runs=runs, **kwargs)
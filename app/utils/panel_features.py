@@ -0,0 +1,499 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from scipy.signal import lfilter
+
+from utils.streaming_features import TA_FEATURE_COLUMNS
+
+
+'''
+Panel (dates x symbols) versions of generate_ta_features and generate_statistical_features.
+
+Every field is a 2-D float array with one column per symbol. Indicators are
+computed column-wise with NumPy/SciPy, so the per-symbol pandas overhead of
+the single-frame functions is paid once per panel instead of once per ticker.
+
+Symbols do not need to share a calendar: each column is compacted to its own
+valid rows before computing (so a late listing or a missing day behaves exactly
+like the single-symbol functions, which never see that row) and the results are
+scattered back to the panel's dates.
+'''
+
+
+def panel_from_frames(frames, fields=('open', 'high', 'low', 'close', 'volume')):
+    """
+    Build a panel from per-symbol OHLCV frames indexed by date.
+
+    Returns (dates, symbols, {field: (dates x symbols) float64 array}).
+    """
+    symbols = list(frames.keys())
+    dates = pd.DatetimeIndex(sorted(set().union(*(frames[symbol].index for symbol in symbols)))) if symbols else pd.DatetimeIndex([])
+    panel = {}
+    for field in fields:
+        panel[field] = pd.DataFrame({symbol: frames[symbol][field] for symbol in symbols}, index=dates).to_numpy(dtype=np.float64)
+    return dates, symbols, panel
+
+
+def _shift(a, n=1):
+    out = np.full_like(a, np.nan)
+    if 0 < n < len(a):
+        out[n:] = a[:-n]
+    return out
+
+
+def _window_sum(a, window):
+    # Rolling sum over axis 0; windows containing NaN/inf are NaN (pandas min_periods=window)
+    bad = ~np.isfinite(a)
+    zeros = np.zeros((1,) + a.shape[1:])
+    sums = np.concatenate([zeros, np.cumsum(np.where(bad, 0.0, a), axis=0)])
+    bad_counts = np.concatenate([zeros, np.cumsum(bad, axis=0)])
+    out = np.full_like(a, np.nan)
+    if window <= len(a):
+        total = sums[window:] - sums[:-window]
+        out[window-1:] = np.where(bad_counts[window:] - bad_counts[:-window] > 0, np.nan, total)
+    return out
+
+
+def _rolling_mean(a, window):
+    return _window_sum(a, window) / window
+
+
+def _rolling_var(a, window, ddof=1):
+    # Running sums of x and x^2 that restart every `window` rows around each block's own mean,
+    # so trending prices do not lose digits to sums over the whole history; a window spans at
+    # most two blocks, combined around the window mean. Windows containing NaN/inf are NaN,
+    # constant ones exactly 0 (as pandas)
+    if a.ndim == 1:
+        return _rolling_var(a[:, None], window, ddof)[:, 0]
+    T = len(a)
+    out = np.full_like(a, np.nan)
+    if window > T:
+        return out
+    bad = ~np.isfinite(a)
+    rows = np.arange(T)
+    n_blocks = -(-T // window)
+    clean = np.zeros((n_blocks * window, a.shape[1]))
+    clean[:T] = np.where(bad, 0.0, a)
+    valid = np.zeros(clean.shape, dtype=bool)
+    valid[:T] = ~bad
+    clean = clean.reshape(n_blocks, window, a.shape[1])
+    valid = valid.reshape(clean.shape)
+    ref = clean.sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+    deviation = np.where(valid, clean - ref[:, None], 0.0)
+    sum1 = np.cumsum(deviation, axis=1)
+    sum2 = np.cumsum(deviation * deviation, axis=1)
+
+    last = rows[window-1:]
+    first = last - window + 1
+    tail_block, head_block, offset = first // window, last // window, first % window
+    starts = (offset > 0)[:, None]
+    tail1 = sum1[tail_block, -1] - np.where(starts, sum1[tail_block, offset - 1], 0.0)
+    tail2 = sum2[tail_block, -1] - np.where(starts, sum2[tail_block, offset - 1], 0.0)
+    spans = (head_block != tail_block)[:, None]
+    head_n = np.where(spans, (last % window + 1)[:, None], 0)
+    head1 = np.where(spans, sum1[head_block, last % window], 0.0)
+    head2 = np.where(spans, sum2[head_block, last % window], 0.0)
+
+    shift = ref[head_block] - ref[tail_block]
+    delta = (tail1 + head1 + head_n * shift) / window
+    tail_dev, head_dev = -delta, shift - delta
+    m2 = (tail2 + 2 * tail_dev * tail1 + (window - head_n) * tail_dev * tail_dev
+          + head2 + 2 * head_dev * head1 + head_n * head_dev * head_dev)
+
+    same = np.zeros(a.shape, dtype=bool)
+    same[1:] = (a[1:] == a[:-1]) & ~bad[1:] & ~bad[:-1]
+    run = rows[:, None] - np.maximum.accumulate(np.where(same, 0, rows[:, None]), axis=0) + 1
+    constant = run[window-1:] >= window
+    bad_counts = np.concatenate([np.zeros((1, a.shape[1])), np.cumsum(bad, axis=0)])
+    in_window = bad_counts[window:] - bad_counts[:-window] > 0
+    var = np.where(constant, 0.0, np.clip(m2 / (window - ddof), 0, None))
+    out[window-1:] = np.where(in_window, np.nan, var)
+    return out
+
+
+def _rolling_std(a, window, ddof=1):
+    return np.sqrt(_rolling_var(a, window, ddof))
+
+
+def _rolling_extreme(a, window, mode='max', min_periods=None):
+    min_periods = window if min_periods is None else min_periods
+    if mode == 'max':
+        out = maximum_filter1d(np.where(np.isnan(a), -np.inf, a), window, axis=0, mode='nearest', origin=(window-1)//2)
+    else:
+        out = minimum_filter1d(np.where(np.isnan(a), np.inf, a), window, axis=0, mode='nearest', origin=(window-1)//2)
+    if min_periods >= window:
+        out[_window_sum(np.where(np.isnan(a), np.nan, 0.0), window) != 0] = np.nan
+    else:
+        out[:max(min_periods, 1) - 1] = np.nan
+    return out
+
+
+def _rolling_argextreme(a, window, mode='max'):
+    out = np.full_like(a, np.nan)
+    if window <= len(a):
+        view = sliding_window_view(a, window, axis=0)
+        pos = view.argmax(axis=-1) if mode == 'max' else view.argmin(axis=-1)
+        out[window-1:] = np.where(np.isnan(view).any(axis=-1), np.nan, pos)
+    return out
+
+
+def _iir(x, decay, gain, start, init):
+    # y[start] = init, y[t] = decay * y[t-1] + gain * x[t] afterwards
+    out = np.full_like(x, np.nan)
+    if start >= len(x):
+        return out
+    out[start] = init
+    if start + 1 < len(x):
+        out[start+1:], _ = lfilter([gain], [1, -decay], x[start+1:], axis=0, zi=(decay * init)[None, :])
+    return out
+
+
+def _ewm(a, alpha, min_periods):
+    # ewm(adjust=False).mean() for columns that share their first valid row, as after compaction
+    finite_rows = np.flatnonzero(np.isfinite(a).any(axis=1))
+    if not len(finite_rows):
+        return np.full_like(a, np.nan)
+    start = finite_rows[0]
+    out = _iir(a, 1 - alpha, alpha, start, a[start])
+    out[:start + min_periods - 1] = np.nan
+    return out
+
+
+def _ema(a, span):
+    return _ewm(a, 2.0 / (span + 1), span)
+
+
+def _divide(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return a / b
+
+
+def _compact(mask, arrays):
+    # Move every column's valid rows to the top (in time order)
+    order = np.argsort(~mask, axis=0, kind='stable')
+    return order, [np.take_along_axis(a, order, axis=0) for a in arrays]
+
+
+def _expand(order, mask, compacted, dtype):
+    out = np.empty(compacted.shape, dtype=dtype)
+    np.put_along_axis(out, order, compacted.astype(dtype, copy=False), axis=0)
+    out[~mask] = np.nan
+    return out
+
+
+def _adx(high, low, close, window=14):
+    # Same seeding as ta.trend.ADXIndicator (see streaming_features.StreamingFeatures._update_adx)
+    T = len(close)
+    adx = np.zeros_like(close)
+    adx_pos = np.zeros_like(close)
+    adx_neg = np.zeros_like(close)
+    if T <= window:
+        return adx, adx_pos, adx_neg
+
+    prev_close = _shift(close)
+    movement = np.fmax(high, prev_close) - np.fmin(low, prev_close)
+    diff_up = high - _shift(high)
+    diff_down = _shift(low) - low
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+
+    decay = 1 - 1 / window
+    trs = _iir(movement, decay, 1.0, window, movement[1:window+1].sum(axis=0))
+    dip = _iir(pos, decay, 1.0, window, pos[1:window+1].sum(axis=0))
+    din = _iir(neg, decay, 1.0, window, neg[1:window+1].sum(axis=0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        di_pos = np.where(trs != 0, 100 * (dip / trs), 0.0)
+        di_neg = np.where(trs != 0, 100 * (din / trs), 0.0)
+        dx = np.where(di_pos + di_neg != 0, 100 * np.abs((di_pos - di_neg) / (di_pos + di_neg)), 0.0)
+
+    adx_pos[window+1:] = di_pos[window+1:]
+    adx_neg[window+1:] = di_neg[window+1:]
+    seed = 2 * window - 1
+    if seed < T:
+        adx[seed:] = _iir(dx[seed:], decay, 1 / window, 0, dx[window:seed+1].mean(axis=0))
+    return adx, adx_pos, adx_neg
+
+
+def _kama(close, window=10, pow1=2, pow2=30):
+    volatility = _window_sum(np.abs(close - _shift(close)), window)
+    change = np.abs(close - _shift(close, window))
+    efficiency_ratio = np.where(volatility != 0, _divide(change, volatility), 0.0)
+    efficiency_ratio[np.isnan(volatility)] = np.nan
+    smoothing = (efficiency_ratio * (2.0 / (pow1 + 1) - 2.0 / (pow2 + 1.0)) + 2 / (pow2 + 1.0)) ** 2.0
+
+    kama = np.full_like(close, np.nan)
+    if len(close) >= window:
+        kama[window-1] = close[window-1]
+        for t in range(window, len(close)):
+            kama[t] = kama[t-1] + smoothing[t] * (close[t] - kama[t-1])
+    return kama
+
+
+def _compacted_fft(close, n_valid):
+    # |FFT(close)| per column over that column's own history length
+    out = np.full_like(close, np.nan)
+    for n in np.unique(n_valid):
+        if n == 0:
+            continue
+        cols = np.flatnonzero(n_valid == n)
+        out[:n, cols] = np.abs(np.fft.fft(close[:n, cols], axis=0))
+    return out
+
+
+def _ta_block(open_, high, low, close, volume, n_valid):
+    f = {}
+    prev_close = _shift(close)
+
+    f['sma_50'] = _rolling_mean(close, 50)
+    f['sma_200'] = _rolling_mean(close, 200)
+    f['sma_crossover'] = ((f['sma_50'] > f['sma_200']) & (_shift(f['sma_50']) <= _shift(f['sma_200']))).astype(np.float64)
+    f['ema_50'] = _ema(close, 50)
+    f['ema_200'] = _ema(close, 200)
+    f['ema_crossover'] = ((f['ema_50'] > f['ema_200']) & (_shift(f['ema_50']) <= _shift(f['ema_200']))).astype(np.float64)
+
+    wma = np.full_like(close, np.nan)
+    if len(close) >= 30:
+        wma[29:] = sliding_window_view(close, 30, axis=0) @ (np.arange(1, 31) * 2 / (30 * 31))
+    f['wma'] = wma
+
+    conv = 0.5 * (_rolling_extreme(high, 9, 'max') + _rolling_extreme(low, 9, 'min'))
+    base = 0.5 * (_rolling_extreme(high, 26, 'max') + _rolling_extreme(low, 26, 'min'))
+    f['ichimoku_a'] = 0.5 * (conv + base)
+    f['ichimoku_b'] = 0.5 * (_rolling_extreme(high, 52, 'max', min_periods=0) + _rolling_extreme(low, 52, 'min', min_periods=0))
+
+    true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    atr = np.zeros_like(close)
+    if len(close) >= 14:
+        atr[13:] = _iir(true_range[13:], 13 / 14, 1 / 14, 0, true_range[:14].mean(axis=0))
+    f['atr'] = atr
+    f['bb_width'] = 4 * _rolling_std(close, 20, ddof=0) / close
+
+    macd = _ema(close, 12) - _ema(close, 26)
+    macd_signal = _ema(macd, 9)
+    f['macd'] = macd
+    f['macd_signal'] = macd_signal
+    f['macd_hist'] = 2 * (macd - macd_signal)
+    f['adx'], f['adx_pos'], f['adx_neg'] = _adx(high, low, close)
+
+    typical = (high + low + close) / 3.0
+    cci = np.full_like(close, np.nan)
+    if len(close) >= 20:
+        view = sliding_window_view(typical, 20, axis=0)
+        mean = view.mean(axis=-1)
+        mad = np.abs(view - mean[..., None]).mean(axis=-1)
+        cci[19:] = _divide(typical[19:] - mean, 0.015 * mad)
+    f['cci'] = cci
+
+    prev_typical = _shift(typical)
+    flow = typical * volume * np.where(typical > prev_typical, 1, np.where(typical < prev_typical, -1, 0))
+    positive = _window_sum(np.where(flow >= 0, flow, 0.0), 14)
+    negative = np.abs(_window_sum(np.where(flow < 0, flow, 0.0), 14))
+    f['mfi'] = 100 - _divide(100, 1 + _divide(positive, negative))
+
+    pct_change = close / prev_close - 1
+    f['nvi'] = 1000 * np.cumprod(np.where(_shift(volume) > volume, 1.0 + pct_change, 1.0), axis=0)
+    f['obv'] = np.cumsum(np.where(close < prev_close, -volume, volume), axis=0)
+    vpt = pct_change * volume
+    vpt = np.cumsum(np.where(np.isnan(vpt), 0.0, vpt), axis=0)
+    vpt[0] = np.nan
+    f['vpt'] = vpt
+
+    diff = close - prev_close
+    up = _ewm(np.where(diff > 0, diff, 0.0), 1 / 60, 60)
+    down = _ewm(-np.where(diff < 0, diff, 0.0), 1 / 60, 60)
+    rsi = np.where(down == 0, 100, 100 - _divide(100, 1 + _divide(up, down)))
+    f['rsi'] = rsi
+    f['rolling_rsi'] = _rolling_mean(rsi, 10)
+    lowest_rsi = _rolling_extreme(rsi, 60, 'min')
+    f['stoch_rsi'] = _rolling_mean(_divide(rsi - lowest_rsi, _rolling_extreme(rsi, 60, 'max') - lowest_rsi), 3)
+    f['rolling_stoch_rsi'] = _rolling_mean(f['stoch_rsi'], 10)
+
+    clv = _divide((close - low) - (high - close), high - low)
+    clv = np.where(np.isnan(clv), 0.0, clv)
+    f['adi'] = np.cumsum(clv * volume, axis=0)
+    f['cmf'] = _divide(_window_sum(clv * volume, 20), _window_sum(volume, 20))
+    f['emv'] = _divide(((high - _shift(high)) + (low - _shift(low))) * (high - low), 2 * volume) * 100000000
+    f['fi'] = _ema((close - prev_close) * volume, 13)
+
+    highest_14 = _rolling_extreme(high, 14, 'max')
+    f['williams'] = -100 * _divide(highest_14 - close, highest_14 - _rolling_extreme(low, 14, 'min'))
+    f['kama'] = _kama(close)
+
+    lowest_60 = _rolling_extreme(low, 60, 'min')
+    highest_60 = _rolling_extreme(high, 60, 'max')
+    f['stoch_k'] = 100 * _divide(close - lowest_60, highest_60 - lowest_60)
+    f['stoch_d'] = _rolling_mean(f['stoch_k'], 3)
+
+    f['rocr'] = close / _shift(close, 30) - 1
+    f['ppo'] = _divide(f['ema_50'] - f['ema_200'], f['ema_50']) * 100
+    f['vwap'] = _divide(np.cumsum(volume * typical, axis=0), np.cumsum(volume, axis=0))
+    f['volatility_ratio'] = _divide(_rolling_std(close, 30), _rolling_std(close, 60))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n1 = (np.log(_rolling_extreme(high, 30, 'max') - _rolling_extreme(low, 30, 'min')) -
+              np.log(_rolling_extreme(close, 30, 'max') - _rolling_extreme(close, 30, 'min'))) / np.log(2)
+    f['fdi'] = (2 - n1) * 100
+    f['tii'] = _rolling_mean(np.abs(_divide(close - _rolling_mean(close, 20), _rolling_std(close, 20))), 20)
+    f['fft'] = _compacted_fft(close, n_valid)
+
+    mavg_60 = _rolling_mean(close, 60)
+    f['don_hband'] = highest_60
+    f['don_lband'] = lowest_60
+    f['don_mband'] = (highest_60 - lowest_60) / 2.0 + lowest_60
+    f['don_pband'] = _divide(close - lowest_60, highest_60 - lowest_60)
+    f['don_wband'] = _divide(highest_60 - lowest_60, mavg_60) * 100
+
+    aroon_up = _rolling_argextreme(high, 61, 'max') / 60 * 100
+    aroon_down = _rolling_argextreme(low, 61, 'min') / 60 * 100
+    f['aroon_down'] = aroon_down
+    f['aroon_indicator'] = aroon_up - aroon_down
+    f['aroon_up'] = aroon_up
+
+    running_max = _rolling_extreme(close, 60, 'max', min_periods=1)
+    drawdown = 100 * _divide(close - running_max, running_max)
+    f['ulcer'] = np.sqrt(_window_sum(drawdown ** 2, 60) / 60)
+    return f
+
+
+def _rolling_moments(a, window):
+    # Bias-corrected rolling skew and excess kurtosis, with pandas' conventions
+    # (constant window -> 0 / -3, near-zero variance -> NaN). The moments are taken around
+    # each window's own mean, so they stay exact where pandas' running power sums drift with
+    # price/std: the two agree within 1e-3 absolute (ml_models/rolling_parity.py)
+    skew = np.full_like(a, np.nan)
+    kurt = np.full_like(a, np.nan)
+    if window > len(a):
+        return skew, kurt
+
+    view = sliding_window_view(a, window, axis=0)
+    centered = view - view.mean(axis=-1, keepdims=True)
+    n = float(window)
+    squared = centered * centered
+    m2 = squared.mean(axis=-1)
+    m3 = (squared * centered).mean(axis=-1)
+    m4 = (squared * squared).mean(axis=-1)
+    constant = (view == view[..., :1]).all(axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.sqrt(n * (n - 1)) * m3 / ((n - 2) * m2 ** 1.5)
+        k = ((n * n - 1) * m4 / (m2 * m2) - 3 * (n - 1) ** 2) / ((n - 2) * (n - 3))
+    s = np.where(m2 <= 1e-14, np.nan, s)
+    k = np.where(m2 <= 1e-14, np.nan, k)
+    skew[window-1:] = np.where(constant, 0.0, s)
+    kurt[window-1:] = np.where(constant, -3.0, k)
+    return skew, kurt
+
+
+def _rolling_quantiles(a, window, quantiles):
+    out = [np.full_like(a, np.nan) for _ in quantiles]
+    if window <= len(a):
+        values = np.quantile(sliding_window_view(a, window, axis=0), quantiles, axis=-1)
+        for dst, src in zip(out, values):
+            dst[window-1:] = src
+    return out
+
+
+def _statistical_block(close, high, low, volume, n_valid, windows):
+    f = {}
+    log_returns = np.log(close / _shift(close))
+    for window in windows:
+        returns = close / _shift(close, window) - 1
+        f[f'returns_{window}'] = returns
+        f[f'log_returns_{window}'] = _rolling_mean(log_returns, window)
+        f[f'log_returns_std_{window}'] = _rolling_std(log_returns, window)
+
+        mean = _rolling_mean(close, window)
+        var = _rolling_var(close, window)
+        std = np.sqrt(var)
+        f[f'mean_{window}'] = mean
+        f[f'std_{window}'] = std
+        f[f'var_{window}'] = var
+        f[f'skew_{window}'], f[f'kurt_{window}'] = _rolling_moments(close, window)
+
+        q25, q75 = _rolling_quantiles(close, window, [0.25, 0.75])
+        f[f'quantile_25_{window}'] = q25
+        f[f'quantile_75_{window}'] = q75
+        f[f'iqr_{window}'] = q75 - q25
+
+        f[f'realized_vol_{window}'] = _rolling_std(returns, window) * np.sqrt(252)
+        f[f'range_vol_{window}'] = (_rolling_extreme(high, window, 'max') - _rolling_extreme(low, window, 'min')) / close
+        f[f'zscore_{window}'] = _divide(close - mean, std)
+
+        volume_mean = _rolling_mean(volume, window)
+        volume_std = _rolling_std(volume, window)
+        f[f'volume_mean_{window}'] = volume_mean
+        f[f'volume_std_{window}'] = volume_std
+        f[f'volume_zscore_{window}'] = _divide(volume - volume_mean, volume_std)
+        f[f'volume_skew_{window}'], f[f'volume_kurt_{window}'] = _rolling_moments(volume, window)
+    return f
+
+
+def _run_panel(block, fields, dtype, chunk_size, **kwargs):
+    close = fields['close']
+    T, S = close.shape
+    mask = np.isfinite(close)
+    for a in fields.values():
+        mask &= np.isfinite(a)
+
+    features = None
+    for lo in range(0, S, chunk_size):
+        hi = min(lo + chunk_size, S)
+        order, compacted = _compact(mask[:, lo:hi], [fields[name][:, lo:hi] for name in fields])
+        chunk = block(*compacted, n_valid=mask[:, lo:hi].sum(axis=0), **kwargs)
+        if features is None:
+            features = {name: np.empty((T, S), dtype=dtype) for name in chunk}
+        for name, values in chunk.items():
+            features[name][:, lo:hi] = _expand(order, mask[:, lo:hi], values, dtype)
+    return features or {}
+
+
+def panel_ta_features(open_, high, low, close, volume, dtype=np.float64, chunk_size=256):
+    """
+    generate_ta_features for a whole panel.
+
+    Each argument is a (dates x symbols) array. Returns {feature: (dates x symbols) array}
+    with the same feature names as generate_ta_features; rows a symbol has not warmed up
+    yet (or has no bar for) are NaN. Symbols are processed `chunk_size` columns at a time
+    to bound the size of temporary sliding-window views.
+    """
+    fields = {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+    fields = {name: np.asarray(a, dtype=np.float64) for name, a in fields.items()}
+    features = _run_panel(_ta_block, fields, dtype, chunk_size)
+    return {name: features[name] for name in TA_FEATURE_COLUMNS if name in features}
+
+
+def panel_statistical_features(close, high, low, volume, windows=[20, 50, 200], dtype=np.float64, chunk_size=64):
+    """
+    generate_statistical_features for a whole panel, same conventions as panel_ta_features.
+    """
+    fields = {'close': close, 'high': high, 'low': low, 'volume': volume}
+    fields = {name: np.asarray(a, dtype=np.float64) for name, a in fields.items()}
+    return _run_panel(_statistical_block, fields, dtype, chunk_size, windows=windows)
+
+
+def stack_features(features):
+    """
+    Stack a feature dict into a (dates x symbols x features) tensor. Returns (tensor, names).
+    """
+    names = list(features.keys())
+    # Features on the last axis, so each (date, symbol) row is contiguous for a model
+    return np.stack([features[name] for name in names], axis=-1), names
+
+
+def to_long_frame(features, dates, symbols, dropna=True):
+    """
+    Long-format frame with one row per (date, symbol) and one column per feature.
+    With `dropna`, rows that still contain NaN are dropped, like the single-symbol functions.
+    """
+    T, S = len(dates), len(symbols)
+    df = pd.DataFrame({
+        'date': np.repeat(np.asarray(dates), S),
+        'symbol': np.tile(np.asarray(symbols, dtype=object), T),
+    })
+    for name, values in features.items():
+        df[name] = values.reshape(-1)
+    if dropna:
+        df = df.dropna().reset_index(drop=True)
+    return df
@@ -0,0 +1,161 @@
+import struct
+
+import numpy as np
+import orjson
+
+
+'''
+Compact serialization of model outputs.
+
+A payload is a flat dict of scalars and 1-d numpy arrays, e.g. the forecast
+arrays of prophet_model.summarize_forecast. Dates travel as int32 days since
+1970-01-01 and values as float32, never as per-element Python floats or date
+strings. Three formats:
+
+    columnar  JSON, arrays written by orjson straight from numpy, rounded to `decimals`
+    delta     JSON for the web: dates and prices as integer deltas
+              ({"encoding": "delta", "scale": 100, "values": [first, d1, d2, ...]},
+              value[i] = cumsum(values)[i] / scale), lossless at `decimals`
+    binary    header (JSON) + raw little-endian array buffers, for services (not rounded)
+
+Records keyed by symbol ({symbol: {field: value}}, as ScorePredictor.predict_scores
+and cron_monte_carlo return) become a payload with from_records.
+'''
+
+FORMATS = ('columnar', 'delta', 'binary')
+MEDIA_TYPES = {'columnar': 'application/json', 'delta': 'application/json', 'binary': 'application/octet-stream'}
+
+MAGIC = b'PLD1'
+# Arrays in a binary payload start on 8-byte boundaries so they can be viewed without a copy
+ALIGN = 8
+
+
+def is_date_field(name):
+    return name.endswith('dates') or name.endswith('date')
+
+
+def compact_arrays(payload):
+    """
+    Arrays narrowed to the payload dtypes: int32 for dates and integers, float32 for
+    values. Lists of strings (symbols) stay lists.
+    """
+    result = {}
+    for name, value in payload.items():
+        if isinstance(value, (list, tuple, np.ndarray)):
+            array = np.asarray(value)
+            if array.dtype.kind in 'USO':
+                result[name] = list(value)
+                continue
+            value = array
+            if value.dtype.kind == 'M':
+                value = value.astype('datetime64[D]').astype(np.int32)
+            elif value.dtype.kind in 'iub':
+                value = value.astype(np.int32)
+            elif value.dtype.kind == 'f':
+                value = value.astype(np.float32)
+        elif isinstance(value, np.generic):
+            value = value.item()
+        result[name] = value
+    return result
+
+
+def from_records(records, index='symbol'):
+    """
+    Columnar payload of {key: {field: scalar}} records: one `index` array of keys and
+    one array per field.
+    """
+    keys = list(records)
+    fields = list(dict.fromkeys(field for record in records.values() for field in record))
+    payload = {index: keys}
+    for field in fields:
+        payload[field] = np.array([records[key].get(field, np.nan) for key in keys])
+    return compact_arrays(payload)
+
+
+def delta_encode(values, decimals=2, date=False):
+    values = np.asarray(values)
+    scale = 1 if date or values.dtype.kind in 'iu' else 10 ** decimals
+    # Quantize in float64: float32 * 100 would already be off in the last cent
+    ints = np.round(values.astype(np.float64) * scale).astype(np.int64)
+    deltas = np.diff(ints, prepend=0)
+    column = {'encoding': 'delta', 'scale': scale, 'values': deltas}
+    if date:
+        column['unit'] = 'day'
+    return column
+
+
+def delta_decode(column):
+    values = np.cumsum(np.asarray(column['values'], dtype=np.int64))
+    if column['scale'] == 1:
+        return values.astype(np.int32)
+    return (values / column['scale']).astype(np.float32)
+
+
+def _encode_binary(payload):
+    header = {'scalars': {}, 'columns': []}
+    buffers, offset = [], 0
+    for name, value in payload.items():
+        if not isinstance(value, np.ndarray) or value.dtype.kind not in 'iuf':
+            header['scalars'][name] = value
+            continue
+        data = np.ascontiguousarray(value, dtype=value.dtype.newbyteorder('<')).tobytes()
+        header['columns'].append([name, value.dtype.newbyteorder('<').str, len(value), offset])
+        padding = -len(data) % ALIGN
+        buffers.append(data + b'\0' * padding)
+        offset += len(data) + padding
+    head = orjson.dumps(header, option=orjson.OPT_SERIALIZE_NUMPY)
+    head += b' ' * (-(len(MAGIC) + 4 + len(head)) % ALIGN)
+    return b''.join([MAGIC, struct.pack('<I', len(head)), head, *buffers])
+
+
+def _decode_binary(data):
+    if data[:4] != MAGIC:
+        raise ValueError("not a binary payload")
+    (length,) = struct.unpack('<I', data[4:8])
+    header = orjson.loads(data[8:8 + length])
+    body = memoryview(data)[8 + length:]
+    payload = dict(header['scalars'])
+    for name, dtype, count, offset in header['columns']:
+        payload[name] = np.frombuffer(body, dtype=dtype, count=count, offset=offset)
+    return payload
+
+
+def _delta_encodable(value):
+    # Gaps (NaN) have no integer delta; such columns stay columnar
+    return isinstance(value, np.ndarray) and value.dtype.kind in 'iuf' and value.size and np.isfinite(value).all()
+
+
+def encode(payload, format='columnar', decimals=2):
+    """
+    Serialize a payload to bytes in one of FORMATS.
+    """
+    payload = compact_arrays(payload)
+    if format == 'binary':
+        return _encode_binary(payload)
+    if format == 'delta':
+        payload = {name: delta_encode(value, decimals, is_date_field(name)) if _delta_encodable(value) else value
+                   for name, value in payload.items()}
+    elif format == 'columnar':
+        # Shortest float32 repr of a rounded value is the rounded value, so rounding saves the digits
+        payload = {name: np.round(value.astype(np.float64), decimals).astype(np.float32)
+                   if isinstance(value, np.ndarray) and value.dtype.kind == 'f' else value
+                   for name, value in payload.items()}
+    else:
+        raise ValueError(f"unknown payload format {format!r}, expected one of {FORMATS}")
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def decode(data, format='columnar'):
+    """
+    Payload of `encode` output, with arrays back as numpy (dates as int32 epoch days).
+    """
+    if format == 'binary':
+        return _decode_binary(data)
+    payload = orjson.loads(data)
+    for name, value in payload.items():
+        if isinstance(value, dict) and value.get('encoding') == 'delta':
+            payload[name] = delta_decode(value)
+        elif isinstance(value, list) and value and not isinstance(value[0], str):
+            # null marks a NaN that orjson wrote
+            payload[name] = np.asarray([np.nan if v is None else v for v in value])
+    return compact_arrays(payload)
@@ -0,0 +1,108 @@
+import os
+import pickle
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from utils.model_registry import registry
+
+
+'''
+Preprocessing fitted once at training time and saved next to the model weights.
+
+Before this, every evaluate_model cleaned inf/NaN and called scaler.fit_transform
+on the test rows, so inference used statistics of whatever batch it was given.
+A PreprocessingPipeline stores the fitted scaler together with the cleaning
+rules and the training feature order; inference only transforms.
+'''
+
+
+def _affine(scaler):
+    # MinMaxScaler and StandardScaler reduce to X * scale + offset per column
+    if isinstance(scaler, MinMaxScaler) and not scaler.clip:
+        return scaler.scale_.astype(np.float64), scaler.min_.astype(np.float64)
+    if isinstance(scaler, StandardScaler):
+        n = scaler.n_features_in_
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n)
+        std = scaler.scale_ if scaler.scale_ is not None else np.ones(n)
+        return 1.0 / std, -mean / std
+    return None, None
+
+
+class PreprocessingPipeline:
+    """
+    inf/NaN -> 0 cleaning (optionally 0 -> 1 first) followed by a scaler.
+
+        pipeline = PreprocessingPipeline(MinMaxScaler())
+        X_train = pipeline.fit_transform(X_train)
+        pipeline.save(pipeline_path(weights_path))
+        ...
+        X_test = load_pipeline(key, weights_path).transform(X_test)
+    """
+    def __init__(self, scaler=None, replace_zero=False):
+        self.scaler = scaler if scaler is not None else MinMaxScaler()
+        self.replace_zero = replace_zero
+        self.features = None
+        self.scale = None
+        self.offset = None
+
+    def _values(self, X):
+        if hasattr(X, 'columns'):
+            if self.features is not None:
+                missing = [feature for feature in self.features if feature not in X.columns]
+                if missing:
+                    raise ValueError(f"Missing features the model was trained on: {missing}")
+                # Same column order as in training
+                X = X[self.features]
+            X = X.to_numpy(dtype=np.float64)
+        # Always a private copy, cleaned and scaled in place below
+        return np.array(X, dtype=np.float64)
+
+    def _clean(self, X):
+        if self.replace_zero:
+            X[X == 0] = 1
+        X[~np.isfinite(X)] = 0
+        return X
+
+    def fit(self, X):
+        if hasattr(X, 'columns'):
+            self.features = list(X.columns)
+        X = self._clean(self._values(X))
+        self.scaler.fit(X)
+        self.scale, self.offset = _affine(self.scaler)
+        return self
+
+    def transform(self, X):
+        X = self._clean(self._values(X))
+        if self.scale is None:
+            return self.scaler.transform(X)
+        X *= self.scale
+        X += self.offset
+        return X
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+
+def pipeline_path(weights_path):
+    """
+    File the pipeline of the model stored at `weights_path` is saved to.
+    """
+    return f"{os.path.splitext(weights_path)[0]}_preprocess.pkl"
+
+
+def load_pipeline(key, weights_path):
+    """
+    Pipeline saved with the model at `weights_path`, cached in the model registry under `key`.
+    Returns None for models trained before pipelines were saved.
+    """
+    path = pipeline_path(weights_path)
+    if not os.path.exists(path):
+        return None
+    return registry.get(key, path)
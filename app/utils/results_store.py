@@ -0,0 +1,187 @@
+import hashlib
+import os
+import re
+from collections import namedtuple
+from email.utils import formatdate, parsedate_to_datetime
+
+import orjson
+
+from utils.forecast_store import ForecastStore, to_payload
+from utils import payload
+
+
+'''
+Precomputed model outputs for the API (main.py).
+
+Batch jobs write one file per run through save_results, {symbol: result} as
+JSON named after the run date ({directory}/YYYY-MM-DD.json), and Prophet
+forecasts go to a ForecastStore. ResultsStore.load reads the newest
+file of every kind and serializes each symbol's result to bytes, so a
+request is a dict lookup. Calling load again reloads only what changed on
+disk; it blocks and is meant for a worker thread.
+
+What each kind holds per symbol, and the job that writes it:
+  ai-score     {'probability', 'score'}                      score_model.save_scores
+  trend        [{'nth_day', 'accuracy', 'precision', 'sentiment'}, ...]
+                                                             classification.trend_results
+  fundamental  {'accuracy', 'precision', 'sentiment'}       test.py fundamental_results
+  monte-carlo  {'mu', 'sigma', 'startPrice', ..., 'percentiles'}
+                                                             cron_monte_carlo.run_universe_risk
+'''
+
+RESULT_KINDS = {
+    'ai-score': 'json/ai-score',
+    'trend': 'json/trend',
+    'fundamental': 'json/fundamental-predictor',
+    'monte-carlo': 'json/monte-carlo',
+}
+
+Result = namedtuple('Result', ['body', 'etag', 'last_modified', 'media_type'])
+
+DATED_FILE = re.compile(r'^\d{4}-\d{2}-\d{2}\.json$')
+
+
+def save_results(kind, results, date, kinds=RESULT_KINDS):
+    """
+    Write the {symbol: result} output of a batch run where ResultsStore picks it up.
+    """
+    directory = kinds[kind]
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{date}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY))
+    os.replace(tmp_path, path)
+    return path
+
+
+def latest_file(directory):
+    if not os.path.isdir(directory):
+        return None
+    names = sorted(name for name in os.listdir(directory) if DATED_FILE.match(name))
+    return os.path.join(directory, names[-1]) if names else None
+
+
+def make_result(body, mtime, media_type='application/json'):
+    etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+    return Result(body, etag, formatdate(mtime, usegmt=True), media_type)
+
+
+def result_to_bytes(result):
+    """
+    Result as bytes for a shared cache: a JSON header line, then the body.
+    """
+    return orjson.dumps([result.etag, result.last_modified, result.media_type]) + b'\n' + result.body
+
+
+def result_from_bytes(data):
+    header, body = data.split(b'\n', 1)
+    return Result(body, *orjson.loads(header))
+
+
+def not_modified(result, if_none_match=None, if_modified_since=None):
+    """
+    Whether a conditional request already has `result` (If-None-Match wins over If-Modified-Since).
+    """
+    if if_none_match is not None:
+        return result.etag in (tag.strip() for tag in if_none_match.split(',')) or if_none_match.strip() == '*'
+    if if_modified_since is not None:
+        try:
+            return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(result.last_modified)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class ResultsStore:
+    def __init__(self, kinds=RESULT_KINDS, forecasts=None):
+        self.kinds = dict(kinds)
+        self.forecasts = forecasts or ForecastStore()
+        self._results = {kind: {} for kind in self.kinds}
+        self._sources = {}
+        self._forecast_mtimes = {}
+        self._forecast_results = {}
+        self._versions = {}
+
+    def _load_kind(self, kind):
+        path = latest_file(self.kinds[kind])
+        if path is None:
+            return
+        mtime = os.path.getmtime(path)
+        if self._sources.get(kind) == (path, mtime):
+            return
+        with open(path, 'rb') as f:
+            results = orjson.loads(f.read())
+        # Swap in a complete dict: requests served meanwhile see the old or the new run, never a mix
+        self._results[kind] = {symbol.upper(): make_result(orjson.dumps(result), mtime)
+                               for symbol, result in results.items()}
+        self._sources[kind] = (path, mtime)
+        self._versions[kind] = f"{os.path.basename(path)[:-len('.json')]}.{int(mtime)}"
+        print(f"Loaded {len(results)} {kind} results from {path}")
+
+    def _load_forecasts(self):
+        path = self.forecasts.path
+        if not os.path.isdir(path):
+            return
+        mtimes = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.endswith('.npz') and not entry.name.endswith('.params.npz'):
+                    mtimes[entry.name[:-len('.npz')]] = entry.stat().st_mtime
+        if mtimes == self._forecast_mtimes:
+            return
+        results = {}
+        for symbol, mtime in mtimes.items():
+            previous = self._forecast_results.get(symbol.upper())
+            if previous is not None and self._forecast_mtimes.get(symbol) == mtime:
+                results[symbol.upper()] = previous
+                continue
+            try:
+                arrays = self.forecasts.read(symbol)
+            except Exception as e:
+                print(f"{symbol}: unreadable forecast ({e})")
+                continue
+            # The default format is encoded here; compact ones per request (cached in main.py)
+            results[symbol.upper()] = {'arrays': arrays, 'mtime': mtime,
+                                       'json': make_result(orjson.dumps(to_payload(arrays)), mtime)}
+        self._forecast_results = results
+        self._forecast_mtimes = mtimes
+        self._versions['prophet'] = str(int(max(mtimes.values(), default=0)))
+        print(f"Loaded {len(results)} prophet forecasts from {path}")
+
+    def load(self):
+        for kind in self.kinds:
+            try:
+                self._load_kind(kind)
+            except Exception as e:
+                print(f"Failed to load {kind} results: {e}")
+        try:
+            self._load_forecasts()
+        except Exception as e:
+            print(f"Failed to load prophet forecasts: {e}")
+
+    def version(self, kind):
+        """
+        Changes whenever `kind` is reloaded and is the same in every process reading the same
+        files, so it can be part of a shared cache key.
+        """
+        return self._versions.get(kind, '0')
+
+    def get(self, kind, symbol):
+        return self._results[kind].get(symbol.upper())
+
+    def forecast(self, symbol, format='json'):
+        """
+        Forecast of `symbol` as 'json' (PricePredictor.run shape) or a utils.payload format.
+        """
+        encoded = self._forecast_results.get(symbol.upper())
+        if encoded is None:
+            return None
+        if format == 'json':
+            return encoded['json']
+        return make_result(payload.encode(encoded['arrays'], format), encoded['mtime'], payload.MEDIA_TYPES[format])
+
+    def symbols(self, kind):
+        if kind == 'prophet':
+            return sorted(self._forecast_results)
+        return sorted(self._results[kind])
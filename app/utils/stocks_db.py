@@ -0,0 +1,92 @@
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+
+'''
+Read-only access to stocks.db for training jobs and the API.
+
+Connections are opened with `mode=ro` so readers never take write locks and can
+run next to the cron jobs writing the database in WAL mode. Symbols are fetched
+in batches with `WHERE symbol IN (...)` and rows are streamed from the cursor,
+so a training run never holds every symbol's blobs at once.
+'''
+
+# SQLite's default limit on host parameters in one statement is 999
+MAX_PARAMS = 900
+
+
+def connect_readonly(db_path, mmap_size=0, timeout=30):
+    """
+    Read-only connection usable from any thread (one thread at a time).
+    `mmap_size` > 0 enables memory-mapped reads of up to that many bytes.
+    """
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=timeout, check_same_thread=False)
+    con.execute("PRAGMA query_only = 1")
+    if mmap_size:
+        con.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    return con
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of read-only connections, created on first use.
+
+        pool = ConnectionPool('../stocks.db')
+        with pool.connection() as con:
+            ...
+    """
+    def __init__(self, db_path, size=4, mmap_size=256 * 1024 * 1024, timeout=30):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self.timeout = timeout
+        # None marks a slot whose connection has not been opened yet
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(None)
+        self._all = []
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection; blocks while all `size` connections are in use.
+        """
+        con = self._idle.get()
+        try:
+            if con is None:
+                con = connect_readonly(self.db_path, self.mmap_size, self.timeout)
+                self._all.append(con)
+            yield con
+        finally:
+            self._idle.put(con)
+
+    def close(self):
+        for con in self._all:
+            con.close()
+        self._all = []
+
+
+def iter_rows(con, symbols, columns, table='stocks', chunk_size=MAX_PARAMS):
+    """
+    Yield (symbol, {column: value}) for every requested symbol found in `table`,
+    fetching `chunk_size` symbols per query and streaming rows from the cursor.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    select = ', '.join(columns)
+    for lo in range(0, len(symbols), chunk_size):
+        chunk = symbols[lo:lo + chunk_size]
+        placeholders = ','.join('?' * len(chunk))
+        cursor = con.execute(f"SELECT symbol, {select} FROM {table} WHERE symbol IN ({placeholders})", chunk)
+        try:
+            for row in cursor:
+                yield row[0], dict(zip(columns, row[1:]))
+        finally:
+            # An unfinished statement would keep the connection's read snapshot open
+            cursor.close()
+
+
+def fetch_rows(con, symbols, columns, table='stocks', chunk_size=MAX_PARAMS):
+    """
+    Same as iter_rows, collected into a dict symbol -> row.
+    """
+    return dict(iter_rows(con, symbols, columns, table=table, chunk_size=chunk_size))
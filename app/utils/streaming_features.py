@@ -0,0 +1,617 @@
+import math
+import pickle
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+nan = float('nan')
+
+# Same columns, in the same order, as generate_ta_features adds them
+TA_FEATURE_COLUMNS = [
+    'sma_50', 'sma_200', 'sma_crossover', 'ema_50', 'ema_200', 'ema_crossover', 'wma',
+    'ichimoku_a', 'ichimoku_b', 'atr', 'bb_width', 'macd', 'macd_signal', 'macd_hist',
+    'adx', 'adx_pos', 'adx_neg', 'cci', 'mfi', 'nvi', 'obv', 'vpt', 'rsi', 'rolling_rsi',
+    'stoch_rsi', 'rolling_stoch_rsi', 'adi', 'cmf', 'emv', 'fi', 'williams', 'kama',
+    'stoch_k', 'stoch_d', 'rocr', 'ppo', 'vwap', 'volatility_ratio', 'fdi', 'tii', 'fft',
+    'don_hband', 'don_lband', 'don_mband', 'don_pband', 'don_wband',
+    'aroon_down', 'aroon_indicator', 'aroon_up', 'ulcer',
+]
+
+
+def _div(a, b):
+    # float division with numpy semantics (x/0 -> +-inf, 0/0 -> nan) instead of raising
+    if b == 0:
+        if a == 0 or a != a:
+            return nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _isnan(x):
+    return x != x
+
+
+class RollingWindow:
+    """
+    Fixed-size window with running sums, matching pandas rolling(window) with
+    the default min_periods: any NaN (or inf) inside the window makes the statistic NaN.
+    Values are stored relative to the first observation to limit cancellation in the variance.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.nan_count = 0
+        self.offset = None
+
+    def push(self, x):
+        if not math.isfinite(x):
+            self.nan_count += 1
+        else:
+            if self.offset is None:
+                self.offset = x
+            d = x - self.offset
+            self.total += d
+            self.total_sq += d * d
+        self.values.append(x)
+
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if not math.isfinite(old):
+                self.nan_count -= 1
+            else:
+                d = old - self.offset
+                self.total -= d
+                self.total_sq -= d * d
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window and self.nan_count == 0
+
+    def sum(self):
+        if not self.ready:
+            return nan
+        return self.total + self.window * self.offset
+
+    def mean(self):
+        if not self.ready:
+            return nan
+        return self.total / self.window + self.offset
+
+    def var(self, ddof=1):
+        if not self.ready or self.window - ddof <= 0:
+            return nan
+        var = (self.total_sq - self.total * self.total / self.window) / (self.window - ddof)
+        return max(var, 0.0)
+
+    def std(self, ddof=1):
+        return math.sqrt(self.var(ddof)) if self.ready else nan
+
+
+class RollingExtreme:
+    """
+    Rolling max (or min) over the last `window` values with a monotonic deque, O(1) amortized.
+    Ties keep the earliest position, like np.argmax/np.argmin.
+    """
+
+    def __init__(self, window, mode='max', min_periods=None):
+        self.window = window
+        self.is_max = mode == 'max'
+        self.min_periods = window if min_periods is None else min_periods
+        self.items = deque()
+        self.count = 0
+
+    def push(self, x):
+        idx = self.count
+        if self.is_max:
+            while self.items and self.items[-1][1] < x:
+                self.items.pop()
+        else:
+            while self.items and self.items[-1][1] > x:
+                self.items.pop()
+        self.items.append((idx, x))
+        while self.items[0][0] <= idx - self.window:
+            self.items.popleft()
+        self.count += 1
+
+    @property
+    def ready(self):
+        return min(self.count, self.window) >= max(self.min_periods, 1)
+
+    def value(self):
+        return self.items[0][1] if self.ready else nan
+
+    def position(self):
+        """Position of the extreme inside the current window (0 = oldest)."""
+        if not self.ready:
+            return nan
+        first = max(self.count - self.window, 0)
+        return self.items[0][0] - first
+
+
+class Ema:
+    """Exponential moving average with adjust=False, as used by the ta library."""
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = None
+        self.count = 0
+
+    @classmethod
+    def from_span(cls, span, min_periods=None):
+        return cls(2.0 / (span + 1), span if min_periods is None else min_periods)
+
+    def push(self, x):
+        if not _isnan(x):
+            if self.value is None:
+                self.value = x
+            else:
+                self.value = (1 - self.alpha) * self.value + self.alpha * x
+            self.count += 1
+        return self.current()
+
+    def current(self):
+        return self.value if self.value is not None and self.count >= self.min_periods else nan
+
+
+class StreamingFeatures:
+    """
+    Incremental version of feature_engineering.generate_ta_features for one symbol.
+
+    Every indicator keeps its own rolling state, so `update(bar)` costs O(1)
+    per indicator instead of O(history). The row returned for bar t equals the
+    last row of generate_ta_features(df[:t+1]) before dropna; rows containing
+    NaN are still in warm-up. The one exception to O(1) is `fft`: the batch
+    version takes |FFT(close)| over the whole history, so its value for the
+    latest bar is a single O(history) dot product (no full FFT).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.prev = None
+
+        self.sma_50 = RollingWindow(50)
+        self.sma_200 = RollingWindow(200)
+        self.ema_50 = Ema.from_span(50)
+        self.ema_200 = Ema.from_span(200)
+        self.prev_sma = (nan, nan)
+        self.prev_ema = (nan, nan)
+        self.wma_window = deque(maxlen=30)
+        self.wma_weights = np.arange(1, 31) * 2 / (30 * 31)
+
+        self.ichimoku = {
+            'high_9': RollingExtreme(9, 'max'), 'low_9': RollingExtreme(9, 'min'),
+            'high_26': RollingExtreme(26, 'max'), 'low_26': RollingExtreme(26, 'min'),
+            'high_52': RollingExtreme(52, 'max', min_periods=0), 'low_52': RollingExtreme(52, 'min', min_periods=0),
+        }
+
+        self.atr_window = 14
+        self.atr_trs = []
+        self.atr = 0.0
+
+        self.bb = RollingWindow(20)
+
+        self.ema_12 = Ema.from_span(12)
+        self.ema_26 = Ema.from_span(26)
+        self.macd_signal = Ema.from_span(9)
+
+        self.adx_window = 14
+        self.adx_sums = [0.0, 0.0, 0.0]
+        self.adx_trs = self.adx_dip = self.adx_din = None
+        self.adx_dx = []
+        self.adx = 0.0
+
+        self.cci_window = deque(maxlen=20)
+
+        self.mfi_window = deque(maxlen=14)
+        self.mfi_pos = 0.0
+        self.mfi_neg = 0.0
+
+        self.nvi = 1000.0
+        self.obv = 0.0
+        self.vpt = nan
+        self.adi = 0.0
+        self.cmf_mfv = RollingWindow(20)
+        self.cmf_vol = RollingWindow(20)
+        self.fi = Ema.from_span(13)
+
+        self.rsi_up = Ema(1 / 60, 60)
+        self.rsi_down = Ema(1 / 60, 60)
+        self.rsi_mean = RollingWindow(10)
+        self.rsi_min = RollingExtreme(60, 'min')
+        self.rsi_max = RollingExtreme(60, 'max')
+        self.rsi_nan_run = RollingWindow(60)
+        self.stoch_rsi_k = RollingWindow(3)
+        self.stoch_rsi_mean = RollingWindow(10)
+
+        self.williams_high = RollingExtreme(14, 'max')
+        self.williams_low = RollingExtreme(14, 'min')
+
+        self.kama_vol = RollingWindow(10)
+        self.kama_closes = deque(maxlen=11)
+        self.kama = nan
+
+        self.stoch_high = RollingExtreme(60, 'max')
+        self.stoch_low = RollingExtreme(60, 'min')
+        self.stoch_d = RollingWindow(3)
+
+        self.rocr_closes = deque(maxlen=31)
+        self.vwap_pv = 0.0
+        self.vwap_vol = 0.0
+        self.std_30 = RollingWindow(30)
+        self.std_60 = RollingWindow(60)
+
+        self.fdi = {
+            'high': RollingExtreme(30, 'max'), 'low': RollingExtreme(30, 'min'),
+            'close_max': RollingExtreme(30, 'max'), 'close_min': RollingExtreme(30, 'min'),
+        }
+        self.tii_stats = RollingWindow(20)
+        self.tii_mean = RollingWindow(20)
+
+        self.closes = np.empty(1024)
+
+        self.don_high = RollingExtreme(60, 'max')
+        self.don_low = RollingExtreme(60, 'min')
+        self.don_close = RollingWindow(60)
+        self.aroon_high = RollingExtreme(61, 'max')
+        self.aroon_low = RollingExtreme(61, 'min')
+
+        self.ulcer_max = RollingExtreme(60, 'max', min_periods=1)
+        self.ulcer_sq = RollingWindow(60)
+
+    def update(self, bar):
+        """
+        Consume one bar (mapping with open/high/low/close/volume plus any extra
+        fields such as date) and return the feature row for it.
+        """
+        high, low, close, volume = float(bar['high']), float(bar['low']), float(bar['close']), float(bar['volume'])
+        prev = self.prev
+        t = self.count
+        row = dict(bar)
+
+        # Moving averages and crossovers
+        self.sma_50.push(close)
+        self.sma_200.push(close)
+        sma_50, sma_200 = self.sma_50.mean(), self.sma_200.mean()
+        row['sma_50'], row['sma_200'] = sma_50, sma_200
+        row['sma_crossover'] = int(sma_50 > sma_200 and self.prev_sma[0] <= self.prev_sma[1])
+        self.prev_sma = (sma_50, sma_200)
+
+        ema_50, ema_200 = self.ema_50.push(close), self.ema_200.push(close)
+        row['ema_50'], row['ema_200'] = ema_50, ema_200
+        row['ema_crossover'] = int(ema_50 > ema_200 and self.prev_ema[0] <= self.prev_ema[1])
+        self.prev_ema = (ema_50, ema_200)
+
+        self.wma_window.append(close)
+        row['wma'] = float(np.dot(self.wma_weights, self.wma_window)) if len(self.wma_window) == 30 else nan
+
+        # Ichimoku
+        ich = self.ichimoku
+        for key in ('high_9', 'high_26', 'high_52'):
+            ich[key].push(high)
+        for key in ('low_9', 'low_26', 'low_52'):
+            ich[key].push(low)
+        conv = 0.5 * (ich['high_9'].value() + ich['low_9'].value())
+        base = 0.5 * (ich['high_26'].value() + ich['low_26'].value())
+        row['ichimoku_a'] = 0.5 * (conv + base)
+        row['ichimoku_b'] = 0.5 * (ich['high_52'].value() + ich['low_52'].value())
+
+        # Average true range (Wilder smoothing seeded with a simple mean)
+        if prev is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - prev['close']), abs(low - prev['close']))
+        if t < self.atr_window:
+            self.atr_trs.append(true_range)
+            if t == self.atr_window - 1:
+                self.atr = sum(self.atr_trs) / self.atr_window
+        else:
+            self.atr = (self.atr * (self.atr_window - 1) + true_range) / self.atr_window
+        row['atr'] = self.atr
+
+        self.bb.push(close)
+        row['bb_width'] = 4 * self.bb.std(ddof=0) / close
+
+        # MACD
+        macd = self.ema_12.push(close) - self.ema_26.push(close)
+        signal = self.macd_signal.push(macd)
+        row['macd'], row['macd_signal'], row['macd_hist'] = macd, signal, 2 * (macd - signal)
+
+        row['adx'], row['adx_pos'], row['adx_neg'] = self._update_adx(high, low, close, prev)
+
+        # CCI
+        typical = (high + low + close) / 3.0
+        self.cci_window.append(typical)
+        if len(self.cci_window) == 20:
+            window = np.fromiter(self.cci_window, dtype=np.float64, count=20)
+            mean = window.mean()
+            mad = np.abs(window - mean).mean()
+            row['cci'] = _div(typical - mean, 0.015 * mad)
+        else:
+            row['cci'] = nan
+
+        # MFI
+        if prev is None or typical == prev['typical']:
+            flow = 0.0
+        else:
+            flow = typical * volume * (1 if typical > prev['typical'] else -1)
+        if len(self.mfi_window) == 14:
+            old = self.mfi_window[0]
+            if old >= 0:
+                self.mfi_pos -= old
+            else:
+                self.mfi_neg -= old
+        self.mfi_window.append(flow)
+        if flow >= 0:
+            self.mfi_pos += flow
+        else:
+            self.mfi_neg += flow
+        if len(self.mfi_window) == 14:
+            row['mfi'] = 100 - _div(100, 1 + _div(self.mfi_pos, abs(self.mfi_neg)))
+        else:
+            row['mfi'] = nan
+
+        # Volume indicators
+        pct_change = _div(close, prev['close']) - 1 if prev is not None else nan
+        if prev is not None and prev['volume'] > volume:
+            self.nvi = self.nvi * (1.0 + pct_change)
+        row['nvi'] = self.nvi
+
+        self.obv += -volume if prev is not None and close < prev['close'] else volume
+        row['obv'] = self.obv
+
+        if prev is not None:
+            self.vpt = (0.0 if _isnan(self.vpt) else self.vpt) + pct_change * volume
+        row['vpt'] = self.vpt
+
+        # RSI and stochastic RSI
+        diff = close - prev['close'] if prev is not None else nan
+        up = self.rsi_up.push(diff if diff > 0 else 0.0)
+        down = self.rsi_down.push(-diff if diff < 0 else 0.0)
+        rsi = nan if _isnan(down) else (100.0 if down == 0 else 100 - 100 / (1 + _div(up, down)))
+        row['rsi'] = rsi
+        self.rsi_mean.push(rsi)
+        row['rolling_rsi'] = self.rsi_mean.mean()
+
+        self.rsi_nan_run.push(rsi)
+        if not _isnan(rsi):
+            self.rsi_min.push(rsi)
+            self.rsi_max.push(rsi)
+        if self.rsi_nan_run.ready:
+            lowest = self.rsi_min.value()
+            stoch_rsi = _div(rsi - lowest, self.rsi_max.value() - lowest)
+        else:
+            stoch_rsi = nan
+        self.stoch_rsi_k.push(stoch_rsi)
+        row['stoch_rsi'] = self.stoch_rsi_k.mean()
+        self.stoch_rsi_mean.push(row['stoch_rsi'])
+        row['rolling_stoch_rsi'] = self.stoch_rsi_mean.mean()
+
+        clv = _div((close - low) - (high - close), high - low)
+        clv = 0.0 if _isnan(clv) else clv
+        self.adi += clv * volume
+        row['adi'] = self.adi
+        self.cmf_mfv.push(clv * volume)
+        self.cmf_vol.push(volume)
+        row['cmf'] = _div(self.cmf_mfv.sum(), self.cmf_vol.sum())
+
+        if prev is None:
+            row['emv'] = nan
+        else:
+            row['emv'] = _div(((high - prev['high']) + (low - prev['low'])) * (high - low), 2 * volume) * 100000000
+        row['fi'] = self.fi.push((close - prev['close']) * volume if prev is not None else nan)
+
+        # Williams %R
+        self.williams_high.push(high)
+        self.williams_low.push(low)
+        highest = self.williams_high.value()
+        row['williams'] = -100 * _div(highest - close, highest - self.williams_low.value())
+
+        row['kama'] = self._update_kama(close, prev)
+
+        # Stochastic oscillator
+        self.stoch_high.push(high)
+        self.stoch_low.push(low)
+        lowest = self.stoch_low.value()
+        stoch_k = 100 * _div(close - lowest, self.stoch_high.value() - lowest)
+        self.stoch_d.push(stoch_k)
+        row['stoch_k'], row['stoch_d'] = stoch_k, self.stoch_d.mean()
+
+        self.rocr_closes.append(close)
+        row['rocr'] = _div(close, self.rocr_closes[0]) - 1 if len(self.rocr_closes) == 31 else nan
+        row['ppo'] = _div(ema_50 - ema_200, ema_50) * 100
+
+        self.vwap_pv += volume * typical
+        self.vwap_vol += volume
+        row['vwap'] = _div(self.vwap_pv, self.vwap_vol)
+
+        self.std_30.push(close)
+        self.std_60.push(close)
+        row['volatility_ratio'] = _div(self.std_30.std(), self.std_60.std())
+
+        # Fractal dimension and trend intensity
+        fdi = self.fdi
+        fdi['high'].push(high)
+        fdi['low'].push(low)
+        fdi['close_max'].push(close)
+        fdi['close_min'].push(close)
+        if fdi['high'].ready:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                n1 = (np.log(fdi['high'].value() - fdi['low'].value()) -
+                      np.log(fdi['close_max'].value() - fdi['close_min'].value())) / np.log(2)
+            row['fdi'] = float((2 - n1) * 100)
+        else:
+            row['fdi'] = nan
+
+        self.tii_stats.push(close)
+        self.tii_mean.push(abs(_div(close - self.tii_stats.mean(), self.tii_stats.std())))
+        row['tii'] = self.tii_mean.mean()
+
+        # Magnitude of the last FFT bin of the full close history
+        if t >= len(self.closes):
+            self.closes = np.concatenate([self.closes, np.empty(len(self.closes))])
+        self.closes[t] = close
+        n = t + 1
+        row['fft'] = float(np.abs(np.dot(self.closes[:n], np.exp(2j * np.pi * np.arange(n) / n))))
+
+        # Donchian channel
+        self.don_high.push(high)
+        self.don_low.push(low)
+        self.don_close.push(close)
+        hband, lband = self.don_high.value(), self.don_low.value()
+        row['don_hband'], row['don_lband'] = hband, lband
+        row['don_mband'] = (hband - lband) / 2.0 + lband
+        row['don_pband'] = _div(close - lband, hband - lband)
+        row['don_wband'] = _div(hband - lband, self.don_close.mean()) * 100
+
+        # Aroon (window + current bar = 61 values)
+        self.aroon_high.push(high)
+        self.aroon_low.push(low)
+        if self.count + 1 >= 61:
+            aroon_up = self.aroon_high.position() / 60 * 100
+            aroon_down = self.aroon_low.position() / 60 * 100
+        else:
+            aroon_up = aroon_down = nan
+        row['aroon_down'], row['aroon_indicator'], row['aroon_up'] = aroon_down, aroon_up - aroon_down, aroon_up
+
+        # Ulcer index
+        self.ulcer_max.push(close)
+        drawdown = 100 * _div(close - self.ulcer_max.value(), self.ulcer_max.value())
+        self.ulcer_sq.push(drawdown * drawdown)
+        row['ulcer'] = math.sqrt(self.ulcer_sq.sum() / 60) if self.ulcer_sq.ready else nan
+
+        self.prev = {'high': high, 'low': low, 'close': close, 'volume': volume, 'typical': typical}
+        self.count += 1
+        return row
+
+    def _update_adx(self, high, low, close, prev):
+        # Mirrors ta.trend.ADXIndicator: sums over bars 1..w seed the Wilder smoothing at bar w,
+        # +DI/-DI start one bar later, and ADX is seeded with the mean of the first w DX values.
+        w = self.adx_window
+        t = self.count
+        if prev is None:
+            return 0.0, 0.0, 0.0
+
+        movement = max(high, prev['close']) - min(low, prev['close'])
+        diff_up = high - prev['high']
+        diff_down = prev['low'] - low
+        pos = diff_up if diff_up > diff_down and diff_up > 0 else 0.0
+        neg = diff_down if diff_down > diff_up and diff_down > 0 else 0.0
+
+        if t < w:
+            self.adx_sums = [s + v for s, v in zip(self.adx_sums, (movement, pos, neg))]
+            return 0.0, 0.0, 0.0
+        if t == w:
+            trs, dip, din = (s + v for s, v in zip(self.adx_sums, (movement, pos, neg)))
+        else:
+            trs = self.adx_trs - self.adx_trs / w + movement
+            dip = self.adx_dip - self.adx_dip / w + pos
+            din = self.adx_din - self.adx_din / w + neg
+        self.adx_trs, self.adx_dip, self.adx_din = trs, dip, din
+
+        di_pos = 100 * (dip / trs) if trs != 0 else 0.0
+        di_neg = 100 * (din / trs) if trs != 0 else 0.0
+        dx = 100 * abs((di_pos - di_neg) / (di_pos + di_neg)) if di_pos + di_neg != 0 else 0.0
+
+        if t < 2 * w - 1:
+            self.adx_dx.append(dx)
+        elif t == 2 * w - 1:
+            self.adx_dx.append(dx)
+            self.adx = float(np.mean(self.adx_dx))
+        else:
+            self.adx = (self.adx * (w - 1) + dx) / float(w)
+
+        if t == w:
+            return self.adx, 0.0, 0.0
+        return self.adx, di_pos, di_neg
+
+    def _update_kama(self, close, prev):
+        # Kaufman adaptive moving average, window 10, fast 2, slow 30
+        self.kama_vol.push(abs(close - prev['close']) if prev is not None else nan)
+        self.kama_closes.append(close)
+        if self.count < 9:
+            return nan
+        if _isnan(self.kama):
+            self.kama = close
+            return self.kama
+
+        change = abs(close - self.kama_closes[0])
+        volatility = self.kama_vol.sum()
+        efficiency_ratio = change / volatility if volatility != 0 else 0.0
+        smoothing = (efficiency_ratio * (2.0 / 3 - 2.0 / 31.0) + 2 / 31.0) ** 2.0
+        self.kama = self.kama + smoothing * (close - self.kama)
+        return self.kama
+
+    @staticmethod
+    def is_ready(row):
+        """True once every feature in the row is warmed up (generate_ta_features would keep it)."""
+        return not any(_isnan(row[col]) for col in TA_FEATURE_COLUMNS)
+
+
+class StreamingFeatureEngine:
+    """
+    Keeps one StreamingFeatures state per symbol.
+
+    Typical end-of-day use: warm up every symbol once from its history, persist
+    the engine with `save`, then each day `load` it and feed only the new bar.
+    """
+
+    def __init__(self):
+        self.states = {}
+
+    def warmup(self, symbol, df):
+        """Feed a full OHLCV history for `symbol` and return the batch-equivalent (dropna'd) frame."""
+        state = self.states[symbol] = StreamingFeatures()
+        rows = [state.update(bar) for bar in df.to_dict('records')]
+        return pd.DataFrame(rows, index=df.index).dropna()
+
+    def update(self, symbol, bar):
+        state = self.states.setdefault(symbol, StreamingFeatures())
+        return state.update(bar)
+
+    def update_many(self, bars):
+        """
+        Feed one new bar per symbol (`bars` maps symbol -> bar) and return a frame with one row per symbol.
+        """
+        rows = {symbol: self.update(symbol, bar) for symbol, bar in bars.items()}
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self.states, f)
+
+    @classmethod
+    def load(cls, path):
+        engine = cls()
+        with open(path, 'rb') as f:
+            engine.states = pickle.load(f)
+        return engine
+
+
+def compare_with_batch(df, rtol=1e-6, atol=1e-8):
+    """
+    Parity check against generate_ta_features.
+
+    Streams `df` bar by bar and compares every row the batch version keeps.
+    `fft` is compared on the last row only, because the batch version uses the
+    whole history for every row. Returns a dict column -> number of mismatching rows.
+    """
+    from utils.feature_engineering import generate_ta_features
+
+    batch = generate_ta_features(df)
+    streamed = StreamingFeatureEngine().warmup('_', df)
+    streamed = streamed.loc[batch.index]
+
+    mismatches = {}
+    for col in TA_FEATURE_COLUMNS:
+        expected = batch[col].to_numpy(dtype=np.float64)
+        actual = streamed[col].to_numpy(dtype=np.float64)
+        if col == 'fft':
+            expected, actual = expected[-1:], actual[-1:]
+        mismatches[col] = int((~np.isclose(actual, expected, rtol=rtol, atol=atol, equal_nan=True)).sum())
+    return mismatches
@@ -0,0 +1,306 @@
+import os
+import re
+
+import numpy as np
+import orjson
+
+
+'''
+Compact inference format for the tree ensembles used by the predictors.
+
+A RandomForestClassifier or a LightGBM booster is flattened into a handful of
+node arrays (feature, threshold, children, leaf values) shared by all trees and
+saved as .npy files next to a meta.json. Loading memory-maps the arrays, so it
+costs a few page faults instead of unpickling thousands of Python tree objects,
+and prediction walks every tree for a block of rows at once with numpy indexing.
+XGBoost models are saved in the booster's native binary format instead.
+
+    export_model(model, 'ml_models/weights/model_weights_5_flat')
+    model = load_exported('ml_models/weights/model_weights_5_flat')
+    model.predict_proba(X)
+'''
+
+META_FILE = 'meta.json'
+ARRAYS = ['feature', 'threshold', 'left', 'nan_left', 'zero_missing', 'value', 'roots']
+# LightGBM treats |x| <= kZeroThreshold as zero for zero-as-missing splits
+ZERO_THRESHOLD = 1e-35
+
+
+def _pack(trees):
+    """
+    Concatenate trees given as local node arrays (left == -1 marks a leaf) into one table.
+
+    Nodes are renumbered breadth-first with the two children of a split stored next to
+    each other, so only `left` is kept and the right child is left + 1. A leaf points to
+    itself and always "goes left" (threshold +inf, NaN to the left), so traversal can keep
+    stepping after a row reached its leaf. Indices are int64 so numpy indexes with them
+    directly instead of converting on every step.
+    """
+    parts = {name: [] for name in ARRAYS[:-1]}
+    roots, offset = [], 0
+    for tree in trees:
+        left, right = tree['left'], tree['right']
+        order = [0]
+        i = 0
+        while i < len(order):
+            node = order[i]
+            if left[node] != -1:
+                order += [left[node], right[node]]
+            i += 1
+        order = np.asarray(order)
+        pos = np.empty(len(left), dtype=np.int64)
+        pos[order] = np.arange(len(order))
+
+        leaf = left[order] == -1
+        new_ids = np.arange(len(order)) + offset
+        parts['feature'].append(np.where(leaf, 0, tree['feature'][order]).astype(np.int64))
+        parts['threshold'].append(np.where(leaf, np.inf, tree['threshold'][order]))
+        parts['left'].append(np.where(leaf, new_ids, pos[np.where(leaf, 0, left[order])] + offset).astype(np.int64))
+        parts['nan_left'].append(np.where(leaf, True, tree['nan_left'][order]))
+        parts['zero_missing'].append(np.where(leaf, False, tree['zero_missing'][order]))
+        parts['value'].append(tree['value'][order])
+        roots.append(offset)
+        offset += len(order)
+
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    # One row per output, so summing leaf values gathers contiguous 1-D arrays
+    arrays['value'] = np.ascontiguousarray(arrays['value'].T)
+    arrays['roots'] = np.asarray(roots, dtype=np.int64)
+    return arrays
+
+
+class FlatForest:
+    """
+    Tree ensemble stored as flat node arrays (see _pack).
+
+    Traversal runs a fixed `max_depth` steps for a block of rows and all trees at once.
+    `value` holds per-node outputs: class probabilities for a random forest (averaged
+    over trees), raw scores for a LightGBM booster (summed over trees, then passed
+    through the sigmoid for binary models).
+    """
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self.classes_ = np.asarray(meta['classes']) if meta.get('classes') is not None else None
+        self.n_features_in_ = meta['n_features']
+
+    @classmethod
+    def from_sklearn(cls, model):
+        trees, depth = [], 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            missing_left = getattr(tree, 'missing_go_to_left', None)
+            # Leaf class counts (or fractions, depending on the sklearn version) -> probabilities
+            value = tree.value[:, 0, :]
+            trees.append({
+                'feature': tree.feature,
+                'threshold': tree.threshold,
+                'left': tree.children_left,
+                'right': tree.children_right,
+                'nan_left': np.zeros(tree.node_count, dtype=bool) if missing_left is None else missing_left.astype(bool),
+                'zero_missing': np.zeros(tree.node_count, dtype=bool),
+                'value': value / np.maximum(value.sum(axis=1, keepdims=True), 1e-300),
+            })
+            depth = max(depth, tree.max_depth)
+
+        meta = {
+            'format': 'flat', 'source': type(model).__name__, 'output': 'mean_proba',
+            'max_depth': int(depth), 'n_features': int(model.n_features_in_),
+            'classes': model.classes_.tolist(), 'input_dtype': 'float32',
+        }
+        return cls(_pack(trees), meta)
+
+    @classmethod
+    def from_lightgbm(cls, model):
+        booster = getattr(model, 'booster_', model)
+        dump = booster.dump_model()
+        objective = dump.get('objective', '')
+        if dump.get('num_tree_per_iteration', 1) != 1 or dump.get('average_output'):
+            raise ValueError(f"Only binary and regression LightGBM models can be flattened, got {objective!r}")
+        sigmoid = None
+        if objective.startswith('binary'):
+            match = re.search(r'sigmoid:([0-9.eE+-]+)', objective)
+            sigmoid = float(match.group(1)) if match else 1.0
+
+        trees, depth = [], 0
+        for info in dump['tree_info']:
+            nodes = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'nan_left': [], 'zero_missing': [], 'value': []}
+            # (node, parent id, is left child, depth); iterative since boosted trees can be very deep
+            stack = [(info['tree_structure'], -1, False, 0)]
+            while stack:
+                node, parent, is_left, level = stack.pop()
+                nid = len(nodes['feature'])
+                if parent >= 0:
+                    nodes['left' if is_left else 'right'][parent] = nid
+                nodes['left'].append(-1)
+                nodes['right'].append(-1)
+                if 'leaf_value' in node:
+                    nodes['feature'].append(0)
+                    nodes['threshold'].append(np.inf)
+                    nodes['nan_left'].append(True)
+                    nodes['zero_missing'].append(False)
+                    nodes['value'].append(node['leaf_value'])
+                    depth = max(depth, level)
+                    continue
+                if node['decision_type'] != '<=':
+                    raise ValueError("Categorical LightGBM splits are not supported")
+                threshold = float(node['threshold'])
+                missing = node.get('missing_type', 'None')
+                nodes['feature'].append(node['split_feature'])
+                nodes['threshold'].append(threshold)
+                if missing == 'None':
+                    # NaN is replaced by 0 and compared normally
+                    nodes['nan_left'].append(0.0 <= threshold)
+                    nodes['zero_missing'].append(False)
+                else:
+                    nodes['nan_left'].append(bool(node['default_left']))
+                    nodes['zero_missing'].append(missing == 'Zero')
+                nodes['value'].append(0.0)
+                stack.append((node['right_child'], nid, False, level + 1))
+                stack.append((node['left_child'], nid, True, level + 1))
+
+            tree = {name: np.asarray(values) for name, values in nodes.items()}
+            tree['threshold'] = tree['threshold'].astype(np.float64)
+            tree['value'] = tree['value'].astype(np.float64)[:, None]
+            trees.append(tree)
+
+        classes = getattr(model, 'classes_', None)
+        meta = {
+            'format': 'flat', 'source': 'LightGBM', 'output': 'sum_raw', 'sigmoid': sigmoid,
+            'max_depth': int(depth), 'n_features': int(dump['max_feature_idx']) + 1,
+            'classes': classes.tolist() if classes is not None else ([0, 1] if sigmoid else None),
+            'input_dtype': 'float64',
+        }
+        return cls(_pack(trees), meta)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            tmp_path = os.path.join(path, f"{name}.tmp.npy")
+            np.save(tmp_path, np.ascontiguousarray(self.arrays[name]))
+            os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+        # meta.json is written last, so its mtime marks a complete export
+        _write_meta(path, self.meta)
+
+    @classmethod
+    def load(cls, path, meta=None, mmap=True):
+        meta = meta or _read_meta(path)
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS}
+        return cls(arrays, meta)
+
+    def _leaves(self, X):
+        a = self.arrays
+        feature, threshold, left, nan_left = a['feature'], a['threshold'], a['left'], a['nan_left']
+        n, n_features = X.shape
+        flat = np.ascontiguousarray(X).ravel()
+        base = (np.arange(n, dtype=np.int64) * n_features)[:, None]
+        nodes = np.broadcast_to(np.asarray(a['roots']), (n, len(a['roots']))).copy()
+        has_nan = bool(np.isnan(flat).any())
+        check_zero = bool(np.any(a['zero_missing']))
+        for step in range(self.meta['max_depth']):
+            # Boosted trees are deep but unbalanced; stop once every row sits in a leaf
+            if step and step % 4 == 0 and np.array_equal(left[nodes], nodes):
+                break
+            values = flat[base + feature[nodes]]
+            go_right = ~(values <= threshold[nodes])
+            if has_nan or check_zero:
+                missing = np.isnan(values)
+                if check_zero:
+                    missing |= a['zero_missing'][nodes] & (np.abs(values) <= ZERO_THRESHOLD)
+                go_right = np.where(missing, ~nan_left[nodes], go_right)
+            nodes = left[nodes] + go_right
+        return nodes
+
+    def predict_raw(self, X, chunk_size=None):
+        """
+        Ensemble output before the link function: mean leaf probabilities for a forest,
+        summed raw scores for a booster. Rows are processed in blocks of `chunk_size`.
+        """
+        X = np.asarray(X, dtype=self.meta['input_dtype'])
+        if X.ndim == 1:
+            X = X[None, :]
+        n_trees = len(self.arrays['roots'])
+        # Small blocks keep the (rows, trees) index matrices in cache
+        chunk_size = chunk_size or max(1, 65_536 // n_trees)
+        value = self.arrays['value']
+        out = np.empty((len(X), value.shape[0]))
+        for lo in range(0, len(X), chunk_size):
+            leaves = self._leaves(X[lo:lo + chunk_size])
+            for k in range(value.shape[0]):
+                out[lo:lo + chunk_size, k] = value[k][leaves].sum(axis=1)
+        if self.meta['output'] == 'mean_proba':
+            out /= n_trees
+        return out
+
+    def predict_proba(self, X):
+        raw = self.predict_raw(X)
+        if self.meta['output'] == 'mean_proba':
+            return raw
+        if self.meta.get('sigmoid') is None:
+            raise ValueError("predict_proba needs a binary model")
+        p = 1.0 / (1.0 + np.exp(-self.meta['sigmoid'] * raw[:, 0]))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        if self.meta['output'] == 'sum_raw' and self.meta.get('sigmoid') is None:
+            return self.predict_raw(X)[:, 0]
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _write_meta(path, meta):
+    tmp_path = os.path.join(path, f"{META_FILE}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(meta))
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+
+
+def _read_meta(path):
+    with open(os.path.join(path, META_FILE), 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def export_model(model, path):
+    """
+    Save `model` to the directory `path` in its compact inference format.
+    """
+    name = type(model).__module__ + '.' + type(model).__name__
+    if name.startswith('xgboost.'):
+        os.makedirs(path, exist_ok=True)
+        model.get_booster().save_model(os.path.join(path, 'model.ubj'))
+        _write_meta(path, {'format': 'xgboost', 'source': type(model).__name__})
+    elif name.startswith('lightgbm.'):
+        FlatForest.from_lightgbm(model).save(path)
+    elif hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_'):
+        FlatForest.from_sklearn(model).save(path)
+    else:
+        raise ValueError(f"Cannot export {name}")
+    return path
+
+
+def load_exported(path, mmap=True):
+    """
+    Model saved with export_model: a FlatForest (memory-mapped unless `mmap` is False)
+    or an XGBoost estimator loaded from its native file.
+    """
+    meta = _read_meta(path)
+    if meta['format'] == 'xgboost':
+        import xgboost
+        model = getattr(xgboost, meta['source'])()
+        model.load_model(os.path.join(path, 'model.ubj'))
+        return model
+    return FlatForest.load(path, meta=meta, mmap=mmap)
+
+
+def exported_size(path):
+    """
+    Bytes on disk of the export at `path` (node arrays and meta), for sizing registry entries.
+    """
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def exported_meta_path(path):
+    """
+    File whose mtime/size change whenever the export at `path` is rewritten, for the model registry.
+    """
+    return os.path.join(path, META_FILE)
@@ -0,0 +1,48 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def sliding_windows(data, time_step, horizon=1, target=None, dtype=None):
+    """
+    Supervised windows over a time series, built as strided views (no per-row copies).
+
+    `data` is (T,) or (T, n_features). Sample i is the window data[i:i+time_step] and its
+    target is target[i + time_step - 1 + horizon], i.e. `horizon` steps after the last
+    row of the window. `target` defaults to `data` (first column for 2-D input) and may
+    be a column index or a separate (T,) array.
+
+    Returns X of shape (n, time_step) or (n, time_step, n_features) and y of shape (n,),
+    with n = T - time_step - horizon + 1. Both are read-only views of the input unless
+    `dtype` asks for a conversion (e.g. np.float32), which makes a single contiguous copy.
+    """
+    data = np.asarray(data)
+    if target is None:
+        target = data if data.ndim == 1 else data[:, 0]
+    elif np.ndim(target) == 0:
+        target = data[:, target]
+    target = np.asarray(target)
+
+    n = max(len(data) - time_step - horizon + 1, 0)
+    if n == 0:
+        shape = (0, time_step) + data.shape[1:]
+        return np.empty(shape, dtype=dtype or data.dtype), np.empty(0, dtype=dtype or target.dtype)
+
+    X = sliding_window_view(data, time_step, axis=0)[:n]
+    if data.ndim == 2:
+        # sliding_window_view puts the window last: (n, n_features, time_step) -> (n, time_step, n_features)
+        X = np.moveaxis(X, -1, 1)
+    y = target[time_step - 1 + horizon:][:n]
+
+    if dtype is not None:
+        X = np.ascontiguousarray(X, dtype=dtype)
+        y = np.ascontiguousarray(y, dtype=dtype)
+    return X, y
+
+
+def window_end_dates(dates, time_step, horizon=1):
+    """
+    Date of the last row of each window produced by sliding_windows with the same arguments.
+    """
+    dates = np.asarray(dates)
+    n = max(len(dates) - time_step - horizon + 1, 0)
+    return dates[time_step - 1:][:n]